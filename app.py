@@ -1,12 +1,25 @@
 import sys
+import time
 from PySide6.QtWidgets import QApplication # type: ignore
 from .ui.main_windows import MainWindow
-from .db.modelos import crear_tablas
+from .db.migraciones import migrar
+from .db.conexion import cerrar
+from .services.cierres import cerrar_pendientes
+from .ui.carga_diferida import medir_primer_pintado, guardar_tiempos
 
 def main():
-    crear_tablas()
+    inicio = time.perf_counter()
+    migrar()
+    try:
+        # Cierres de inventario que falten (fines de mes y ayer)
+        cerrar_pendientes()
+    except Exception as e:
+        print(f"Error generando cierres de inventario: {e}")
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(guardar_tiempos)
+    app.aboutToQuit.connect(cerrar)
     window = MainWindow()
+    medir_primer_pintado(window, inicio)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,57 @@
+"""
+Contadores de cambios por tabla.
+
+La conexión de escritura anota qué tablas toca cada transacción (incluidas
+las que modifican los triggers) y las publica aquí al confirmar. Los
+cambios hechos por otro proceso sobre el mismo archivo se detectan con
+PRAGMA data_version; como no se sabe qué tablas tocaron, cuentan como un
+cambio en todas.
+
+Una vista guarda la marca de sus tablas al cargar y sólo necesita
+recargar si la marca cambió.
+"""
+import threading
+
+_candado = threading.Lock()
+_contadores = {}    # tabla -> número de transacciones que la modificaron
+_externos = 0       # cambios de otros procesos (afectan a todas las tablas)
+_oyentes = []
+
+
+def registrar(tablas):
+    """
+    Anota un cambio confirmado y avisa a los oyentes. tablas=None indica
+    un cambio externo. Se puede llamar desde cualquier hilo.
+    """
+    global _externos
+    with _candado:
+        if tablas is None:
+            _externos += 1
+        else:
+            tablas = frozenset(tablas)
+            for tabla in tablas:
+                _contadores[tabla] = _contadores.get(tabla, 0) + 1
+        oyentes = list(_oyentes)
+    for oyente in oyentes:
+        oyente(tablas)
+
+
+def marca(tablas):
+    """Estado actual de un grupo de tablas; comparable con =="""
+    with _candado:
+        return (_externos,) + tuple(_contadores.get(tabla, 0) for tabla in tablas)
+
+
+def suscribir(oyente):
+    """oyente(tablas) se llama tras cada cambio, en el hilo que lo hizo"""
+    with _candado:
+        _oyentes.append(oyente)
+
+
+def revisar_externos():
+    """Registra un cambio externo si otro proceso escribió desde la última revisión"""
+    from .conexion import gestor
+    if gestor().cambios_externos():
+        registrar(None)
+        return True
+    return False
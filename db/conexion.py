@@ -1,8 +1,12 @@
 import sqlite3
 import sys
-import os
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from . import cambios
+
 # --- LÓGICA DE RUTA PARA .EXE ---
 if getattr(sys, 'frozen', False):
     # Si es el archivo .exe, BASE_DIR será la carpeta donde está el ejecutable
@@ -14,6 +18,281 @@ else:
 DB_PATH = BASE_DIR / "data.db"
 # -------------------------------
 
-def conectar():
-    # Agregamos timeout para evitar el error de "database is locked"
-    return sqlite3.connect(DB_PATH, timeout=10)
\ No newline at end of file
+# Espera máxima (segundos) cuando otro proceso tiene la base bloqueada
+TIMEOUT = 10
+# Conexiones de solo lectura que se mantienen abiertas
+LECTORES = 4
+# Espera máxima (segundos) por un lector del grupo antes de abrir uno extra
+ESPERA_LECTOR = 2
+# Acciones del autorizador que modifican filas de una tabla
+_ESCRITURAS = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE}
+
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",      # ~16 MB de caché de páginas
+    "PRAGMA mmap_size = 268435456",    # 256 MB mapeados en memoria
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class GestorConexiones:
+    """
+    Único punto de acceso a la base de datos del proceso.
+
+    Mantiene una conexión de escritura de larga vida (protegida por un
+    candado, porque SQLite sólo admite un escritor) y un pequeño grupo de
+    conexiones de solo lectura. La base trabaja en modo WAL, así que los
+    lectores no bloquean al escritor ni al revés.
+
+    Cada transacción de escritura confirmada se publica en db.cambios con
+    las tablas que modificó.
+    """
+
+    def __init__(self, ruta=DB_PATH, lectores=LECTORES):
+        self.ruta = Path(ruta).resolve()
+        self._candado = threading.RLock()
+        self._escritor = None
+        self._lectores = queue.LifoQueue()
+        self._max_lectores = lectores
+        self._creados = 0
+        self._abiertos = set()          # Todos los lectores abiertos, prestados o no
+        self._extra = set()             # Abiertos fuera del grupo; se cierran al devolverse
+        self._candado_lectores = threading.Lock()
+        self._tocadas = set()           # Tablas modificadas en la transacción en curso
+        self._version_datos = None      # Último PRAGMA data_version visto
+
+    # ---------------------------------
+    def _configurar(self, conn):
+        conn.execute(f"PRAGMA busy_timeout = {TIMEOUT * 1000}")
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _abrir_escritor(self):
+        conn = sqlite3.connect(
+            self.ruta,
+            timeout=TIMEOUT,
+            isolation_level=None,       # Las transacciones las maneja escritura()
+            check_same_thread=False,    # Se comparte entre hilos bajo el candado
+            # SQLite consulta al autorizador sólo al preparar una sentencia: con
+            # el caché de sentencias, un INSERT o UPDATE repetido no volvería a
+            # anotar su tabla en _tocadas y db.cambios no avisaría el cambio
+            cached_statements=0,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.set_authorizer(self._autorizar)
+        return self._configurar(conn)
+
+    def _autorizar(self, accion, tabla, _columna, _base, _trigger):
+        # También se llama por las sentencias de los triggers
+        if accion in _ESCRITURAS and tabla and not tabla.startswith("sqlite_"):
+            self._tocadas.add(tabla)
+        return sqlite3.SQLITE_OK
+
+    def _abrir_lector(self):
+        conn = sqlite3.connect(
+            f"{self.ruta.as_uri()}?mode=ro",
+            uri=True,
+            timeout=TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        return self._configurar(conn)
+
+    # ---------------------------------
+    @property
+    def escritor(self):
+        with self._candado:
+            if self._escritor is None:
+                self._escritor = self._abrir_escritor()
+            return self._escritor
+
+    @contextmanager
+    def escritura(self):
+        """
+        Transacción de escritura: BEGIN IMMEDIATE al entrar, COMMIT al
+        salir sin errores y ROLLBACK si ocurre una excepción.
+        """
+        with self._candado:
+            conn = self.escritor
+            if conn.in_transaction:
+                # Llamada anidada: se une a la transacción en curso
+                yield conn
+                return
+            self._tocadas.clear()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._tocadas.clear()
+                raise
+            conn.execute("COMMIT")
+            tocadas, self._tocadas = self._tocadas, set()
+        # Se avisa fuera del candado: los oyentes pueden querer leer
+        if tocadas:
+            cambios.registrar(tocadas)
+
+    @contextmanager
+    def lectura(self):
+        """Presta una conexión de solo lectura del grupo"""
+        # El escritor crea el archivo y activa WAL antes del primer lector
+        self.escritor
+        conn = self._tomar_lector()
+        try:
+            yield conn
+        finally:
+            self._devolver_lector(conn)
+
+    @contextmanager
+    def instantanea(self, cantidad):
+        """
+        Presta `cantidad` conexiones de solo lectura propias (fuera del
+        grupo) que ven exactamente la misma versión de la base, para leer
+        en paralelo desde varios hilos. Las lecturas se abren con el
+        escritor tomado (BEGIN IMMEDIATE), así ningún proceso puede
+        confirmar cambios entre la primera y la última.
+        """
+        conexiones = [self._abrir_lector() for _ in range(cantidad)]
+        try:
+            with self._candado:
+                escritor = self.escritor
+                propia = not escritor.in_transaction
+                if propia:
+                    escritor.execute("BEGIN IMMEDIATE")
+                try:
+                    for conn in conexiones:
+                        conn.execute("BEGIN")
+                        # La transacción de lectura empieza con la primera lectura
+                        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                finally:
+                    if propia:
+                        escritor.execute("ROLLBACK")
+            yield conexiones
+        finally:
+            for conn in conexiones:
+                conn.close()
+
+    def _tomar_lector(self):
+        try:
+            return self._lectores.get_nowait()
+        except queue.Empty:
+            pass
+        with self._candado_lectores:
+            if self._creados < self._max_lectores:
+                self._creados += 1
+                conn = self._abrir_lector()
+                self._abiertos.add(conn)
+                return conn
+        try:
+            return self._lectores.get(timeout=ESPERA_LECTOR)
+        except queue.Empty:
+            pass
+        # Todos prestados (p. ej. exportaciones largas): uno extra, así una
+        # lectura del hilo de la interfaz no queda esperando
+        conn = self._abrir_lector()
+        with self._candado_lectores:
+            self._abiertos.add(conn)
+            self._extra.add(conn)
+        return conn
+
+    def _devolver_lector(self, conn):
+        with self._candado_lectores:
+            if conn not in self._abiertos:
+                return   # Ya lo cerró cerrar()
+            extra = conn in self._extra
+            if extra:
+                self._extra.discard(conn)
+                self._abiertos.discard(conn)
+        if extra:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        self._lectores.put(conn)
+
+    def cambios_externos(self):
+        """
+        True si otro proceso confirmó cambios desde la llamada anterior.
+        No espera: si el escritor está ocupado responde False.
+        """
+        if not self._candado.acquire(blocking=False):
+            return False
+        try:
+            version = self.escritor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            self._candado.release()
+        anterior, self._version_datos = self._version_datos, version
+        return anterior is not None and version != anterior
+
+    # ---------------------------------
+    def cerrar(self):
+        """Cierra todas las conexiones (al salir de la aplicación)"""
+        with self._candado:
+            # También los prestados: quien los tenga recibe un error al usarlos
+            with self._candado_lectores:
+                abiertos, self._abiertos = self._abiertos, set()
+                self._extra.clear()
+                self._creados = 0
+                while True:
+                    try:
+                        self._lectores.get_nowait()
+                    except queue.Empty:
+                        break
+            for conn in abiertos:
+                conn.close()
+            if self._escritor is not None:
+                # Actualiza las estadísticas del planificador si hace falta
+                self._escritor.execute("PRAGMA optimize")
+                self._escritor.close()
+                self._escritor = None
+
+
+_gestor = None
+_candado_gestor = threading.Lock()
+
+
+def gestor():
+    """Devuelve el gestor de conexiones del proceso (se crea al primer uso)"""
+    global _gestor
+    with _candado_gestor:
+        if _gestor is None:
+            _gestor = GestorConexiones()
+        return _gestor
+
+
+def configurar(ruta):
+    """Apunta el gestor a otra base de datos (scripts y pruebas)"""
+    global _gestor
+    with _candado_gestor:
+        if _gestor is not None:
+            _gestor.cerrar()
+        _gestor = GestorConexiones(ruta)
+        return _gestor
+
+
+def escritura():
+    return gestor().escritura()
+
+
+def lectura():
+    return gestor().lectura()
+
+
+def instantanea(cantidad):
+    return gestor().instantanea(cantidad)
+
+
+@contextmanager
+def transaccion(conn=None):
+    """Usa la transacción del llamador (conn) o abre una de escritura"""
+    if conn is not None:
+        yield conn
+    else:
+        with escritura() as conn:
+            yield conn
+
+
+def cerrar():
+    if _gestor is not None:
+        _gestor.cerrar()
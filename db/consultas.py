@@ -0,0 +1,724 @@
+"""
+Consultas de las pantallas, los servicios y los exportadores.
+
+Están reunidas aquí para poder revisar su plan de ejecución: cada
+consulta registrada en CONSULTAS debe resolverse con índices sobre las
+tablas grandes, sin recorrerlas ni ordenarlas en un B-tree temporal
+(tests/test_planes.py). Quedan fuera sólo los INSERT ... VALUES y las
+escrituras por clave primaria, que no tienen plan que revisar.
+"""
+import re
+from typing import NamedTuple
+
+from .conexion import lectura
+
+
+# Tablas que crecen con el uso; sobre ellas no se admiten recorridos completos
+TABLAS_GRANDES = {
+    "tandas",
+    "tanda_materia_prima",
+    "acumulado_mensual",
+    "movimientos_diarios",
+    "costos_tanda",
+    "costos_dia",
+    "cierres_inventario",
+    "historial_inventario_materia_prima",
+    "precio_chorizo_dia",
+}
+
+
+# ==========================================
+# PRODUCCIÓN
+# ==========================================
+
+TANDAS_DEL_DIA = """
+    SELECT t.id, t.fecha, r.nombre, t.numero_tanda, t.cantidad_producida, t.unidades
+    FROM tandas t
+    JOIN referencias_chorizo r ON r.id = t.referencia_id
+    WHERE t.fecha = ?
+    ORDER BY t.numero_tanda
+"""
+
+TANDAS_DEL_DIA_COMBO = """
+    SELECT t.id, r.nombre || ' - T' || t.numero_tanda
+    FROM tandas t
+    JOIN referencias_chorizo r ON r.id = t.referencia_id
+    WHERE t.fecha = ?
+    ORDER BY t.numero_tanda
+"""
+
+DETALLE_TANDA = """
+    SELECT i.nombre, tm.cantidad_usada, tm.costo_unitario, tm.total
+    FROM tanda_materia_prima tm
+    JOIN inventario_materia_prima i ON i.id = tm.materia_prima_id
+    WHERE tm.tanda_id = ?
+"""
+
+CONSUMO_DEL_DIA = """
+    SELECT i.nombre,
+           SUM(tm.cantidad_usada),
+           i.unidad
+    FROM tanda_materia_prima tm
+    JOIN tandas t ON t.id = tm.tanda_id
+    JOIN inventario_materia_prima i ON i.id = tm.materia_prima_id
+    WHERE t.fecha = ?
+    GROUP BY i.nombre
+"""
+
+PRODUCCION_DEL_DIA = """
+    SELECT
+        r.nombre,
+        COUNT(t.id) as num_tandas,
+        SUM(t.cantidad_producida) as kg_totales,
+        SUM(t.unidades) as unds_totales,
+        AVG(t.cantidad_producida) -- Simulación de costo o dato extra
+    FROM tandas t
+    JOIN referencias_chorizo r ON r.id = t.referencia_id
+    WHERE t.fecha = ?
+    GROUP BY r.nombre
+"""
+
+# Lee el acumulado precalculado (una fila por referencia); mes = 'YYYY-MM'
+ACUMULADO_DEL_MES = """
+    SELECT r.nombre, a.tandas, a.kilos, a.unidades
+    FROM acumulado_mensual a
+    JOIN referencias_chorizo r ON r.id = a.referencia_id
+    WHERE a.mes = ?
+    ORDER BY a.kilos DESC
+"""
+
+# ==========================================
+# PRECIOS
+# ==========================================
+
+# Costo de materia prima por kg de cada referencia en el día, leído de
+# costos_dia (lo mantienen los triggers de tandas y tanda_materia_prima)
+COSTO_REFERENCIAS_DEL_DIA = """
+    SELECT
+        r.id,
+        r.nombre,
+        IFNULL(c.costo_materia / NULLIF(c.kilos, 0), 0) AS costo_dia_kg
+    FROM referencias_chorizo r
+    LEFT JOIN costos_dia c
+        ON c.referencia_id = r.id
+        AND c.fecha = ?
+    ORDER BY r.id
+"""
+
+PRECIOS_DEL_DIA = """
+    SELECT referencia_id, precio_venta FROM precio_chorizo_dia WHERE fecha = ?
+"""
+
+# ==========================================
+# HISTORIAL
+# ==========================================
+
+def _filtros_historial(materia_id, tipo_mov, alias="h"):
+    filtros = ""
+    if materia_id is not None:
+        filtros += f" AND {alias}.materia_prima_id = ?"
+    if tipo_mov is not None:
+        filtros += f" AND {alias}.tipo_movimiento = ?"
+    return filtros
+
+
+def consulta_historial(materia_id=None, tipo_mov=None, despues_de=False):
+    """
+    Una página del historial según los filtros activos, de la más reciente
+    a la más antigua. Parámetros: fecha_desde, fecha_hasta (sólo en la
+    primera página), [materia_id], [tipo_mov], [fecha, hora, id de la
+    última fila ya cargada si despues_de], límite.
+
+    Paginación por clave (keyset): la página siguiente arranca justo
+    después de la última fila vista, así que su costo no depende de
+    cuántas filas se cargaron antes.
+    """
+    query = """
+    SELECT
+        h.id,
+        h.fecha,
+        h.hora,
+        h.tipo_movimiento,
+        i.nombre,
+        h.cantidad,
+        h.costo_unitario,
+        h.total,
+        h.stock_resultante,
+        h.referencia
+    FROM historial_inventario_materia_prima h
+    JOIN inventario_materia_prima i ON i.id = h.materia_prima_id
+    """
+    if despues_de:
+        # El cursor ya está dentro del rango: el límite superior sobra y
+        # quitarlo deja que el índice arranque directo en el cursor
+        query += " WHERE h.fecha >= ?"
+    else:
+        query += " WHERE h.fecha BETWEEN ? AND ?"
+    query += _filtros_historial(materia_id, tipo_mov)
+    if despues_de:
+        query += " AND (h.fecha, h.hora, h.id) < (?, ?, ?)"
+    return query + " ORDER BY h.fecha DESC, h.hora DESC, h.id DESC LIMIT ?"
+
+
+def consulta_totales_historial(materia_id=None, tipo_mov=None):
+    """
+    Totales de entradas y salidas ($) del rango, sin traer las filas.
+    Se leen del resumen diario (lo mantienen los triggers del historial):
+    el costo depende de los días del rango, no de los movimientos.
+    Parámetros: fecha_desde, fecha_hasta, [materia_id], [tipo_mov].
+    """
+    return """
+    SELECT
+        IFNULL(SUM(CASE WHEN m.tipo_movimiento = 'ENTRADA' THEN m.total END), 0),
+        IFNULL(SUM(CASE WHEN m.tipo_movimiento = 'SALIDA' THEN m.total END), 0)
+    FROM movimientos_diarios m
+    WHERE m.fecha BETWEEN ? AND ?
+    """ + _filtros_historial(materia_id, tipo_mov, "m")
+
+
+# ==========================================
+# STOCK A UNA FECHA (services/cierres.py)
+# ==========================================
+
+# Cierre más reciente de una materia prima hasta una fecha
+ULTIMO_CIERRE = """
+    SELECT fecha, stock, costo_unitario
+    FROM cierres_inventario
+    WHERE materia_prima_id = ? AND fecha <= ?
+    ORDER BY fecha DESC
+    LIMIT 1
+"""
+
+# Primer día sin cierre: el de la materia más atrasada. Parte de todas
+# las materias, así también cuenta la que perdió todos sus cierres (la
+# toma desde su primer movimiento); las que no tienen movimientos no cuentan
+CIERRES_PENDIENTES_DESDE = """
+    SELECT MIN(IFNULL(
+        (SELECT date(MAX(c.fecha), '+1 day') FROM cierres_inventario c
+         WHERE c.materia_prima_id = m.id),
+        (SELECT MIN(h.fecha) FROM historial_inventario_materia_prima h
+         WHERE h.materia_prima_id = m.id)
+    ))
+    FROM inventario_materia_prima m
+"""
+
+# Movimientos de una materia prima en (desde, hasta], en orden del libro
+MOVIMIENTOS_ENTRE = """
+    SELECT tipo_movimiento, cantidad, costo_unitario
+    FROM historial_inventario_materia_prima
+    WHERE materia_prima_id = ? AND fecha > ? AND fecha <= ?
+    ORDER BY fecha, hora, id
+"""
+
+
+# ==========================================
+# INVENTARIO Y RECETAS (services/)
+# ==========================================
+
+def consulta_estado_materias(cantidad):
+    """Stock y costo de `cantidad` materias primas (WHERE id IN (...))"""
+    marcas = ",".join("?" * cantidad)
+    return f"""
+        SELECT id, stock_actual, costo_unitario FROM inventario_materia_prima
+        WHERE id IN ({marcas})
+    """
+
+
+STOCK_MATERIA = """
+    SELECT stock_actual FROM inventario_materia_prima WHERE id = ?
+"""
+
+# Salida de una tanda; la referencia ("Usado en <referencia> - T<n>") se
+# arma en el mismo INSERT
+INSERTAR_SALIDA = """
+    INSERT INTO historial_inventario_materia_prima
+    (fecha, hora, materia_prima_id, tipo_movimiento, cantidad,
+     costo_unitario, total, stock_anterior, stock_resultante,
+     referencia, tanda_id)
+    SELECT ?, ?, ?, 'SALIDA', ?, ?, ?, ?, ?,
+           'Usado en ' || r.nombre || ' - T' || t.numero_tanda, t.id
+    FROM tandas t
+    JOIN referencias_chorizo r ON r.id = t.referencia_id
+    WHERE t.id = ?
+    RETURNING id
+"""
+
+RECETA_DE_REFERENCIA = """
+    SELECT materia_prima_id, kg_por_kg FROM recetas WHERE referencia_id = ?
+"""
+
+BORRAR_RECETA = """
+    DELETE FROM recetas WHERE referencia_id = ?
+"""
+
+KILOS_DE_TANDA = """
+    SELECT referencia_id, cantidad_producida FROM tandas WHERE id = ?
+"""
+
+USO_POR_MATERIA_DE_TANDA = """
+    SELECT materia_prima_id, SUM(cantidad_usada)
+    FROM tanda_materia_prima WHERE tanda_id = ?
+    GROUP BY materia_prima_id
+"""
+
+# Consumos de la receta de una tanda según sus kilos
+CONSUMOS_RECETA_TANDA = """
+    SELECT rc.materia_prima_id, t.cantidad_producida * rc.kg_por_kg
+    FROM tandas t
+    JOIN recetas rc ON rc.referencia_id = t.referencia_id
+    WHERE t.id = ?
+    ORDER BY rc.materia_prima_id
+"""
+
+# ¿La tanda ya tiene materia prima asignada?
+TANDA_CON_MATERIA_PRIMA = """
+    SELECT 1 FROM tanda_materia_prima WHERE tanda_id = ? LIMIT 1
+"""
+
+# Consumos de las tandas del día que tienen receta y todavía no tienen
+# materia prima asignada; una fila por (tanda, materia). El orden es el
+# del índice único (fecha, numero_tanda, referencia_id)
+CONSUMOS_RECETAS_DEL_DIA = """
+    SELECT t.id, rc.materia_prima_id, t.cantidad_producida * rc.kg_por_kg
+    FROM tandas t
+    JOIN recetas rc ON rc.referencia_id = t.referencia_id
+    WHERE t.fecha = ?
+      AND NOT EXISTS (SELECT 1 FROM tanda_materia_prima tm WHERE tm.tanda_id = t.id)
+    ORDER BY t.numero_tanda, t.referencia_id, rc.materia_prima_id
+"""
+
+BORRAR_PRECIOS_DIA = """
+    DELETE FROM precio_chorizo_dia WHERE fecha = ?
+"""
+
+
+# ==========================================
+# RECOSTEO (services/costeo.py)
+# ==========================================
+
+# Libro de una materia prima desde un cierre (exclusive) hasta el final
+LIBRO_DESDE = """
+    SELECT id, tipo_movimiento, cantidad, costo_unitario, total, stock_anterior, stock_resultante
+    FROM historial_inventario_materia_prima
+    WHERE materia_prima_id = ? AND fecha > ?
+    ORDER BY fecha, hora, id
+"""
+
+MOVIMIENTO_HISTORIAL = """
+    SELECT materia_prima_id, fecha, tipo_movimiento, cantidad, costo_unitario
+    FROM historial_inventario_materia_prima WHERE id = ?
+"""
+
+RECOSTEAR_HISTORIAL = """
+    UPDATE historial_inventario_materia_prima
+    SET costo_unitario = ?, total = ?, stock_anterior = ?, stock_resultante = ?
+    WHERE id = ?
+"""
+
+# Los consumos de las tandas siguen a su salida del historial
+RECOSTEAR_TANDA_MP = """
+    UPDATE tanda_materia_prima SET costo_unitario = ?, total = ?
+    WHERE historial_id = ?
+"""
+
+CORREGIR_HISTORIAL = """
+    UPDATE historial_inventario_materia_prima
+    SET cantidad = ?, costo_unitario = ?, total = ?
+    WHERE id = ?
+"""
+
+CORREGIR_TANDA_MP = """
+    UPDATE tanda_materia_prima SET cantidad_usada = ?, total = ?
+    WHERE historial_id = ?
+"""
+
+
+# ==========================================
+# PANTALLAS (ui/)
+# ==========================================
+
+MATERIAS_PRIMAS_POR_ID = """
+    SELECT id, nombre FROM inventario_materia_prima ORDER BY id
+"""
+
+MATERIAS_PRIMAS_POR_NOMBRE = """
+    SELECT id, nombre FROM inventario_materia_prima ORDER BY nombre
+"""
+
+MATERIAS_PRIMAS_CON_STOCK = """
+    SELECT id, nombre, costo_unitario, stock_actual
+    FROM inventario_materia_prima
+    ORDER BY nombre
+"""
+
+INVENTARIO_VALORIZADO = """
+    SELECT nombre, stock_actual, costo_unitario,
+           stock_actual * costo_unitario
+    FROM inventario_materia_prima
+"""
+
+NOMBRES_REFERENCIAS = """
+    SELECT id, nombre FROM referencias_chorizo
+"""
+
+# Entradas, consumo y costo del consumo de cada materia prima en un rango
+# (pantalla de acumulado), desde el acumulado diario: O(días del rango)
+MATERIA_PRIMA_ENTRE = """
+    SELECT i.nombre, i.unidad,
+           SUM(CASE WHEN m.tipo_movimiento = 'ENTRADA' THEN m.cantidad ELSE 0 END),
+           SUM(CASE WHEN m.tipo_movimiento = 'SALIDA' THEN m.cantidad ELSE 0 END),
+           SUM(CASE WHEN m.tipo_movimiento = 'SALIDA' THEN m.total ELSE 0 END) AS costo
+    FROM movimientos_diarios m
+    JOIN inventario_materia_prima i ON i.id = m.materia_prima_id
+    WHERE m.fecha BETWEEN ? AND ?
+    GROUP BY m.materia_prima_id
+    ORDER BY costo DESC
+"""
+
+# Tabla de carga manual de la pantalla de producción (no es del libro)
+REGISTROS_PRODUCCION_DIARIA = """
+    SELECT fecha, insumo, cantidad, costo_unitario, total
+    FROM produccion_diaria
+    ORDER BY fecha
+"""
+
+
+# ==========================================
+# REPORTES PDF
+# ==========================================
+
+# Tandas del día con su costo de materia prima (costos_tanda)
+REPORTE_TANDAS_DIA = """
+    SELECT t.numero_tanda, r.nombre, t.cantidad_producida, t.unidades,
+           IFNULL(c.costo_materia, 0)
+    FROM tandas t
+    JOIN referencias_chorizo r ON r.id = t.referencia_id
+    LEFT JOIN costos_tanda c ON c.tanda_id = t.id
+    WHERE t.fecha = ?
+    ORDER BY t.numero_tanda
+"""
+
+# Costo por referencia y día en un rango de fechas (costos_dia)
+REPORTE_COSTOS_ENTRE = """
+    SELECT c.fecha, r.nombre, c.tandas, c.kilos, c.costo_materia
+    FROM costos_dia c
+    JOIN referencias_chorizo r ON r.id = c.referencia_id
+    WHERE c.fecha BETWEEN ? AND ?
+    ORDER BY c.fecha, r.nombre
+"""
+
+# Lo mismo sumado por referencia
+REPORTE_COSTOS_REFERENCIA_ENTRE = """
+    SELECT r.nombre, SUM(c.tandas), SUM(c.kilos), SUM(c.costo_materia)
+    FROM costos_dia c
+    JOIN referencias_chorizo r ON r.id = c.referencia_id
+    WHERE c.fecha BETWEEN ? AND ?
+    GROUP BY r.nombre
+    ORDER BY SUM(c.kilos) DESC
+"""
+
+# Movimientos de todas las materias primas en un rango, en orden del libro
+REPORTE_HISTORIAL_ENTRE = """
+    SELECT h.fecha, h.hora, i.nombre, h.tipo_movimiento, h.cantidad,
+           h.costo_unitario, h.total, h.stock_resultante
+    FROM historial_inventario_materia_prima h
+    JOIN inventario_materia_prima i ON i.id = h.materia_prima_id
+    WHERE h.fecha BETWEEN ? AND ?
+    ORDER BY h.fecha, h.hora
+"""
+
+
+# ==========================================
+# ANALÍTICA (utils/analitica.py)
+# ==========================================
+
+ANALITICA_TANDAS = """
+    SELECT id, fecha, referencia_id, cantidad_producida, IFNULL(unidades, 0)
+    FROM tandas
+    WHERE fecha BETWEEN ? AND ?
+    ORDER BY id
+"""
+
+ANALITICA_CONSUMO = """
+    SELECT tm.tanda_id, tm.cantidad_usada, tm.total
+    FROM tandas t
+    JOIN tanda_materia_prima tm ON tm.tanda_id = t.id
+    WHERE t.fecha BETWEEN ? AND ?
+"""
+
+ANALITICA_PRECIOS = """
+    SELECT fecha, referencia_id, precio_venta
+    FROM precio_chorizo_dia
+    WHERE fecha BETWEEN ? AND ? AND precio_venta > 0
+"""
+
+
+# Caché en memoria (utils/cache_analitica.py): filas nuevas desde el último
+# id visto, ya numéricas (fecha en días desde 1970, tipo como +1/-1)
+CACHE_HISTORIAL = """
+    SELECT id,
+           CAST(julianday(fecha) - 2440587.5 AS INTEGER),
+           materia_prima_id,
+           CASE tipo_movimiento WHEN 'ENTRADA' THEN 1 ELSE -1 END,
+           cantidad, costo_unitario, total,
+           IFNULL(tanda_id, 0)
+    FROM historial_inventario_materia_prima
+    WHERE id > ?
+    ORDER BY id
+"""
+
+CACHE_TANDAS = """
+    SELECT id,
+           CAST(julianday(fecha) - 2440587.5 AS INTEGER),
+           referencia_id, numero_tanda, cantidad_producida, IFNULL(unidades, 0)
+    FROM tandas
+    WHERE id > ?
+    ORDER BY id
+"""
+
+REESCRITURAS = """
+    SELECT veces FROM reescrituras WHERE tabla = ?
+"""
+
+# Lo mismo que CacheAnalitica.movimientos_por_materia, desde el acumulado
+# diario, para los rangos que el caché ya no cubre
+MOVIMIENTOS_POR_MATERIA_ENTRE = """
+    SELECT materia_prima_id,
+           SUM(CASE WHEN tipo_movimiento = 'ENTRADA' THEN cantidad ELSE 0 END),
+           SUM(CASE WHEN tipo_movimiento = 'SALIDA' THEN cantidad ELSE 0 END),
+           SUM(CASE WHEN tipo_movimiento = 'SALIDA' THEN total ELSE 0 END)
+    FROM movimientos_diarios
+    WHERE fecha BETWEEN ? AND ?
+    GROUP BY materia_prima_id
+"""
+
+
+# ==========================================
+# EXPORTACIÓN (recorren tablas completas a propósito)
+# ==========================================
+
+# Tablas del libro que se exportan sin formato (export/export_csv.py):
+# tabla -> (condición del rango de fechas, orden que sigue su índice de fecha)
+TABLAS_EXPORTABLES = {
+    "historial_inventario_materia_prima": ("fecha BETWEEN ? AND ?", "fecha, hora, id"),
+    "tandas": ("fecha BETWEEN ? AND ?", "fecha, numero_tanda, referencia_id"),
+    "tanda_materia_prima": (
+        "tanda_id IN (SELECT id FROM tandas WHERE fecha BETWEEN ? AND ?)",
+        "tanda_id, materia_prima_id",
+    ),
+}
+
+
+def consulta_exportacion(tabla, rango=False, despues_de=False):
+    """
+    Filas de una tabla exportable: todas, las de un rango de fechas
+    (ordenadas por el índice de fecha, sin ordenar el rango aparte) o las
+    de id mayor a uno dado.
+    """
+    condiciones, orden = [], "id"
+    if rango:
+        condicion, orden = TABLAS_EXPORTABLES[tabla]
+        condiciones.append(condicion)
+    if despues_de:
+        condiciones.append("id > ?")
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return f"SELECT * FROM {tabla}{where} ORDER BY {orden}"
+
+
+def consulta_ultimo_id(tabla):
+    return f"SELECT IFNULL(MAX(id), 0) FROM {tabla}"
+
+
+EXPORT_INVENTARIO = """
+    SELECT nombre, unidad, stock_actual, costo_unitario, (stock_actual * costo_unitario)
+    FROM inventario_materia_prima
+"""
+
+EXPORT_TANDAS = """
+    SELECT t.fecha, r.nombre, t.numero_tanda, t.cantidad_producida, t.unidades
+    FROM tandas t JOIN referencias_chorizo r ON r.id = t.referencia_id
+    ORDER BY t.fecha DESC
+"""
+
+# Costo total de materia prima sobre kilos totales de cada referencia
+EXPORT_COSTO_REFERENCIAS = """
+    SELECT
+        r.nombre,
+        SUM(c.costo_materia) / NULLIF(SUM(c.kilos), 0) as costo_por_kg
+    FROM costos_dia c
+    JOIN referencias_chorizo r ON r.id = c.referencia_id
+    GROUP BY r.nombre
+"""
+
+# Resumen por mes y referencia desde los acumulados (acumulado_mensual y
+# costos_dia): filas de tabla dinámica ya calculadas
+EXPORT_RESUMEN_MENSUAL = """
+    SELECT a.mes, r.nombre, a.tandas, a.kilos, a.unidades,
+           IFNULL(c.costo, 0),
+           IFNULL(c.costo, 0) / NULLIF(a.kilos, 0)
+    FROM acumulado_mensual a
+    JOIN referencias_chorizo r ON r.id = a.referencia_id
+    LEFT JOIN (
+        SELECT substr(fecha, 1, 7) AS mes, referencia_id, SUM(costo_materia) AS costo
+        FROM costos_dia
+        GROUP BY substr(fecha, 1, 7), referencia_id
+    ) c ON c.mes = a.mes AND c.referencia_id = a.referencia_id
+    ORDER BY a.mes DESC, r.nombre
+"""
+
+# Entradas y consumo de cada materia prima por mes (movimientos_diarios)
+EXPORT_CONSUMO_MENSUAL = """
+    SELECT substr(m.fecha, 1, 7) AS mes, i.nombre, i.unidad,
+           SUM(CASE WHEN m.tipo_movimiento = 'ENTRADA' THEN m.cantidad ELSE 0 END),
+           SUM(CASE WHEN m.tipo_movimiento = 'SALIDA' THEN m.cantidad ELSE 0 END),
+           SUM(CASE WHEN m.tipo_movimiento = 'SALIDA' THEN m.total ELSE 0 END)
+    FROM movimientos_diarios m
+    JOIN inventario_materia_prima i ON i.id = m.materia_prima_id
+    GROUP BY mes, m.materia_prima_id
+    ORDER BY mes DESC, i.nombre
+"""
+
+EXPORT_HISTORIAL = """
+    SELECT h.fecha, h.hora, i.nombre, h.tipo_movimiento, h.cantidad, h.stock_resultante, h.referencia
+    FROM historial_inventario_materia_prima h
+    JOIN inventario_materia_prima i ON i.id = h.materia_prima_id
+    ORDER BY h.fecha DESC, h.hora DESC
+"""
+
+
+# ==========================================
+# REGISTRO Y VERIFICACIÓN DE PLANES
+# ==========================================
+
+class Consulta(NamedTuple):
+    sql: str
+    recorrido: bool = False   # exportación: recorre y ordena tablas completas a propósito
+    orden: bool = False       # ordena en un B-tree temporal un resultado acotado (un día, un mes)
+
+
+CONSULTAS = {
+    "tandas_del_dia": Consulta(TANDAS_DEL_DIA),
+    "tandas_del_dia_combo": Consulta(TANDAS_DEL_DIA_COMBO),
+    "detalle_tanda": Consulta(DETALLE_TANDA),
+    "consumo_del_dia": Consulta(CONSUMO_DEL_DIA, orden=True),
+    "produccion_del_dia": Consulta(PRODUCCION_DEL_DIA, orden=True),
+    "acumulado_del_mes": Consulta(ACUMULADO_DEL_MES, orden=True),
+    "costo_referencias_del_dia": Consulta(COSTO_REFERENCIAS_DEL_DIA),
+    "precios_del_dia": Consulta(PRECIOS_DEL_DIA),
+    "historial": Consulta(consulta_historial()),
+    "historial_materia": Consulta(consulta_historial(1)),
+    "historial_tipo": Consulta(consulta_historial(None, "ENTRADA")),
+    "historial_materia_tipo": Consulta(consulta_historial(1, "ENTRADA")),
+    "historial_pagina": Consulta(consulta_historial(despues_de=True)),
+    "historial_pagina_materia": Consulta(consulta_historial(1, despues_de=True)),
+    "historial_totales": Consulta(consulta_totales_historial()),
+    "historial_totales_materia": Consulta(consulta_totales_historial(1)),
+    "historial_totales_materia_tipo": Consulta(consulta_totales_historial(1, "SALIDA")),
+    "ultimo_cierre": Consulta(ULTIMO_CIERRE),
+    "movimientos_entre": Consulta(MOVIMIENTOS_ENTRE),
+    "cierres_pendientes_desde": Consulta(CIERRES_PENDIENTES_DESDE),
+    "reporte_tandas_dia": Consulta(REPORTE_TANDAS_DIA),
+    "reporte_costos_entre": Consulta(REPORTE_COSTOS_ENTRE, orden=True),
+    "reporte_costos_referencia_entre": Consulta(REPORTE_COSTOS_REFERENCIA_ENTRE, orden=True),
+    "reporte_historial_entre": Consulta(REPORTE_HISTORIAL_ENTRE),
+    "analitica_tandas": Consulta(ANALITICA_TANDAS, orden=True),
+    "analitica_consumo": Consulta(ANALITICA_CONSUMO),
+    "analitica_precios": Consulta(ANALITICA_PRECIOS),
+    "cache_historial": Consulta(CACHE_HISTORIAL),
+    "cache_tandas": Consulta(CACHE_TANDAS),
+    "reescrituras": Consulta(REESCRITURAS),
+    "estado_materias": Consulta(consulta_estado_materias(3)),
+    "stock_materia": Consulta(STOCK_MATERIA),
+    "insertar_salida": Consulta(INSERTAR_SALIDA),
+    "receta_de_referencia": Consulta(RECETA_DE_REFERENCIA),
+    "borrar_receta": Consulta(BORRAR_RECETA),
+    "kilos_de_tanda": Consulta(KILOS_DE_TANDA),
+    "uso_por_materia_de_tanda": Consulta(USO_POR_MATERIA_DE_TANDA),
+    "consumos_receta_tanda": Consulta(CONSUMOS_RECETA_TANDA),
+    "tanda_con_materia_prima": Consulta(TANDA_CON_MATERIA_PRIMA),
+    "consumos_recetas_del_dia": Consulta(CONSUMOS_RECETAS_DEL_DIA),
+    "borrar_precios_dia": Consulta(BORRAR_PRECIOS_DIA),
+    "libro_desde": Consulta(LIBRO_DESDE),
+    "movimiento_historial": Consulta(MOVIMIENTO_HISTORIAL),
+    "recostear_historial": Consulta(RECOSTEAR_HISTORIAL),
+    "recostear_tanda_mp": Consulta(RECOSTEAR_TANDA_MP),
+    "corregir_historial": Consulta(CORREGIR_HISTORIAL),
+    "corregir_tanda_mp": Consulta(CORREGIR_TANDA_MP),
+    "materias_primas_por_id": Consulta(MATERIAS_PRIMAS_POR_ID),
+    "materias_primas_por_nombre": Consulta(MATERIAS_PRIMAS_POR_NOMBRE),
+    "materias_primas_con_stock": Consulta(MATERIAS_PRIMAS_CON_STOCK),
+    "inventario_valorizado": Consulta(INVENTARIO_VALORIZADO),
+    "nombres_referencias": Consulta(NOMBRES_REFERENCIAS),
+    "materia_prima_entre": Consulta(MATERIA_PRIMA_ENTRE, orden=True),
+    "registros_produccion_diaria": Consulta(REGISTROS_PRODUCCION_DIARIA),
+    "movimientos_por_materia_entre": Consulta(MOVIMIENTOS_POR_MATERIA_ENTRE, orden=True),
+    "export_inventario": Consulta(EXPORT_INVENTARIO, recorrido=True),
+    "export_tandas": Consulta(EXPORT_TANDAS, recorrido=True),
+    "export_costo_referencias": Consulta(EXPORT_COSTO_REFERENCIAS, recorrido=True),
+    "export_resumen_mensual": Consulta(EXPORT_RESUMEN_MENSUAL, recorrido=True),
+    "export_consumo_mensual": Consulta(EXPORT_CONSUMO_MENSUAL, recorrido=True),
+    "export_historial": Consulta(EXPORT_HISTORIAL, recorrido=True),
+}
+for _tabla in TABLAS_EXPORTABLES:
+    CONSULTAS[f"exportar_{_tabla}"] = Consulta(consulta_exportacion(_tabla), recorrido=True)
+    CONSULTAS[f"exportar_{_tabla}_rango"] = Consulta(consulta_exportacion(_tabla, rango=True))
+    CONSULTAS[f"exportar_{_tabla}_nuevas"] = Consulta(consulta_exportacion(_tabla, despues_de=True))
+    CONSULTAS[f"ultimo_id_{_tabla}"] = Consulta(consulta_ultimo_id(_tabla))
+
+
+_ALIAS = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|INNER\b|GROUP\b|ORDER\b)(\w+))?",
+    re.IGNORECASE,
+)
+
+
+def plan(conn, sql):
+    """Devuelve las líneas de EXPLAIN QUERY PLAN de una consulta"""
+    # EXPLAIN no revisa la versión del esquema: una lectura real obliga a
+    # recargarlo si otra conexión creó índices desde la última consulta
+    conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+    params = [None] * sql.count("?")
+    return [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def problemas(conn, consulta):
+    """
+    Pasos del plan que recorren completa una tabla grande (SCAN) o, si la
+    consulta lee alguna, que ordenan en un B-tree temporal, salvo que la
+    consulta esté marcada como recorrido completo u orden acotado.
+    """
+    if consulta.recorrido:
+        return []
+    alias = {}
+    for tabla, nombre in _ALIAS.findall(consulta.sql):
+        alias[nombre or tabla] = tabla
+    pasos = plan(conn, consulta.sql)
+    grandes = {
+        alias.get(detalle.split()[1], detalle.split()[1])
+        for detalle in pasos if detalle.startswith(("SCAN ", "SEARCH "))
+    } & TABLAS_GRANDES
+    encontrados = []
+    for detalle in pasos:
+        if detalle.startswith("SCAN "):
+            nombre = detalle.split()[1]
+            if alias.get(nombre, nombre) in TABLAS_GRANDES:
+                encontrados.append(detalle)
+        elif "TEMP B-TREE" in detalle and grandes and not consulta.orden:
+            encontrados.append(detalle)
+    return encontrados
+
+
+def verificar_planes(conn=None):
+    """
+    Revisa todas las consultas registradas. Devuelve {nombre: [problemas]}
+    sólo con las que tienen alguno; un diccionario vacío es éxito.
+    """
+    if conn is None:
+        with lectura() as conn:
+            return verificar_planes(conn)
+    encontrados = {}
+    for nombre, consulta in CONSULTAS.items():
+        detalles = problemas(conn, consulta)
+        if detalles:
+            encontrados[nombre] = detalles
+    return encontrados
@@ -0,0 +1,399 @@
+from .conexion import escritura, lectura
+from .modelos import crear_tablas
+
+
+# ==========================================
+# PASOS DE MIGRACIÓN
+# ==========================================
+# Cada paso lleva la base de la versión N-1 a la N. Deben ser idempotentes:
+# las bases que ya estaban en producción antes de este sistema tienen
+# user_version = 0 aunque ya tengan parte del esquema.
+
+def _v1_esquema_base(conn):
+    crear_tablas(conn.cursor())
+
+
+def _v2_unidades_en_tandas(conn):
+    # La columna se agregó a mano al CREATE TABLE; las bases viejas no la tienen
+    if "unidades" not in _columnas(conn, "tandas"):
+        conn.execute("ALTER TABLE tandas ADD COLUMN unidades INTEGER DEFAULT 0")
+
+
+def _v3_indices_consultas(conn):
+    # Plan de índices de db/consultas.py (verificar con verificar_planes)
+    for sql in (
+        # Producción por día y por rango de fechas (cubre kilos y unidades)
+        """CREATE INDEX IF NOT EXISTS idx_tandas_fecha_referencia
+           ON tandas(fecha, referencia_id, cantidad_producida, unidades)""",
+        # Detalle de materia prima de una tanda, sin tocar la tabla
+        """CREATE INDEX IF NOT EXISTS idx_tanda_mp_tanda
+           ON tanda_materia_prima(tanda_id, materia_prima_id, cantidad_usada, costo_unitario, total)""",
+        # Historial por rango de fechas, ya ordenado por fecha y hora
+        """CREATE INDEX IF NOT EXISTS idx_historial_fecha_hora
+           ON historial_inventario_materia_prima(fecha, hora)""",
+        # Historial de una materia prima, ya ordenado por fecha y hora
+        """CREATE INDEX IF NOT EXISTS idx_historial_materia_fecha
+           ON historial_inventario_materia_prima(materia_prima_id, fecha, hora)""",
+        # Costo de las tandas del día (salidas por tanda)
+        """CREATE INDEX IF NOT EXISTS idx_historial_tanda
+           ON historial_inventario_materia_prima(tanda_id, tipo_movimiento, fecha, total)""",
+        """CREATE INDEX IF NOT EXISTS idx_precio_fecha
+           ON precio_chorizo_dia(fecha, referencia_id, precio_venta)""",
+        # Reemplazados por los anteriores (prefijos o columna de dos valores)
+        "DROP INDEX IF EXISTS idx_historial_fecha",
+        "DROP INDEX IF EXISTS idx_historial_materia",
+        "DROP INDEX IF EXISTS idx_historial_tipo",
+    ):
+        conn.execute(sql)
+
+
+def _v4_acumulado_mensual(conn):
+    # La tabla original (concepto, cantidad, total) nunca se llenó
+    conn.execute("DROP TABLE IF EXISTS acumulado_mensual")
+    conn.execute("""
+        CREATE TABLE acumulado_mensual (
+            mes TEXT NOT NULL,                 -- 'YYYY-MM'
+            referencia_id INTEGER NOT NULL,
+            tandas INTEGER NOT NULL DEFAULT 0,
+            kilos REAL NOT NULL DEFAULT 0,
+            unidades INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, referencia_id),
+            FOREIGN KEY (referencia_id) REFERENCES referencias_chorizo(id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO acumulado_mensual (mes, referencia_id, tandas, kilos, unidades)
+        SELECT substr(fecha, 1, 7), referencia_id,
+               COUNT(*), SUM(cantidad_producida), SUM(IFNULL(unidades, 0))
+        FROM tandas
+        GROUP BY substr(fecha, 1, 7), referencia_id
+    """)
+
+    # Mantenimiento incremental: cada cambio en tandas suma o resta su aporte
+    sumar = """
+        INSERT INTO acumulado_mensual (mes, referencia_id, tandas, kilos, unidades)
+        VALUES (substr(NEW.fecha, 1, 7), NEW.referencia_id, 1,
+                NEW.cantidad_producida, IFNULL(NEW.unidades, 0))
+        ON CONFLICT (mes, referencia_id) DO UPDATE SET
+            tandas = tandas + 1,
+            kilos = kilos + excluded.kilos,
+            unidades = unidades + excluded.unidades;
+    """
+    restar = """
+        UPDATE acumulado_mensual SET
+            tandas = tandas - 1,
+            kilos = kilos - OLD.cantidad_producida,
+            unidades = unidades - IFNULL(OLD.unidades, 0)
+        WHERE mes = substr(OLD.fecha, 1, 7) AND referencia_id = OLD.referencia_id;
+        DELETE FROM acumulado_mensual
+        WHERE mes = substr(OLD.fecha, 1, 7) AND referencia_id = OLD.referencia_id
+          AND tandas <= 0;
+    """
+    for nombre, evento, cuerpo in (
+        ("trg_tandas_acumulado_insert", "AFTER INSERT ON tandas", sumar),
+        ("trg_tandas_acumulado_delete", "AFTER DELETE ON tandas", restar),
+        ("trg_tandas_acumulado_update",
+         "AFTER UPDATE OF fecha, referencia_id, cantidad_producida, unidades ON tandas",
+         restar + sumar),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {evento} BEGIN {cuerpo} END")
+
+
+def _v5_movimientos_diarios(conn):
+    # Resumen por día, materia prima y tipo: los totales de un rango de
+    # fechas se suman sobre días en lugar de recorrer cada movimiento
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS movimientos_diarios (
+            fecha TEXT NOT NULL,
+            materia_prima_id INTEGER NOT NULL,
+            tipo_movimiento TEXT NOT NULL,
+            movimientos INTEGER NOT NULL DEFAULT 0,
+            cantidad REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, materia_prima_id, tipo_movimiento),
+            FOREIGN KEY (materia_prima_id) REFERENCES inventario_materia_prima(id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("DELETE FROM movimientos_diarios")
+    conn.execute("""
+        INSERT INTO movimientos_diarios
+            (fecha, materia_prima_id, tipo_movimiento, movimientos, cantidad, total)
+        SELECT fecha, materia_prima_id, tipo_movimiento, COUNT(*), SUM(cantidad), SUM(total)
+        FROM historial_inventario_materia_prima
+        GROUP BY fecha, materia_prima_id, tipo_movimiento
+    """)
+
+    sumar = """
+        INSERT INTO movimientos_diarios
+            (fecha, materia_prima_id, tipo_movimiento, movimientos, cantidad, total)
+        VALUES (NEW.fecha, NEW.materia_prima_id, NEW.tipo_movimiento, 1, NEW.cantidad, NEW.total)
+        ON CONFLICT (fecha, materia_prima_id, tipo_movimiento) DO UPDATE SET
+            movimientos = movimientos + 1,
+            cantidad = cantidad + excluded.cantidad,
+            total = total + excluded.total;
+    """
+    restar = """
+        UPDATE movimientos_diarios SET
+            movimientos = movimientos - 1,
+            cantidad = cantidad - OLD.cantidad,
+            total = total - OLD.total
+        WHERE fecha = OLD.fecha AND materia_prima_id = OLD.materia_prima_id
+          AND tipo_movimiento = OLD.tipo_movimiento;
+        DELETE FROM movimientos_diarios
+        WHERE fecha = OLD.fecha AND materia_prima_id = OLD.materia_prima_id
+          AND tipo_movimiento = OLD.tipo_movimiento AND movimientos <= 0;
+    """
+    for nombre, evento, cuerpo in (
+        ("trg_historial_diario_insert", "AFTER INSERT ON historial_inventario_materia_prima", sumar),
+        ("trg_historial_diario_delete", "AFTER DELETE ON historial_inventario_materia_prima", restar),
+        ("trg_historial_diario_update",
+         "AFTER UPDATE OF fecha, materia_prima_id, tipo_movimiento, cantidad, total"
+         " ON historial_inventario_materia_prima",
+         restar + sumar),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {evento} BEGIN {cuerpo} END")
+
+
+def _v6_recetas(conn):
+    # Receta por referencia: kg de cada materia prima por kg producido
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recetas (
+            referencia_id INTEGER NOT NULL,
+            materia_prima_id INTEGER NOT NULL,
+            kg_por_kg REAL NOT NULL CHECK(kg_por_kg > 0),
+            PRIMARY KEY (referencia_id, materia_prima_id),
+            FOREIGN KEY (referencia_id) REFERENCES referencias_chorizo(id),
+            FOREIGN KEY (materia_prima_id) REFERENCES inventario_materia_prima(id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _v7_cierres_inventario(conn):
+    # Foto del stock y costo de cada materia prima al cierre de un día
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cierres_inventario (
+            materia_prima_id INTEGER NOT NULL,
+            fecha TEXT NOT NULL,               -- Incluye todos los movimientos de ese día
+            stock REAL NOT NULL,
+            costo_unitario REAL NOT NULL,
+            PRIMARY KEY (materia_prima_id, fecha),
+            FOREIGN KEY (materia_prima_id) REFERENCES inventario_materia_prima(id)
+        ) WITHOUT ROWID
+    """)
+
+    # Un movimiento con fecha ya cerrada (cargado con atraso o corregido)
+    # invalida los cierres de esa materia desde esa fecha en adelante
+    invalidar = """
+        DELETE FROM cierres_inventario
+        WHERE materia_prima_id = {fila}.materia_prima_id AND fecha >= {fila}.fecha;
+    """
+    for nombre, evento, cuerpo in (
+        ("trg_historial_cierres_insert", "AFTER INSERT ON historial_inventario_materia_prima",
+         invalidar.format(fila="NEW")),
+        ("trg_historial_cierres_delete", "AFTER DELETE ON historial_inventario_materia_prima",
+         invalidar.format(fila="OLD")),
+        ("trg_historial_cierres_update",
+         "AFTER UPDATE OF fecha, materia_prima_id, tipo_movimiento, cantidad, costo_unitario"
+         " ON historial_inventario_materia_prima",
+         invalidar.format(fila="OLD") + invalidar.format(fila="NEW")),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {evento} BEGIN {cuerpo} END")
+
+
+def _v8_enlace_tanda_historial(conn):
+    # Cada consumo de una tanda apunta a su SALIDA del historial, para
+    # poder recostear ambos juntos
+    if "historial_id" not in _columnas(conn, "tanda_materia_prima"):
+        conn.execute("""
+            ALTER TABLE tanda_materia_prima
+            ADD COLUMN historial_id INTEGER REFERENCES historial_inventario_materia_prima(id)
+        """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tanda_mp_historial
+        ON tanda_materia_prima(historial_id)
+    """)
+
+    # Datos viejos: se emparejan por tanda, materia y cantidad, en orden de id
+    salidas = {}
+    for id_, tanda_id, materia_id, cantidad in conn.execute("""
+        SELECT id, tanda_id, materia_prima_id, cantidad
+        FROM historial_inventario_materia_prima
+        WHERE tipo_movimiento = 'SALIDA' AND tanda_id IS NOT NULL
+          AND id NOT IN (SELECT historial_id FROM tanda_materia_prima WHERE historial_id IS NOT NULL)
+        ORDER BY id
+    """):
+        salidas.setdefault((tanda_id, materia_id, cantidad), []).append(id_)
+    enlaces = []
+    for id_, tanda_id, materia_id, cantidad in conn.execute("""
+        SELECT id, tanda_id, materia_prima_id, cantidad_usada
+        FROM tanda_materia_prima
+        WHERE historial_id IS NULL
+        ORDER BY id
+    """).fetchall():
+        candidatas = salidas.get((tanda_id, materia_id, cantidad))
+        if candidatas:
+            enlaces.append((candidatas.pop(0), id_))
+    conn.executemany("UPDATE tanda_materia_prima SET historial_id = ? WHERE id = ?", enlaces)
+
+
+def _v9_costos_tanda(conn):
+    # Costo de materia prima por tanda y por referencia y día. El costo por
+    # kg es costo_materia / kilos, cada tanda contada una sola vez
+    conn.execute("DROP TABLE IF EXISTS costos_dia")
+    conn.execute("DROP TABLE IF EXISTS costos_tanda")
+    conn.execute("""
+        CREATE TABLE costos_tanda (
+            tanda_id INTEGER PRIMARY KEY,
+            fecha TEXT NOT NULL,
+            referencia_id INTEGER NOT NULL,
+            costo_materia REAL NOT NULL DEFAULT 0,
+            kilos REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (tanda_id) REFERENCES tandas(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE costos_dia (
+            fecha TEXT NOT NULL,
+            referencia_id INTEGER NOT NULL,
+            tandas INTEGER NOT NULL DEFAULT 0,
+            costo_materia REAL NOT NULL DEFAULT 0,
+            kilos REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, referencia_id),
+            FOREIGN KEY (referencia_id) REFERENCES referencias_chorizo(id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO costos_tanda (tanda_id, fecha, referencia_id, costo_materia, kilos)
+        SELECT t.id, t.fecha, t.referencia_id,
+               IFNULL((SELECT SUM(tm.total) FROM tanda_materia_prima tm WHERE tm.tanda_id = t.id), 0),
+               t.cantidad_producida
+        FROM tandas t
+    """)
+    conn.execute("""
+        INSERT INTO costos_dia (fecha, referencia_id, tandas, costo_materia, kilos)
+        SELECT fecha, referencia_id, COUNT(*), SUM(costo_materia), SUM(kilos)
+        FROM costos_tanda
+        GROUP BY fecha, referencia_id
+    """)
+
+    # Cambios en tandas: se saca el aporte viejo y se pone el nuevo
+    sumar_tanda = """
+        INSERT INTO costos_tanda (tanda_id, fecha, referencia_id, costo_materia, kilos)
+        VALUES (NEW.id, NEW.fecha, NEW.referencia_id,
+                IFNULL((SELECT SUM(total) FROM tanda_materia_prima WHERE tanda_id = NEW.id), 0),
+                NEW.cantidad_producida);
+        INSERT INTO costos_dia (fecha, referencia_id, tandas, costo_materia, kilos)
+        SELECT fecha, referencia_id, 1, costo_materia, kilos
+        FROM costos_tanda WHERE tanda_id = NEW.id
+        ON CONFLICT (fecha, referencia_id) DO UPDATE SET
+            tandas = tandas + 1,
+            costo_materia = costo_materia + excluded.costo_materia,
+            kilos = kilos + excluded.kilos;
+    """
+    restar_tanda = """
+        UPDATE costos_dia SET
+            tandas = tandas - 1,
+            kilos = kilos - OLD.cantidad_producida,
+            costo_materia = costo_materia
+                - IFNULL((SELECT costo_materia FROM costos_tanda WHERE tanda_id = OLD.id), 0)
+        WHERE fecha = OLD.fecha AND referencia_id = OLD.referencia_id;
+        DELETE FROM costos_dia
+        WHERE fecha = OLD.fecha AND referencia_id = OLD.referencia_id AND tandas <= 0;
+        DELETE FROM costos_tanda WHERE tanda_id = OLD.id;
+    """
+    # Consumos de materia prima: suman o restan su total a la tanda y a su día
+    def mover_costo(fila, signo):
+        return f"""
+        UPDATE costos_tanda SET costo_materia = costo_materia {signo} {fila}.total
+        WHERE tanda_id = {fila}.tanda_id;
+        UPDATE costos_dia SET costo_materia = costo_materia {signo} {fila}.total
+        WHERE (fecha, referencia_id) =
+              (SELECT fecha, referencia_id FROM tandas WHERE id = {fila}.tanda_id);
+        """
+    for nombre, evento, cuerpo in (
+        ("trg_tandas_costos_insert", "AFTER INSERT ON tandas", sumar_tanda),
+        ("trg_tandas_costos_delete", "AFTER DELETE ON tandas", restar_tanda),
+        ("trg_tandas_costos_update",
+         "AFTER UPDATE OF fecha, referencia_id, cantidad_producida ON tandas",
+         restar_tanda + sumar_tanda),
+        ("trg_tanda_mp_costos_insert", "AFTER INSERT ON tanda_materia_prima",
+         mover_costo("NEW", "+")),
+        ("trg_tanda_mp_costos_delete", "AFTER DELETE ON tanda_materia_prima",
+         mover_costo("OLD", "-")),
+        ("trg_tanda_mp_costos_update", "AFTER UPDATE OF tanda_id, total ON tanda_materia_prima",
+         mover_costo("OLD", "-") + mover_costo("NEW", "+")),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"CREATE TRIGGER {nombre} {evento} BEGIN {cuerpo} END")
+
+
+def _v10_reescrituras(conn):
+    # Cuántas veces se modificaron o borraron filas de las tablas que el
+    # caché de analítica lee sólo hacia adelante por id: si el número
+    # cambió, lo ya cargado puede estar viejo y se vuelve a leer todo
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reescrituras (
+            tabla TEXT PRIMARY KEY,
+            veces INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for tabla in ("historial_inventario_materia_prima", "tandas"):
+        conn.execute("INSERT OR IGNORE INTO reescrituras (tabla) VALUES (?)", (tabla,))
+        contar = f"UPDATE reescrituras SET veces = veces + 1 WHERE tabla = '{tabla}';"
+        for evento in ("UPDATE", "DELETE"):
+            nombre = f"trg_{tabla}_reescrituras_{evento.lower()}"
+            conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+            conn.execute(f"CREATE TRIGGER {nombre} AFTER {evento} ON {tabla} BEGIN {contar} END")
+
+
+MIGRACIONES = [
+    _v1_esquema_base,
+    _v2_unidades_en_tandas,
+    _v3_indices_consultas,
+    _v4_acumulado_mensual,
+    _v5_movimientos_diarios,
+    _v6_recetas,
+    _v7_cierres_inventario,
+    _v8_enlace_tanda_historial,
+    _v9_costos_tanda,
+    _v10_reescrituras,
+]
+
+VERSION_ACTUAL = len(MIGRACIONES)
+
+
+# ==========================================
+# MOTOR
+# ==========================================
+
+def _columnas(conn, tabla):
+    return {fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")}
+
+
+def version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar():
+    """
+    Lleva la base a VERSION_ACTUAL. Si ya está al día sólo cuesta una
+    lectura de PRAGMA user_version; si no, aplica los pasos pendientes en
+    orden dentro de una única transacción (todo o nada).
+    Devuelve la lista de versiones aplicadas.
+    """
+    with lectura() as conn:
+        if version(conn) >= VERSION_ACTUAL:
+            return []
+
+    aplicadas = []
+    with escritura() as conn:
+        # Se vuelve a leer bajo el candado: otra terminal pudo migrar primero
+        actual = version(conn)
+        for numero in range(actual + 1, VERSION_ACTUAL + 1):
+            MIGRACIONES[numero - 1](conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+            aplicadas.append(numero)
+    return aplicadas
@@ -1,10 +1,5 @@
-from .conexion import conectar
-
-
-def crear_tablas():
-    conn = conectar()
-    cursor = conn.cursor()
-    
+def crear_tablas(cursor):
+    """Esquema base (versión 1). Lo aplica db/migraciones.py, no se llama directo."""
     # Tabla de inventario de materia prima
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS inventario_materia_prima (
@@ -66,7 +61,7 @@ def crear_tablas():
             numero_tanda INTEGER NOT NULL,
             referencia_id INTEGER NOT NULL,
             cantidad_producida REAL NOT NULL,
-            unidades INTEGER DEFAULT 0, -- <--- NUEVA COLUMNA
+            unidades INTEGER DEFAULT 0,
             FOREIGN KEY (referencia_id) REFERENCES referencias_chorizo(id)
         )
     """)
@@ -161,9 +156,3 @@ def crear_tablas():
             (3, 'Chorizo Grande', 'kg'),
             (4, 'Chorizo de Cerdo', 'kg')
     """)
-    
-    conn.commit()
-    conn.close()
-    
-    print("✅ Todas las tablas creadas correctamente")
-    print("   - Incluyendo historial_inventario_materia_prima")
\ No newline at end of file
@@ -0,0 +1,279 @@
+"""
+Reportes en PDF para la oficina de planta: producción del día y costos
+del mes. Leen las mismas consultas y acumulados que las pantallas.
+
+Las tablas largas (el historial del mes) no se arman enteras: las filas
+se leen del cursor de a una página y cada página es una tabla con su
+propio encabezado, así la memoria no depende del largo del reporte.
+"""
+import os
+import tempfile
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import (
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+)
+from ..db.conexion import lectura
+from ..utils.analitica import cargar_produccion, por_referencia
+from ..db.consultas import (
+    REPORTE_TANDAS_DIA, REPORTE_COSTOS_ENTRE, REPORTE_COSTOS_REFERENCIA_ENTRE,
+    REPORTE_HISTORIAL_ENTRE, CONSUMO_DEL_DIA, NOMBRES_REFERENCIAS
+)
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+         "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+
+# Alto fijo de fila (puntos): permite saber cuántas filas entran por página
+ALTO_FILA = 14
+MARGEN = 1.5 * cm
+# Relleno superior e inferior del marco de SimpleDocTemplate
+RELLENO_MARCO = 12
+
+ESTILOS = getSampleStyleSheet()
+AZUL = colors.HexColor("#1F4E78")   # el mismo encabezado que el Excel
+ESTILO_TABLA = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), AZUL),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#EEF3F8")]),
+])
+
+
+class _Documento(SimpleDocTemplate):
+    """
+    Documento que toma los flowables de un generador a medida que los
+    dibuja: handle_flowable (el paso de build() que procesa el primero de
+    la lista) repone la historia cuando queda vacía, así nunca hay más de
+    una página armada en memoria.
+    """
+
+    def construir(self, flowables, **opciones):
+        self._pendientes = iter(flowables)
+        self._historia = []
+        self._reponer(self._historia)
+        self.build(self._historia, **opciones)
+
+    def _reponer(self, flowables):
+        # build() también pasa por aquí listas internas (p. ej. lo que queda
+        # pendiente al cambiar de página): sólo se repone la historia
+        if flowables is self._historia and not flowables:
+            siguiente = next(self._pendientes, None)
+            if siguiente is not None:
+                flowables.append(siguiente)
+
+    def handle_flowable(self, flowables):
+        super().handle_flowable(flowables)
+        self._reponer(flowables)
+
+
+def _numero(valor, decimales=2):
+    if valor != valor:   # nan: sin dato (p. ej. sin precio del día)
+        return "--"
+    return f"{valor or 0:,.{decimales}f}"
+
+
+def _porcentaje(valor):
+    return "--" if valor != valor else f"{valor:.1%}"
+
+
+def _tabla(encabezados, filas, anchos):
+    """Tabla corta; si no entra en la página, se corta repitiendo el encabezado"""
+    tabla = Table([encabezados] + filas, colWidths=anchos, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA)
+    return tabla
+
+
+def _tabla_fija(encabezados, filas, anchos):
+    """Tabla de filas de alto fijo que ocupa a lo sumo una página"""
+    tabla = Table([encabezados] + filas, colWidths=anchos,
+                  rowHeights=ALTO_FILA)
+    tabla.setStyle(ESTILO_TABLA)
+    return tabla
+
+
+def _tabla_paginada(doc, titulo, encabezados, filas, anchos):
+    """
+    Sección larga que empieza en página nueva: una tabla de alto fijo por
+    página, cada una con el encabezado. Las filas se consumen de a una
+    página del iterador (normalmente un cursor).
+    """
+    disponible = doc.height - RELLENO_MARCO
+    por_pagina = int(disponible // ALTO_FILA) - 1
+
+    encabezado = Paragraph(titulo, ESTILOS["Heading2"])
+    _, alto = encabezado.wrap(doc.width, disponible)
+    alto += ESTILOS["Heading2"].spaceBefore + ESTILOS["Heading2"].spaceAfter
+    # Una fila de holgura en la primera página por el título
+    capacidad = por_pagina - int(alto // ALTO_FILA) - 1
+
+    yield PageBreak()
+    yield encabezado
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == capacidad:
+            yield _tabla_fija(encabezados, bloque, anchos)
+            yield PageBreak()
+            bloque = []
+            capacidad = por_pagina
+    if bloque:
+        yield _tabla_fija(encabezados, bloque, anchos)
+
+
+def _pie(titulo):
+    """Dibuja título y número de página en el margen de cada hoja"""
+    def dibujar(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.grey)
+        ancho, _ = doc.pagesize
+        canvas.drawString(MARGEN, MARGEN / 2, titulo)
+        canvas.drawRightString(ancho - MARGEN, MARGEN / 2, f"Página {doc.page}")
+        canvas.restoreState()
+    return dibujar
+
+
+def _generar(ruta, titulo, armar, pagina=A4):
+    """
+    Arma el documento con armar(doc, conn) (un generador de flowables) y
+    lo escribe en un temporal que se renombra al terminar. La lectura
+    entera ocurre en una sola transacción. Los errores se propagan.
+    """
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(suffix=".pdf", dir=carpeta)
+    os.close(descriptor)
+    try:
+        doc = _Documento(
+            temporal, pagesize=pagina, title=titulo,
+            leftMargin=MARGEN, rightMargin=MARGEN,
+            topMargin=MARGEN, bottomMargin=MARGEN,
+        )
+        pie = _pie(titulo)
+        with lectura() as conn:
+            conn.execute("BEGIN")
+            doc.construir(armar(doc, conn), onFirstPage=pie, onLaterPages=pie)
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    return ruta
+
+
+# ==========================================
+# PRODUCCIÓN DEL DÍA
+# ==========================================
+
+def reporte_produccion_dia(ruta, fecha):
+    """Tandas del día con su costo, resumen por referencia y consumo de materia prima"""
+    titulo = f"Reporte de Producción - {fecha}"
+
+    def armar(doc, conn):
+        yield Paragraph(titulo, ESTILOS["Title"])
+
+        yield Paragraph("Tandas", ESTILOS["Heading2"])
+        filas, kilos, unidades, costo = [], 0, 0, 0
+        for numero, referencia, kg, unds, costo_tanda in conn.execute(REPORTE_TANDAS_DIA, (fecha,)):
+            filas.append([numero, referencia, _numero(kg), unds or 0, _numero(costo_tanda),
+                          _numero(costo_tanda / kg if kg else 0)])
+            kilos += kg or 0
+            unidades += unds or 0
+            costo += costo_tanda
+        filas.append(["", "TOTAL", _numero(kilos), unidades, _numero(costo),
+                      _numero(costo / kilos if kilos else 0)])
+        yield _tabla(["Tanda #", "Referencia", "Kilos", "Unidades", "Costo MP", "Costo / Kg"],
+                     filas, [2 * cm, 5.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm])
+        yield Spacer(1, 0.5 * cm)
+
+        yield Paragraph("Resumen por referencia", ESTILOS["Heading2"])
+        filas = [
+            [referencia, tandas, _numero(kg), _numero(costo_ref), _numero(costo_ref / kg if kg else 0)]
+            for referencia, tandas, kg, costo_ref
+            in conn.execute(REPORTE_COSTOS_REFERENCIA_ENTRE, (fecha, fecha))
+        ]
+        yield _tabla(["Referencia", "Tandas", "Kilos", "Costo MP", "Costo / Kg"],
+                     filas, [6 * cm, 2.5 * cm, 3 * cm, 3 * cm, 3 * cm])
+        yield Spacer(1, 0.5 * cm)
+
+        yield Paragraph("Consumo de materia prima", ESTILOS["Heading2"])
+        filas = [
+            [nombre, _numero(cantidad, 3), unidad]
+            for nombre, cantidad, unidad in conn.execute(CONSUMO_DEL_DIA, (fecha,))
+        ]
+        yield _tabla(["Insumo", "Cantidad", "Unidad"], filas, [7 * cm, 3 * cm, 3 * cm])
+
+    return _generar(ruta, titulo, armar)
+
+
+# ==========================================
+# COSTOS DEL MES
+# ==========================================
+
+def reporte_costos_mes(ruta, anio, mes, incluir_historial=True):
+    """
+    Costos de materia prima del mes por referencia y por día (costos_dia)
+    y, opcionalmente, el historial de movimientos del mes completo.
+    """
+    titulo = f"Reporte de Costos - {MESES[mes - 1]} {anio}"
+    desde = f"{anio:04d}-{mes:02d}-01"
+    hasta = f"{anio:04d}-{mes:02d}-31"
+
+    def armar(doc, conn):
+        yield Paragraph(titulo, ESTILOS["Title"])
+
+        yield Paragraph("Resumen por referencia", ESTILOS["Heading2"])
+        filas = [
+            [referencia, tandas, _numero(kg), _numero(costo), _numero(costo / kg if kg else 0)]
+            for referencia, tandas, kg, costo
+            in conn.execute(REPORTE_COSTOS_REFERENCIA_ENTRE, (desde, hasta))
+        ]
+        yield _tabla(["Referencia", "Tandas", "Kilos", "Costo MP", "Costo / Kg"],
+                     filas, [8 * cm, 3 * cm, 4 * cm, 4 * cm, 4 * cm])
+        yield Spacer(1, 0.5 * cm)
+
+        yield Paragraph("Costo por kg de las tandas", ESTILOS["Heading2"])
+        nombres = dict(conn.execute(NOMBRES_REFERENCIAS))
+        filas = [
+            [nombres.get(r.referencia_id, r.referencia_id), r.tandas, _numero(r.costo_kg),
+             _numero(r.costo_kg_min), _numero(r.costo_kg_mediana), _numero(r.costo_kg_max),
+             _porcentaje(r.rendimiento), _numero(r.margen_kg)]
+            for r in por_referencia(cargar_produccion(desde, hasta, conn))
+        ]
+        yield _tabla(["Referencia", "Tandas", "Costo / Kg", "Mínimo", "Mediana", "Máximo",
+                      "Rendimiento", "Margen / Kg"],
+                     filas, [6 * cm, 2 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm, 2.5 * cm])
+        yield Spacer(1, 0.5 * cm)
+
+        yield Paragraph("Costo por día", ESTILOS["Heading2"])
+        filas = [
+            [fecha, referencia, tandas, _numero(kg), _numero(costo), _numero(costo / kg if kg else 0)]
+            for fecha, referencia, tandas, kg, costo
+            in conn.execute(REPORTE_COSTOS_ENTRE, (desde, hasta))
+        ]
+        yield _tabla(["Fecha", "Referencia", "Tandas", "Kilos", "Costo MP", "Costo / Kg"],
+                     filas, [3 * cm, 7 * cm, 2.5 * cm, 3.5 * cm, 3.5 * cm, 3.5 * cm])
+
+        if incluir_historial:
+            movimientos = (
+                [f, h, nombre[:40], tipo, _numero(cantidad, 3), _numero(costo),
+                 _numero(total), _numero(stock, 3)]
+                for f, h, nombre, tipo, cantidad, costo, total, stock
+                in conn.execute(REPORTE_HISTORIAL_ENTRE, (desde, hasta))
+            )
+            yield from _tabla_paginada(
+                doc, "Historial de movimientos",
+                ["Fecha", "Hora", "Insumo", "Tipo", "Cantidad", "Costo Unit.", "Total", "Stock"],
+                movimientos,
+                [2.5 * cm, 2 * cm, 7 * cm, 2.5 * cm, 3 * cm, 3 * cm, 3.5 * cm, 3 * cm],
+            )
+
+    return _generar(ruta, titulo, armar, pagina=landscape(A4))
@@ -0,0 +1,173 @@
+"""
+Exportación masiva de las tablas del libro para análisis fuera de la
+aplicación (contabilidad): historial de movimientos, tandas y consumo de
+materia prima por tanda, sin formato y sin el límite de filas de Excel.
+
+Cada tabla se lee por bloques del cursor y se escribe a CSV o, si están
+instalados pandas y pyarrow, a Parquet (un grupo de filas por bloque).
+Se puede limitar a un rango de fechas o pedir sólo lo nuevo desde la
+última exportación a la misma carpeta (por id; las correcciones a filas
+ya exportadas no se vuelven a sacar en ese modo).
+"""
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from ..db.conexion import lectura
+from ..db.consultas import TABLAS_EXPORTABLES, consulta_exportacion, consulta_ultimo_id
+
+TAMANO_BLOQUE = 10000
+
+# Guarda, por tabla, el último id exportado a esa carpeta
+ARCHIVO_ESTADO = ".exportacion.json"
+
+FORMATOS = ("csv", "parquet")
+
+
+class ResultadoExportacion(NamedTuple):
+    archivos: list
+    filas: int
+    segundos: float
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos else float("inf")
+
+
+def _consulta(tabla, desde, hasta, ultimo_id):
+    rango = bool(desde or hasta)
+    params = [desde or "0000-01-01", hasta or "9999-12-31"] if rango else []
+    if ultimo_id:
+        params.append(ultimo_id)
+    return consulta_exportacion(tabla, rango, bool(ultimo_id)), params
+
+
+def _bloques(cursor):
+    while True:
+        bloque = cursor.fetchmany(TAMANO_BLOQUE)
+        if not bloque:
+            return
+        yield bloque
+
+
+def _escribir_csv(ruta, columnas, bloques):
+    filas = 0
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        for bloque in bloques:
+            escritor.writerows(bloque)
+            filas += len(bloque)
+    return filas
+
+
+def _esquema_parquet(conn, tabla):
+    """Tipos de Arrow según el tipo declarado de cada columna en SQLite"""
+    import pyarrow as pa
+
+    tipos = []
+    for _, nombre, tipo, *_ in conn.execute(f"PRAGMA table_info({tabla})"):
+        tipo = tipo.upper()
+        if "INT" in tipo:
+            tipos.append((nombre, pa.int64()))
+        elif "REAL" in tipo:
+            tipos.append((nombre, pa.float64()))
+        else:
+            tipos.append((nombre, pa.string()))
+    return pa.schema(tipos)
+
+
+def _escribir_parquet(ruta, esquema, bloques):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    filas = 0
+    with pq.ParquetWriter(ruta, esquema) as escritor:
+        for bloque in bloques:
+            datos = pd.DataFrame.from_records(bloque, columns=esquema.names)
+            escritor.write_table(pa.Table.from_pandas(datos, schema=esquema, preserve_index=False))
+            filas += len(bloque)
+    return filas
+
+
+def _leer_estado(carpeta):
+    try:
+        with open(os.path.join(carpeta, ARCHIVO_ESTADO), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return {}
+
+
+def _guardar_estado(carpeta, estado):
+    descriptor, temporal = tempfile.mkstemp(suffix=".json", dir=carpeta)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo, indent=2)
+    os.replace(temporal, os.path.join(carpeta, ARCHIVO_ESTADO))
+
+
+def exportar_tablas(carpeta, formato="csv", desde=None, hasta=None, incremental=False):
+    """
+    Escribe un archivo por tabla en `carpeta`. Todas las tablas se leen en
+    una sola transacción. Con incremental=True sólo salen las filas con id
+    mayor al de la exportación anterior a esa carpeta, en archivos con la
+    hora en el nombre para no pisar los anteriores. Cada archivo se
+    escribe en un temporal y se renombra al terminar.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    if incremental and (desde or hasta):
+        # El id guardado saltaría las filas que quedaron fuera del rango
+        raise ValueError("La exportación incremental no admite rango de fechas")
+    if formato == "parquet":
+        try:
+            import pandas  # noqa: F401
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("La exportación a Parquet requiere pandas y pyarrow") from e
+
+    os.makedirs(carpeta, exist_ok=True)
+    estado = _leer_estado(carpeta) if incremental else {}
+    sufijo = datetime.now().strftime("_%Y%m%d-%H%M%S") if incremental else ""
+
+    inicio = time.perf_counter()
+    archivos, total = [], 0
+    with lectura() as conn:
+        conn.execute("BEGIN")
+        for tabla in TABLAS_EXPORTABLES:
+            ultimo_id = estado.get(tabla, 0)
+            hasta_id = conn.execute(consulta_ultimo_id(tabla)).fetchone()[0]
+            if incremental and hasta_id <= ultimo_id:
+                continue
+
+            sql, params = _consulta(tabla, desde, hasta, ultimo_id)
+            cursor = conn.execute(sql, params)
+            ruta = os.path.join(carpeta, f"{tabla}{sufijo}.{formato}")
+            descriptor, temporal = tempfile.mkstemp(suffix=f".{formato}", dir=carpeta)
+            os.close(descriptor)
+            try:
+                if formato == "csv":
+                    columnas = [c[0] for c in cursor.description]
+                    filas = _escribir_csv(temporal, columnas, _bloques(cursor))
+                else:
+                    filas = _escribir_parquet(temporal, _esquema_parquet(conn, tabla), _bloques(cursor))
+                os.replace(temporal, ruta)
+            except BaseException:
+                try:
+                    os.remove(temporal)
+                except OSError:
+                    pass
+                raise
+
+            archivos.append(ruta)
+            total += filas
+            estado[tabla] = hasta_id
+
+    if incremental:
+        _guardar_estado(carpeta, estado)
+
+    return ResultadoExportacion(archivos, total, time.perf_counter() - inicio)
@@ -1,98 +1,258 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import NamedTuple
+
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from ..db.conexion import conectar
-import sqlite3
-
-def aplicar_estilo_encabezado(ws):
-    """Aplica un diseño profesional a la primera fila"""
-    relleno_azul = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
-    fuente_blanca = Font(color="FFFFFF", bold=True)
-    alineacion = Alignment(horizontal="center", vertical="center")
-    
-    for cell in ws[1]:
-        cell.fill = relleno_azul
-        cell.font = fuente_blanca
-        cell.alignment = alineacion
-
-def exportar_excel(ruta):
-    wb = Workbook()
-    conn = None
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+from ..db.conexion import instantanea
+from ..db.consultas import (
+    EXPORT_INVENTARIO, EXPORT_TANDAS, EXPORT_COSTO_REFERENCIAS, EXPORT_HISTORIAL,
+    EXPORT_RESUMEN_MENSUAL, EXPORT_CONSUMO_MENSUAL
+)
+
+# Filas que se traen del cursor por vez; también es la muestra para el ancho de columnas
+TAMANO_BLOQUE = 1000
+# Ancho máximo de columna (caracteres): un texto largo no ensancha la hoja
+ANCHO_MAXIMO = 50
+# Bloques leídos por adelantado de cada hoja mientras se escribe otra
+BLOQUES_EN_ESPERA = 4
+
+RELLENO_ENCABEZADO = PatternFill(start_color="1F4E78", end_color="1F4E78", fill_type="solid")
+FUENTE_ENCABEZADO = Font(color="FFFFFF", bold=True)
+ALINEACION_ENCABEZADO = Alignment(horizontal="center", vertical="center")
+
+
+def _encabezado(ws, titulos):
+    """Celdas de la primera fila con el diseño del encabezado"""
+    celdas = []
+    for titulo in titulos:
+        celda = WriteOnlyCell(ws, value=titulo)
+        celda.fill = RELLENO_ENCABEZADO
+        celda.font = FUENTE_ENCABEZADO
+        celda.alignment = ALINEACION_ENCABEZADO
+        celdas.append(celda)
+    return celdas
+
+
+class TiempoHoja(NamedTuple):
+    titulo: str
+    consulta: float   # segundos hasta el primer bloque
+    lectura: float    # segundos hasta el último bloque
+    filas: int
+
+
+def _poner(cola, elemento, parar):
+    """Espera lugar en la cola salvo que se pida parar"""
+    while not parar.is_set():
+        try:
+            cola.put(elemento, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _leer_hoja(conn, titulo, consulta, cola, parar):
+    """
+    Corre en un hilo con su propia conexión: lee la hoja por bloques y
+    los deja en la cola (None al terminar, o la excepción si falla).
+    """
+    inicio = time.perf_counter()
+    consulta_s, filas = None, 0
+    try:
+        cursor = conn.execute(consulta)
+        while True:
+            bloque = cursor.fetchmany(TAMANO_BLOQUE)
+            if consulta_s is None:
+                consulta_s = time.perf_counter() - inicio
+            if not bloque or not _poner(cola, bloque, parar):
+                break
+            filas += len(bloque)
+        _poner(cola, None, parar)
+    except BaseException as e:
+        _poner(cola, e, parar)
+        raise
+    return TiempoHoja(titulo, consulta_s or 0, time.perf_counter() - inicio, filas)
+
+
+def _filas_cola(cola):
+    """Recorre las filas que va dejando el hilo lector de la hoja"""
+    while True:
+        bloque = cola.get()
+        if bloque is None:
+            return
+        if isinstance(bloque, BaseException):
+            raise bloque
+        yield from bloque
+
+
+def _escribir_hoja(wb, titulo, encabezados, filas, avance=None):
+    """
+    Escribe una hoja en modo sólo-escritura. En ese modo los anchos van
+    antes que las filas, así que se calculan sobre el primer bloque (que
+    se retiene) y el resto se escribe directo al archivo. avance(filas)
+    se llama al cerrar cada bloque y al final de la hoja.
+
+    Es a propósito: medir todas las filas obligaría a retener la hoja
+    entera en memoria o a leerla dos veces. Un valor más largo después
+    del primer bloque queda cortado en pantalla (la celda está completa),
+    y ningún ancho pasa de ANCHO_MAXIMO.
+    """
+    ws = wb.create_sheet(titulo)
+    filas = iter(filas)
+    muestra = list(islice(filas, TAMANO_BLOQUE))
+
+    anchos = [len(str(t)) for t in encabezados]
+    for fila in muestra:
+        for i, valor in enumerate(fila):
+            if valor is not None and len(str(valor)) > anchos[i]:
+                anchos[i] = len(str(valor))
+    for i, ancho in enumerate(anchos, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(ancho + 2, ANCHO_MAXIMO)
+
+    ws.append(_encabezado(ws, encabezados))
+    escritas = 0
+    for fila in chain(muestra, filas):
+        ws.append(fila)
+        escritas += 1
+        if avance is not None and escritas % TAMANO_BLOQUE == 0:
+            avance(escritas)
+    if avance is not None:
+        avance(escritas)
+    return ws
+
+
+def _propuesta_precios(filas):
+    """Costo por kilo de cada referencia más el margen sugerido"""
+    for referencia, costo_kg in filas:
+        costo_kg = costo_kg or 0
+        margen = costo_kg * 0.30  # Ejemplo 30% de ganancia
+        precio_sugerido = costo_kg + margen
+        yield [referencia, round(costo_kg, 2), round(margen, 2), round(precio_sugerido, 2)]
+
+
+class Hoja(NamedTuple):
+    titulo: str
+    encabezados: list
+    consulta: str
+    transformar: object = None   # función que recibe y devuelve las filas
+    detalle: bool = False        # filas crudas; se puede omitir
+
+
+HOJAS = [
+    Hoja("Inventario MP",
+         ["Nombre Insumo", "Unidad", "Stock Actual", "Costo Unit.", "Valor Total"],
+         EXPORT_INVENTARIO),
+    # Tablas dinámicas calculadas en SQL sobre los acumulados
+    Hoja("Resumen Mensual",
+         ["Mes", "Referencia", "Tandas", "Kilos", "Unidades", "Costo MP", "Costo / Kg"],
+         EXPORT_RESUMEN_MENSUAL),
+    Hoja("Consumo Mensual MP",
+         ["Mes", "Insumo", "Unidad", "Entradas", "Consumo", "Costo Consumo"],
+         EXPORT_CONSUMO_MENSUAL),
+    # Costo real según lo gastado en las tandas
+    Hoja("Propuesta de Precios",
+         ["Referencia", "Costo Insumos / Kg", "Margen Sugerido (30%)", "Precio Venta Sugerido"],
+         EXPORT_COSTO_REFERENCIAS, _propuesta_precios),
+    # Detalle: una fila por tanda y por movimiento
+    Hoja("Chorizos Hechos",
+         ["Fecha", "Tipo de Chorizo", "Tanda #", "Kilos", "Unidades"],
+         EXPORT_TANDAS, detalle=True),
+    Hoja("Historial de Movimientos",
+         ["Fecha", "Hora", "Insumo", "Tipo", "Cantidad", "Stock Resultante", "Referencia"],
+         EXPORT_HISTORIAL, detalle=True),
+]
+
+
+def hojas_exportadas(detalle=True):
+    """Hojas que lleva el libro, con o sin las de detalle"""
+    return [hoja for hoja in HOJAS if detalle or not hoja.detalle]
+
+
+class ResultadoExcel(NamedTuple):
+    ruta: str
+    tiempos: list     # TiempoHoja de cada hoja, en orden
+    segundos: float
+
+
+class ExportacionCancelada(Exception):
+    """El usuario canceló la exportación; no quedó ningún archivo"""
+
+
+def exportar_excel(ruta, progreso=None, cancelado=None, detalle=True):
+    """
+    Genera el libro en un temporal junto a `ruta` y lo renombra al
+    terminar, así nunca queda un .xlsx a medias ni se pisa el anterior si
+    algo falla. progreso(numero_hoja, titulo, filas) se llama por cada
+    bloque escrito; si cancelado() devuelve True se corta con
+    ExportacionCancelada. Con detalle=False se omiten las hojas de filas
+    crudas (tandas e historial) y el libro queda con los resúmenes.
+    Devuelve la ruta con los tiempos de cada hoja; los errores se
+    propagan a quien llama.
+    """
+    hojas = hojas_exportadas(detalle)
+
+    def avisar(numero, titulo, filas):
+        if cancelado is not None and cancelado():
+            raise ExportacionCancelada()
+        if progreso is not None:
+            progreso(numero, titulo, filas)
+
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(suffix=".xlsx", dir=carpeta)
+    os.close(descriptor)
+    inicio = time.perf_counter()
     try:
-        conn = conectar()
-        cursor = conn.cursor()
-
-        # ------------------ 1. INVENTARIO MATERIA PRIMA ------------------
-        ws_mp = wb.active
-        ws_mp.title = "Inventario MP"
-        ws_mp.append(["Nombre Insumo", "Unidad", "Stock Actual", "Costo Unit.", "Valor Total"])
-        cursor.execute("SELECT nombre, unidad, stock_actual, costo_unitario, (stock_actual * costo_unitario) FROM inventario_materia_prima")
-        for row in cursor.fetchall(): ws_mp.append(row)
-        aplicar_estilo_encabezado(ws_mp)
-
-        # ------------------ 2. CHORIZOS PRODUCIDOS ------------------
-        ws_ch = wb.create_sheet("Chorizos Hechos")
-        ws_ch.append(["Fecha", "Tipo de Chorizo", "Tanda #", "Kilos", "Unidades"])
-        cursor.execute("""
-            SELECT t.fecha, r.nombre, t.numero_tanda, t.cantidad_producida, t.unidades
-            FROM tandas t JOIN referencias_chorizo r ON r.id = t.referencia_id
-            ORDER BY t.fecha DESC
-        """)
-        for row in cursor.fetchall(): ws_ch.append(row)
-        aplicar_estilo_encabezado(ws_ch)
-
-        # ------------------ 3. PROPUESTA DE PRECIOS (COSTEO) ------------------
-        # Esta hoja calcula el costo real basado en lo que gastaste en las tandas
-        ws_precios = wb.create_sheet("Propuesta de Precios")
-        ws_precios.append(["Referencia", "Costo Insumos / Kg", "Margen Sugerido (30%)", "Precio Venta Sugerido"])
-        
-        cursor.execute("""
-            SELECT 
-                r.nombre,
-                AVG(tm.total / t.cantidad_producida) as costo_por_kg
-            FROM tanda_materia_prima tm
-            JOIN tandas t ON t.id = tm.tanda_id
-            JOIN referencias_chorizo r ON r.id = t.referencia_id
-            GROUP BY r.nombre
-        """)
-        
-        for row in cursor.fetchall():
-            referencia = row[0]
-            costo_kg = row[1] or 0
-            margen = costo_kg * 0.30  # Ejemplo 30% de ganancia
-            precio_sugerido = costo_kg + margen
-            ws_precios.append([referencia, round(costo_kg, 2), round(margen, 2), round(precio_sugerido, 2)])
-        
-        aplicar_estilo_encabezado(ws_precios)
-
-        # ------------------ 4. HISTORIAL DE MOVIMIENTOS ------------------
-        ws_hist = wb.create_sheet("Historial de Movimientos")
-        ws_hist.append(["Fecha", "Hora", "Insumo", "Tipo", "Cantidad", "Stock Resultante", "Referencia"])
-        cursor.execute("""
-            SELECT h.fecha, h.hora, i.nombre, h.tipo_movimiento, h.cantidad, h.stock_resultante, h.referencia
-            FROM historial_inventario_materia_prima h
-            JOIN inventario_materia_prima i ON i.id = h.materia_prima_id
-            ORDER BY h.fecha DESC, h.hora DESC
-        """)
-        for row in cursor.fetchall(): ws_hist.append(row)
-        aplicar_estilo_encabezado(ws_hist)
-
-        # Ajustar ancho de columnas automáticamente
-        for sheet in wb.worksheets:
-            for col in sheet.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except: pass
-                sheet.column_dimensions[column].width = max_length + 2
-
-        wb.save(ruta)
-        return True
-
-    except Exception as e:
-        print(f"Error detallado: {e}")
-        return False
-    finally:
-        if conn: conn.close()
\ No newline at end of file
+        # Modo sólo-escritura: las filas van directo al archivo, la memoria no crece con el historial
+        wb = Workbook(write_only=True)
+        tiempos = _llenar_hojas(wb, hojas, avisar)
+
+        avisar(len(hojas), "Guardando", 0)
+        wb.save(temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    return ResultadoExcel(ruta, tiempos, time.perf_counter() - inicio)
+
+
+def _llenar_hojas(wb, hojas, avisar):
+    """
+    Cada hoja se consulta en su propio hilo y conexión, todas sobre la
+    misma versión de la base (instantanea), así las hojas son coherentes
+    entre sí y el tiempo total lo marca la consulta más lenta en lugar de
+    la suma. El libro se escribe en orden a medida que llegan los bloques.
+    Devuelve los tiempos de cada hoja.
+    """
+    parar = threading.Event()
+    colas = [queue.Queue(BLOQUES_EN_ESPERA) for _ in hojas]
+    with instantanea(len(hojas)) as conexiones, ThreadPoolExecutor(len(hojas)) as hilos:
+        lecturas = [
+            hilos.submit(_leer_hoja, conn, hoja.titulo, hoja.consulta, cola, parar)
+            for conn, cola, hoja in zip(conexiones, colas, hojas)
+        ]
+        try:
+            for numero, hoja in enumerate(hojas):
+                avisar(numero, hoja.titulo, 0)
+                filas = _filas_cola(colas[numero])
+                if hoja.transformar is not None:
+                    filas = hoja.transformar(filas)
+                _escribir_hoja(wb, hoja.titulo, hoja.encabezados, filas,
+                               lambda escritas: avisar(numero, hoja.titulo, escritas))
+        except BaseException:
+            # Cancelación o error: cortar las consultas que sigan corriendo
+            parar.set()
+            for conn in conexiones:
+                conn.interrupt()
+            raise
+        return [lectura.result() for lectura in lecturas]
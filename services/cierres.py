@@ -0,0 +1,106 @@
+"""
+Cierres de inventario y stock a una fecha.
+
+Un cierre guarda stock y costo unitario de cada materia prima al final
+de un día. El stock a cualquier fecha parte del cierre más cercano
+anterior y reproduce sólo los movimientos posteriores, así que su costo
+depende de los movimientos desde ese cierre y no del tamaño del
+historial. Los triggers del historial borran los cierres que un
+movimiento atrasado deja desactualizados.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional
+import sqlite3
+
+from ..db.conexion import lectura, transaccion
+from ..db.consultas import (
+    ULTIMO_CIERRE, MOVIMIENTOS_ENTRE, CIERRES_PENDIENTES_DESDE, MATERIAS_PRIMAS_POR_ID
+)
+from ..utils.calculos import reproducir_movimientos
+
+
+class Existencia(NamedTuple):
+    stock: float
+    costo_unitario: float
+
+    @property
+    def valor(self) -> float:
+        return self.stock * self.costo_unitario
+
+
+def stock_a_fecha(fecha: str, conn: Optional[sqlite3.Connection] = None) -> Dict[int, Existencia]:
+    """
+    Stock y valorización de todas las materias primas al cierre de `fecha`
+    ('YYYY-MM-DD', incluye los movimientos de ese día).
+    """
+    if conn is None:
+        with lectura() as conn:
+            conn.execute("BEGIN")   # Cierres y movimientos de la misma foto
+            return stock_a_fecha(fecha, conn)
+
+    existencias = {}
+    for materia_id, _ in conn.execute(MATERIAS_PRIMAS_POR_ID).fetchall():
+        cierre = conn.execute(ULTIMO_CIERRE, (materia_id, fecha)).fetchone()
+        desde, stock, costo = cierre if cierre else ("", 0.0, 0.0)
+        movimientos = conn.execute(MOVIMIENTOS_ENTRE, (materia_id, desde, fecha))
+        existencias[materia_id] = Existencia(*reproducir_movimientos(stock, costo, movimientos))
+    return existencias
+
+
+def cerrar_dia(fecha: str, conn: Optional[sqlite3.Connection] = None) -> Dict[int, Existencia]:
+    """Guarda (o rehace) el cierre de un día"""
+    with transaccion(conn) as conn:
+        existencias = stock_a_fecha(fecha, conn)
+        conn.executemany("""
+            INSERT OR REPLACE INTO cierres_inventario (materia_prima_id, fecha, stock, costo_unitario)
+            VALUES (?, ?, ?, ?)
+        """, [(materia_id, fecha, e.stock, e.costo_unitario) for materia_id, e in existencias.items()])
+    return existencias
+
+
+def _fechas_pendientes(desde: date, hasta: date) -> List[str]:
+    """Fines de mes entre desde y hasta, más el propio hasta"""
+    fechas = []
+    mes = date(desde.year, desde.month, 1)
+    while True:
+        siguiente = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        fin_de_mes = siguiente - timedelta(days=1)
+        if fin_de_mes >= hasta:
+            break
+        if fin_de_mes >= desde:
+            fechas.append(fin_de_mes.isoformat())
+        mes = siguiente
+    fechas.append(hasta.isoformat())
+    return fechas
+
+
+def _pendientes(hasta: date, conn: sqlite3.Connection) -> List[str]:
+    """Fechas a cerrar hasta `hasta`; vacía si ya está al día"""
+    # El más atrasado: un movimiento con fecha vieja pudo invalidar los
+    # cierres recientes de una sola materia
+    desde = conn.execute(CIERRES_PENDIENTES_DESDE).fetchone()[0]
+    if desde is None or date.fromisoformat(desde) > hasta:
+        return []
+    return _fechas_pendientes(date.fromisoformat(desde), hasta)
+
+
+def cerrar_pendientes(hasta: Optional[str] = None,
+                      conn: Optional[sqlite3.Connection] = None) -> List[str]:
+    """
+    Cierra los fines de mes que falten desde el último cierre y el día
+    `hasta` (por defecto ayer). Cada cierre parte del anterior. Devuelve
+    las fechas cerradas; si ya está al día no escribe nada.
+    """
+    hasta = date.fromisoformat(hasta) if hasta else date.today() - timedelta(days=1)
+    if conn is None:
+        # Lo normal al arrancar es estar al día: se comprueba con un lector,
+        # sin tomar la escritura
+        with lectura() as lector:
+            if not _pendientes(hasta, lector):
+                return []
+    with transaccion(conn) as conn:
+        # Otra vez dentro de la escritura, por si otro proceso cerró mientras tanto
+        fechas = _pendientes(hasta, conn)
+        for fecha in fechas:
+            cerrar_dia(fecha, conn)
+    return fechas
@@ -0,0 +1,106 @@
+"""
+Recosteo de materias primas cuando cambia el pasado del libro.
+
+Una entrada cargada con fecha atrasada o corregida cambia el costo
+promedio de todas las salidas posteriores. Aquí se registran esos
+movimientos y se recostea la materia prima desde el primer día afectado:
+se parte del último cierre anterior (services/cierres.py) y se reproduce
+el libro con utils.calculos.recostear, corrigiendo el historial, los
+consumos de las tandas y el costo vigente del inventario.
+"""
+from datetime import date, timedelta
+from typing import Optional
+import sqlite3
+
+from ..db.conexion import transaccion
+from ..db.consultas import (
+    ULTIMO_CIERRE, LIBRO_DESDE, MOVIMIENTO_HISTORIAL, RECOSTEAR_HISTORIAL,
+    RECOSTEAR_TANDA_MP, CORREGIR_HISTORIAL, CORREGIR_TANDA_MP, STOCK_MATERIA
+)
+from ..utils.calculos import recostear
+from .inventario import INSERTAR_ENTRADA
+
+def recostear_materia(materia_id: int, fecha: str, desde_id: Optional[int] = None,
+                      conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Recostea una materia prima a partir de `fecha` (primer día afectado).
+    Devuelve cuántos movimientos del historial cambiaron.
+    """
+    dia_anterior = (date.fromisoformat(fecha) - timedelta(days=1)).isoformat()
+    with transaccion(conn) as conn:
+        cierre = conn.execute(ULTIMO_CIERRE, (materia_id, dia_anterior)).fetchone()
+        desde, stock, costo = cierre if cierre else ("", 0.0, 0.0)
+        movimientos = conn.execute(LIBRO_DESDE, (materia_id, desde))
+        cambios, stock, costo = recostear(stock, costo, movimientos, desde_id)
+
+        if cambios:
+            conn.executemany(RECOSTEAR_HISTORIAL, [(costo_u, total, anterior, resultante, id_)
+                  for id_, costo_u, total, anterior, resultante in cambios])
+            # Los consumos de las tandas siguen a su salida del historial
+            conn.executemany(RECOSTEAR_TANDA_MP, [(costo_u, total, id_) for id_, costo_u, total, _, _ in cambios])
+        conn.execute(
+            "UPDATE inventario_materia_prima SET costo_unitario = ? WHERE id = ?",
+            (costo, materia_id)
+        )
+    return len(cambios)
+
+
+def registrar_entrada(materia_id: int, cantidad: float, costo: float, fecha: str,
+                      hora: str = "23:59:59", referencia: str = "Entrada con fecha atrasada",
+                      conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Entrada de stock con fecha (y hora) del pasado. Suma al stock actual
+    y recostea desde esa fecha. Devuelve el id del movimiento.
+    """
+    if cantidad <= 0 or costo <= 0:
+        raise ValueError("La cantidad y el costo deben ser mayores a 0")
+    with transaccion(conn) as conn:
+        if conn.execute("""
+            UPDATE inventario_materia_prima SET stock_actual = stock_actual + ?
+            WHERE id = ?
+        """, (cantidad, materia_id)).rowcount == 0:
+            raise ValueError(f"La materia prima {materia_id} no existe")
+        # Stock anterior y resultante los completa el recosteo
+        id_ = conn.execute(INSERTAR_ENTRADA + " RETURNING id", (
+            materia_id, fecha, hora, cantidad, costo, cantidad * costo, 0, 0, referencia
+        )).fetchone()[0]
+        recostear_materia(materia_id, fecha, id_, conn)
+    return id_
+
+
+def corregir_movimiento(historial_id: int, cantidad: Optional[float] = None,
+                        costo: Optional[float] = None,
+                        conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    Corrige la cantidad (entradas y salidas) o el costo de compra (sólo
+    entradas) de un movimiento, ajusta el stock actual por la diferencia
+    y recostea desde su fecha. Devuelve cuántos movimientos cambiaron.
+    Si el ajuste dejaría el stock negativo (una salida mayor o una entrada
+    menor) no se modifica nada y se lanza ValueError.
+    """
+    with transaccion(conn) as conn:
+        fila = conn.execute(MOVIMIENTO_HISTORIAL, (historial_id,)).fetchone()
+        if fila is None:
+            raise ValueError(f"El movimiento {historial_id} no existe")
+        materia_id, fecha, tipo, cantidad_vieja, costo_viejo = fila
+        if costo is not None and tipo != "ENTRADA":
+            raise ValueError("Sólo se puede corregir el costo de una entrada")
+        cantidad = cantidad_vieja if cantidad is None else cantidad
+        costo = costo_viejo if costo is None else costo
+        if cantidad <= 0 or costo <= 0:
+            raise ValueError("La cantidad y el costo deben ser mayores a 0")
+
+        diferencia = cantidad - cantidad_vieja
+        ajuste = diferencia if tipo == "ENTRADA" else -diferencia
+        # Condicional, como el descuento de consumir()
+        if conn.execute("""
+            UPDATE inventario_materia_prima SET stock_actual = stock_actual + ?
+            WHERE id = ? AND stock_actual + ? >= 0
+        """, (ajuste, materia_id, ajuste)).rowcount == 0:
+            disponible = conn.execute(STOCK_MATERIA, (materia_id,)).fetchone()[0]
+            raise ValueError(f"La corrección dejaría el stock negativo: hay {disponible:.3f} kg "
+                             f"y se descontarían {-ajuste:.3f} kg")
+        conn.execute(CORREGIR_HISTORIAL, (cantidad, costo, cantidad * costo, historial_id))
+        if tipo == "SALIDA":
+            conn.execute(CORREGIR_TANDA_MP, (cantidad, cantidad * costo, historial_id))
+        return recostear_materia(materia_id, fecha, None, conn)
@@ -0,0 +1,225 @@
+"""
+Importación de entradas de stock desde las planillas de los proveedores.
+
+Formato: una fila de encabezado y luego una fila por entrada, con las
+columnas materia (nombre o id de la materia prima), cantidad y costo
+(costo unitario de la entrada). Se aceptan CSV (coma o punto y coma) y
+XLSX. Todas las filas se validan antes de escribir: si alguna tiene
+errores no se importa nada.
+"""
+import csv
+import math
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+import sqlite3
+
+from ..db.conexion import lectura, transaccion
+from ..db.consultas import MATERIAS_PRIMAS_POR_ID
+from .inventario import recibir_lote
+
+# Nombres aceptados para cada columna del encabezado
+COLUMNAS = {
+    "materia": {"materia", "materia prima", "materia_prima", "insumo", "id"},
+    "cantidad": {"cantidad", "kg", "cantidad (kg)"},
+    "costo": {"costo", "costo unitario", "costo_unitario", "precio"},
+}
+
+
+class ErrorImportacion(Exception):
+    """La planilla tiene filas inválidas; no se importó nada"""
+
+    def __init__(self, errores: List[str]):
+        self.errores = errores
+        super().__init__(f"{len(errores)} filas con errores")
+
+
+class ResultadoImportacion(NamedTuple):
+    filas: int
+    segundos: float
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos else float("inf")
+
+
+# ==========================================
+# LECTURA DE FILAS
+# ==========================================
+
+def _filas_csv(ruta: Path) -> Iterator[Sequence]:
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+        muestra = archivo.read(4096)
+        archivo.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        yield from csv.reader(archivo, dialecto)
+
+
+def _filas_xlsx(ruta: Path) -> Iterator[Sequence]:
+    from openpyxl import load_workbook
+
+    # Modo solo lectura: las filas se leen a medida que se recorren
+    wb = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def leer_filas(ruta) -> Iterator[Sequence]:
+    ruta = Path(ruta)
+    if ruta.suffix.lower() in (".xlsx", ".xlsm"):
+        return _filas_xlsx(ruta)
+    return _filas_csv(ruta)
+
+
+# ==========================================
+# VALIDACIÓN
+# ==========================================
+
+# Formato de la planta: coma decimal y punto de miles ("1.234,56");
+# los puntos tienen que agrupar de a tres cifras
+_NUMERO = re.compile(r"-?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?")
+
+
+def _celda(fila: Sequence, posicion: int):
+    """
+    Valor de la celda, o None si está vacía o la fila es más corta.
+    Un id leído del XLSX como número entero (12.0) vuelve a ser 12.
+
+    >>> _celda(("  ", None, 12.0, 2.5), 0), _celda(("a",), 3)
+    (None, None)
+    >>> _celda(("  ", None, 12.0, 2.5), 2), _celda(("  ", None, 12.0, 2.5), 3)
+    (12, 2.5)
+    """
+    valor = fila[posicion] if posicion < len(fila) else None
+    if isinstance(valor, str):
+        valor = valor.strip()
+    elif isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return None if valor in (None, "") else valor
+
+
+def _numero(valor) -> float:
+    """
+    Convierte una celda a número. Las celdas numéricas (XLSX) pasan tal
+    cual; el texto se lee con coma decimal y punto de miles, y si los
+    separadores no calzan con ese formato se rechaza en lugar de adivinar.
+
+    >>> _numero("$ 24.000"), _numero("1.234,56"), _numero("24,5"), _numero(12)
+    (24000.0, 1234.56, 24.5, 12.0)
+    >>> _numero("12.5")
+    Traceback (most recent call last):
+    ValueError: separadores ambiguos en '12.5'
+    >>> _numero("1,234.56")
+    Traceback (most recent call last):
+    ValueError: separadores ambiguos en '1,234.56'
+    >>> _numero("inf")
+    Traceback (most recent call last):
+    ValueError: separadores ambiguos en 'inf'
+    >>> _numero(" $ ")
+    Traceback (most recent call last):
+    ValueError: valor vacío
+    """
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor or "").strip().replace("$", "").replace(" ", "")
+    if not texto:
+        raise ValueError("valor vacío")
+    if not _NUMERO.fullmatch(texto):
+        raise ValueError(f"separadores ambiguos en '{valor}'")
+    return float(texto.replace(".", "").replace(",", "."))
+
+
+def _posiciones(encabezado: Sequence) -> Dict[str, int]:
+    nombres = [str(c or "").strip().lower() for c in encabezado]
+    posiciones = {}
+    for columna, alias in COLUMNAS.items():
+        for i, nombre in enumerate(nombres):
+            if nombre in alias:
+                posiciones[columna] = i
+                break
+        else:
+            raise ErrorImportacion([f"Falta la columna '{columna}' en el encabezado"])
+    return posiciones
+
+
+def validar(filas: Iterator[Sequence], materias: Dict[str, int]):
+    """
+    Convierte las filas en entradas (materia_id, cantidad, costo).
+    `materias` traduce nombre en minúsculas (o id como texto) a id.
+    Devuelve la lista de entradas; si hay errores lanza ErrorImportacion
+    con todos ellos.
+    """
+    filas = iter(filas)
+    try:
+        posiciones = _posiciones(next(filas))
+    except StopIteration:
+        raise ErrorImportacion(["El archivo está vacío"])
+
+    entradas, errores = [], []
+    for linea, fila in enumerate(filas, start=2):
+        if not any(c not in (None, "") for c in fila):
+            continue  # Fila en blanco
+        valores = {columna: _celda(fila, posicion) for columna, posicion in posiciones.items()}
+        faltan = [columna for columna, valor in valores.items() if valor is None]
+        if faltan:
+            errores.append(f"Línea {linea}: falta {', '.join(faltan)}")
+            continue
+        try:
+            materia = str(valores["materia"])
+            cantidad = _numero(valores["cantidad"])
+            costo = _numero(valores["costo"])
+        except ValueError as e:
+            errores.append(f"Línea {linea}: {e} (use coma decimal, p. ej. 1.234,56)")
+            continue
+        materia_id = materias.get(materia.lower())
+        if materia_id is None:
+            errores.append(f"Línea {linea}: materia prima desconocida '{materia}'")
+        elif not (math.isfinite(cantidad) and math.isfinite(costo)):
+            errores.append(f"Línea {linea}: la cantidad y el costo deben ser números finitos")
+        elif cantidad <= 0 or costo <= 0:
+            errores.append(f"Línea {linea}: la cantidad y el costo deben ser mayores a 0")
+        else:
+            entradas.append((materia_id, cantidad, costo))
+
+    if errores:
+        raise ErrorImportacion(errores)
+    return entradas
+
+
+def _materias(conn) -> Dict[str, int]:
+    materias = {}
+    for id_, nombre in conn.execute(MATERIAS_PRIMAS_POR_ID):
+        materias[str(id_)] = id_
+        materias[nombre.strip().lower()] = id_
+    return materias
+
+
+# ==========================================
+# IMPORTACIÓN
+# ==========================================
+
+def importar_entradas(ruta, conn: Optional[sqlite3.Connection] = None) -> ResultadoImportacion:
+    """
+    Importa una planilla de entradas en una sola transacción: costo
+    promedio ponderado aplicado en el orden del archivo y todas las filas
+    ENTRADA del historial escritas con executemany.
+    """
+    inicio = time.perf_counter()
+    # El archivo se lee y valida antes de tomar el candado de escritura
+    if conn is None:
+        with lectura() as lector:
+            materias = _materias(lector)
+    else:
+        materias = _materias(conn)
+    entradas = validar(leer_filas(ruta), materias)
+
+    with transaccion(conn) as conn:
+        if entradas:
+            recibir_lote(entradas, f"Importación {Path(ruta).name}", conn)
+    return ResultadoImportacion(len(entradas), time.perf_counter() - inicio)
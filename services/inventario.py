@@ -0,0 +1,185 @@
+"""
+Operaciones de inventario de materia prima, sin dependencias de Qt.
+
+Cada función acepta una conexión opcional: si se entrega, trabaja dentro
+de la transacción del llamador; si no, abre su propia transacción de
+escritura (BEGIN IMMEDIATE).
+"""
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+import sqlite3
+
+from ..db.conexion import transaccion
+from ..db.consultas import consulta_estado_materias, STOCK_MATERIA, INSERTAR_SALIDA
+from ..utils.calculos import costo_promedio_ponderado
+
+
+class StockInsuficiente(Exception):
+    """No hay stock suficiente; no se modificó nada"""
+
+    def __init__(self, materia_id: int, solicitado: float, disponible: Optional[float]):
+        self.materia_id = materia_id
+        self.solicitado = solicitado
+        self.disponible = disponible
+        if disponible is None:
+            mensaje = f"La materia prima {materia_id} no existe"
+        else:
+            mensaje = (f"Stock insuficiente: se pidieron {solicitado:.3f} kg "
+                       f"y hay {disponible:.3f} kg")
+        super().__init__(mensaje)
+
+
+class Recepcion(NamedTuple):
+    materia_id: int
+    cantidad: float
+    costo_unitario: float        # Costo de esta entrada
+    costo_promedio: float        # Costo del inventario después de la entrada
+    stock_anterior: float
+    stock_resultante: float
+
+
+class Consumo(NamedTuple):
+    nombre: str
+    cantidad: float
+    costo_unitario: float
+    total: float
+    stock_anterior: float
+    stock_resultante: float
+
+
+def _ahora():
+    ahora = datetime.now()
+    return ahora.strftime("%Y-%m-%d"), ahora.strftime("%H:%M:%S")
+
+
+# ==========================================
+# ENTRADAS DE STOCK
+# ==========================================
+
+INSERTAR_ENTRADA = """
+    INSERT INTO historial_inventario_materia_prima (
+        materia_prima_id, fecha, hora, tipo_movimiento,
+        cantidad, costo_unitario, total,
+        stock_anterior, stock_resultante, referencia
+    ) VALUES (?, ?, ?, 'ENTRADA', ?, ?, ?, ?, ?, ?)
+"""
+
+
+def recibir(materia_id: int, cantidad: float, costo: float,
+            referencia: str = "Carga manual de stock",
+            conn: Optional[sqlite3.Connection] = None) -> Recepcion:
+    """Entrada de stock con recálculo del costo promedio ponderado"""
+    return recibir_lote([(materia_id, cantidad, costo)], referencia, conn)[0]
+
+
+def recibir_lote(entradas: Iterable[Tuple[int, float, float]],
+                 referencia: str = "Carga manual de stock",
+                 conn: Optional[sqlite3.Connection] = None) -> List[Recepcion]:
+    """
+    Varias entradas (materia_id, cantidad, costo) en una sola transacción.
+    Se aplican en orden, así que varias entradas de la misma materia prima
+    encadenan su promedio ponderado. Cada materia se lee y se actualiza una
+    sola vez, y el historial se escribe con executemany.
+    """
+    entradas = list(entradas)
+    for materia_id, cantidad, costo in entradas:
+        if cantidad <= 0 or costo <= 0:
+            raise ValueError("La cantidad y el costo deben ser mayores a 0")
+
+    with transaccion(conn) as conn:
+        ids = sorted({materia_id for materia_id, _, _ in entradas})
+        estado = {
+            id_: (stock, costo)
+            for id_, stock, costo in conn.execute(consulta_estado_materias(len(ids)), ids)
+        }
+        faltantes = set(ids) - estado.keys()
+        if faltantes:
+            raise ValueError(f"Materias primas inexistentes: {sorted(faltantes)}")
+
+        recepciones = []
+        for materia_id, cantidad, costo in entradas:
+            stock_anterior, costo_actual = estado[materia_id]
+            stock_total = stock_anterior + cantidad
+            promedio = costo_promedio_ponderado(stock_anterior, costo_actual, cantidad, costo)
+            estado[materia_id] = (stock_total, promedio)
+            recepciones.append(
+                Recepcion(materia_id, cantidad, costo, promedio, stock_anterior, stock_total)
+            )
+
+        conn.executemany("""
+            UPDATE inventario_materia_prima
+            SET stock_actual = ?, costo_unitario = ?
+            WHERE id = ?
+        """, [(stock, costo, id_) for id_, (stock, costo) in estado.items()])
+
+        fecha, hora = _ahora()
+        conn.executemany(INSERTAR_ENTRADA, [
+            (r.materia_id, fecha, hora, r.cantidad, r.costo_unitario,
+             r.cantidad * r.costo_unitario, r.stock_anterior, r.stock_resultante, referencia)
+            for r in recepciones
+        ])
+    return recepciones
+
+
+# ==========================================
+# CONSUMO EN TANDAS
+# ==========================================
+
+def consumir(tanda_id: int, materia_id: int, cantidad: float,
+             conn: Optional[sqlite3.Connection] = None) -> Consumo:
+    """
+    Descuenta `cantidad` de una materia prima para una tanda y deja el
+    movimiento en tanda_materia_prima y en el historial.
+
+    El descuento es condicional (WHERE stock_actual >= ?): si otra
+    terminal consumió antes, no se toca nada y se lanza StockInsuficiente.
+    No hace falta leer el stock antes; el costo y el stock resultante
+    vuelven del mismo UPDATE.
+    """
+    if cantidad <= 0:
+        raise ValueError("La cantidad debe ser mayor a 0")
+
+    with transaccion(conn) as conn:
+        fila = conn.execute("""
+            UPDATE inventario_materia_prima
+            SET stock_actual = stock_actual - ?
+            WHERE id = ? AND stock_actual >= ?
+            RETURNING nombre, costo_unitario, stock_actual
+        """, (cantidad, materia_id, cantidad)).fetchone()
+
+        if fila is None:
+            # Sólo en el caso de error: para informar cuánto hay
+            disponible = conn.execute(STOCK_MATERIA, (materia_id,)).fetchone()
+            raise StockInsuficiente(materia_id, cantidad, disponible and disponible[0])
+
+        nombre, costo, stock_resultante = fila
+        total = cantidad * costo
+        stock_anterior = stock_resultante + cantidad
+
+        fecha, hora = _ahora()
+        historial = conn.execute(INSERTAR_SALIDA, (
+            fecha, hora, materia_id, cantidad, costo, total,
+            stock_anterior, stock_resultante, tanda_id
+        )).fetchone()
+        if historial is None:
+            raise ValueError(f"La tanda {tanda_id} no existe")
+
+        # Enlazado a su salida del historial para poder recostearlo (services/costeo.py)
+        conn.execute("""
+            INSERT INTO tanda_materia_prima
+            (tanda_id, materia_prima_id, cantidad_usada, costo_unitario, total, historial_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (tanda_id, materia_id, cantidad, costo, total, historial[0]))
+
+    return Consumo(nombre, cantidad, costo, total, stock_anterior, stock_resultante)
+
+
+def consumir_lote(consumos: Iterable[Tuple[int, int, float]],
+                  conn: Optional[sqlite3.Connection] = None) -> List[Consumo]:
+    """
+    Varios consumos (tanda_id, materia_id, cantidad) en una transacción:
+    si a uno le falta stock no se aplica ninguno.
+    """
+    with transaccion(conn) as conn:
+        return [consumir(tanda_id, materia_id, cantidad, conn)
+                for tanda_id, materia_id, cantidad in consumos]
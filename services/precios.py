@@ -0,0 +1,25 @@
+"""Precios de venta por día, sin dependencias de Qt"""
+from typing import Mapping, Optional
+import sqlite3
+
+from ..db.conexion import transaccion
+from ..db.consultas import BORRAR_PRECIOS_DIA
+
+
+def guardar_precios(fecha: str, precios: Mapping[int, float],
+                    conn: Optional[sqlite3.Connection] = None) -> None:
+    """Reemplaza los precios de venta del día: {referencia_id: precio}"""
+    with transaccion(conn) as conn:
+        conn.execute(BORRAR_PRECIOS_DIA, (fecha,))
+        conn.executemany("""
+            INSERT INTO precio_chorizo_dia (fecha, referencia_id, precio_venta)
+            VALUES (?, ?, ?)
+        """, [(fecha, ref_id, precio) for ref_id, precio in precios.items()])
+
+
+def guardar_precios_lote(por_fecha: Mapping[str, Mapping[int, float]],
+                         conn: Optional[sqlite3.Connection] = None) -> None:
+    """Precios de varios días en una sola transacción: {fecha: {referencia_id: precio}}"""
+    with transaccion(conn) as conn:
+        for fecha, precios in por_fecha.items():
+            guardar_precios(fecha, precios, conn)
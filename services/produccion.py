@@ -0,0 +1,49 @@
+"""
+Operaciones sobre tandas de producción, sin dependencias de Qt.
+
+Con `conn` trabajan dentro de la transacción del llamador; sin ella
+abren la suya. Un número de tanda repetido para la misma referencia y
+fecha lanza sqlite3.IntegrityError (índice único de tandas).
+"""
+from typing import Iterable, List, NamedTuple, Optional
+import sqlite3
+
+from ..db.conexion import transaccion
+
+
+class Tanda(NamedTuple):
+    fecha: str
+    numero_tanda: int
+    referencia_id: int
+    cantidad_producida: float
+    unidades: int = 0
+    id: Optional[int] = None      # None = tanda nueva
+
+
+def guardar_tanda(tanda: Tanda, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Crea la tanda (sin id) o actualiza la existente; devuelve su id"""
+    with transaccion(conn) as conn:
+        if tanda.id is not None:
+            conn.execute("""
+                UPDATE tandas SET numero_tanda=?, referencia_id=?, cantidad_producida=?, unidades=?
+                WHERE id=?
+            """, (tanda.numero_tanda, tanda.referencia_id,
+                  tanda.cantidad_producida, tanda.unidades, tanda.id))
+            return tanda.id
+        return conn.execute("""
+            INSERT INTO tandas (fecha, numero_tanda, referencia_id, cantidad_producida, unidades)
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING id
+        """, (tanda.fecha, tanda.numero_tanda, tanda.referencia_id,
+              tanda.cantidad_producida, tanda.unidades)).fetchone()[0]
+
+
+def guardar_tandas(tandas: Iterable[Tanda], conn: Optional[sqlite3.Connection] = None) -> List[int]:
+    """Varias tandas en una sola transacción (todas o ninguna)"""
+    with transaccion(conn) as conn:
+        return [guardar_tanda(tanda, conn) for tanda in tandas]
+
+
+def eliminar_tanda(tanda_id: int, conn: Optional[sqlite3.Connection] = None) -> None:
+    with transaccion(conn) as conn:
+        conn.execute("DELETE FROM tandas WHERE id=?", (tanda_id,))
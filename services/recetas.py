@@ -0,0 +1,83 @@
+"""
+Recetas por referencia de chorizo (kg de cada materia prima por kg
+producido) y su aplicación a tandas.
+
+Aplicar una receta descuenta todas sus materias primas en una sola
+transacción con services.inventario.consumir: si a alguna le falta
+stock se lanza StockInsuficiente y no se descuenta nada.
+"""
+from typing import Dict, List, Mapping, Optional
+import sqlite3
+
+from ..db.conexion import lectura, transaccion
+from ..db.consultas import (
+    RECETA_DE_REFERENCIA, BORRAR_RECETA, KILOS_DE_TANDA, USO_POR_MATERIA_DE_TANDA,
+    CONSUMOS_RECETA_TANDA, TANDA_CON_MATERIA_PRIMA, CONSUMOS_RECETAS_DEL_DIA
+)
+from .inventario import Consumo, consumir
+
+def obtener_receta(referencia_id: int, conn: Optional[sqlite3.Connection] = None) -> Dict[int, float]:
+    """{materia_prima_id: kg por kg producido}; vacío si no tiene receta"""
+    if conn is None:
+        with lectura() as conn:
+            return obtener_receta(referencia_id, conn)
+    return dict(conn.execute(RECETA_DE_REFERENCIA, (referencia_id,)))
+
+
+def guardar_receta(referencia_id: int, receta: Mapping[int, float],
+                   conn: Optional[sqlite3.Connection] = None) -> None:
+    """Reemplaza la receta de la referencia"""
+    with transaccion(conn) as conn:
+        conn.execute(BORRAR_RECETA, (referencia_id,))
+        conn.executemany(
+            "INSERT INTO recetas (referencia_id, materia_prima_id, kg_por_kg) VALUES (?, ?, ?)",
+            [(referencia_id, materia_id, kg) for materia_id, kg in receta.items() if kg > 0]
+        )
+
+
+def receta_desde_tanda(tanda_id: int, conn: Optional[sqlite3.Connection] = None) -> Dict[int, float]:
+    """
+    Guarda como receta de su referencia lo que se usó en una tanda
+    (kg usados / kg producidos). Devuelve la receta guardada.
+    """
+    with transaccion(conn) as conn:
+        fila = conn.execute(KILOS_DE_TANDA, (tanda_id,)).fetchone()
+        if fila is None or not fila[1]:
+            raise ValueError("La tanda no existe o no tiene kilos producidos")
+        referencia_id, kilos = fila
+        receta = {
+            materia_id: usado / kilos
+            for materia_id, usado in conn.execute(USO_POR_MATERIA_DE_TANDA, (tanda_id,))
+        }
+        if not receta:
+            raise ValueError("La tanda no tiene materia prima asignada")
+        guardar_receta(referencia_id, receta, conn)
+    return receta
+
+
+def aplicar_receta(tanda_id: int, conn: Optional[sqlite3.Connection] = None) -> List[Consumo]:
+    """
+    Descuenta la receta de la referencia según los kg de la tanda. Si la
+    tanda ya tiene materia prima asignada lanza ValueError (la receta se
+    descontaría dos veces), como lo filtra aplicar_recetas_dia.
+    """
+    with transaccion(conn) as conn:
+        if conn.execute(TANDA_CON_MATERIA_PRIMA, (tanda_id,)).fetchone():
+            raise ValueError("La tanda ya tiene materia prima asignada")
+        consumos = conn.execute(CONSUMOS_RECETA_TANDA, (tanda_id,)).fetchall()
+        if not consumos:
+            raise ValueError("La referencia de la tanda no tiene receta")
+        return [consumir(tanda_id, materia_id, cantidad, conn)
+                for materia_id, cantidad in consumos]
+
+
+def aplicar_recetas_dia(fecha: str, conn: Optional[sqlite3.Connection] = None) -> Dict[int, List[Consumo]]:
+    """
+    Aplica su receta a cada tanda del día que aún no tiene materia prima
+    asignada, todo en una transacción. Devuelve {tanda_id: consumos}.
+    """
+    aplicados: Dict[int, List[Consumo]] = {}
+    with transaccion(conn) as conn:
+        for tanda_id, materia_id, cantidad in conn.execute(CONSUMOS_RECETAS_DEL_DIA, (fecha,)).fetchall():
+            aplicados.setdefault(tanda_id, []).append(consumir(tanda_id, materia_id, cantidad, conn))
+    return aplicados
@@ -0,0 +1,14 @@
+import pytest
+
+from ..db import conexion
+from ..db.migraciones import migrar
+
+
+@pytest.fixture
+def base(tmp_path):
+    """Base vacía con todas las migraciones, en una carpeta temporal"""
+    ruta = tmp_path / "data.db"
+    conexion.configurar(ruta)
+    migrar()
+    yield ruta
+    conexion.cerrar()
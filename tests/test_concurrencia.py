@@ -0,0 +1,67 @@
+"""
+Consumo de la misma materia prima desde varios procesos (varias
+terminales sobre la misma base): el descuento condicional de consumir()
+no puede dejar el stock negativo ni perder o duplicar consumos.
+"""
+import multiprocessing
+from datetime import date
+
+import pytest
+
+from ..db.conexion import configurar, cerrar, lectura, transaccion
+from ..services.inventario import consumir, recibir, StockInsuficiente
+from ..services.produccion import Tanda, guardar_tanda
+
+PROCESOS = 6
+STOCK = 100.0
+CANTIDAD = 0.5
+
+
+def _consumir_hasta_agotar(argumentos):
+    """Un proceso: consume hasta que no queda stock; devuelve los exitosos"""
+    ruta, tanda_id, materia_id = argumentos
+    configurar(ruta)
+    exitos = 0
+    try:
+        while True:
+            try:
+                consumir(tanda_id, materia_id, CANTIDAD)
+            except StockInsuficiente:
+                return exitos
+            exitos += 1
+    finally:
+        cerrar()
+
+
+def test_consumo_desde_varios_procesos(base):
+    with transaccion() as conn:
+        materia_id = conn.execute(
+            "INSERT INTO inventario_materia_prima (nombre) VALUES ('Carne') RETURNING id"
+        ).fetchone()[0]
+        referencia_id = conn.execute(
+            "INSERT INTO referencias_chorizo (nombre, unidad) VALUES ('Chorizo', 'kg') RETURNING id"
+        ).fetchone()[0]
+        recibir(materia_id, STOCK, 1.0, conn=conn)
+        tanda_id = guardar_tanda(Tanda(date.today().isoformat(), 1, referencia_id, 1.0), conn)
+
+    argumentos = [(str(base), tanda_id, materia_id)] * PROCESOS
+    with multiprocessing.get_context("spawn").Pool(PROCESOS) as pool:
+        exitos = sum(pool.map(_consumir_hasta_agotar, argumentos))
+
+    with lectura() as conn:
+        conn.execute("BEGIN")
+        stock = conn.execute(
+            "SELECT stock_actual FROM inventario_materia_prima WHERE id = ?", (materia_id,)
+        ).fetchone()[0]
+        salidas = conn.execute(
+            "SELECT COUNT(*) FROM historial_inventario_materia_prima "
+            "WHERE materia_prima_id = ? AND tipo_movimiento = 'SALIDA'", (materia_id,)
+        ).fetchone()[0]
+        usos = conn.execute(
+            "SELECT COUNT(*) FROM tanda_materia_prima WHERE tanda_id = ?", (tanda_id,)
+        ).fetchone()[0]
+
+    assert exitos == int(STOCK / CANTIDAD)
+    assert stock >= 0
+    assert stock == pytest.approx(0)
+    assert salidas == usos == exitos
@@ -0,0 +1,62 @@
+"""
+Corrección de movimientos del libro: el ajuste del stock actual no puede
+dejarlo negativo, igual que el descuento de consumir().
+"""
+from datetime import date
+
+import pytest
+
+from ..db.conexion import lectura, transaccion
+from ..services.costeo import corregir_movimiento
+from ..services.inventario import consumir, recibir
+from ..services.produccion import Tanda, guardar_tanda
+
+
+@pytest.fixture
+def consumo(base):
+    """Materia con 10 kg recibidos y 8 kg consumidos en una tanda"""
+    with transaccion() as conn:
+        materia_id = conn.execute(
+            "INSERT INTO inventario_materia_prima (nombre) VALUES ('Carne') RETURNING id"
+        ).fetchone()[0]
+        referencia_id = conn.execute(
+            "INSERT INTO referencias_chorizo (nombre, unidad) VALUES ('Chorizo', 'kg') RETURNING id"
+        ).fetchone()[0]
+        recibir(materia_id, 10.0, 2.0, conn=conn)
+        tanda_id = guardar_tanda(Tanda(date.today().isoformat(), 1, referencia_id, 1.0), conn)
+        consumir(tanda_id, materia_id, 8.0, conn)
+    return materia_id
+
+
+def _movimiento(materia_id, tipo):
+    with lectura() as conn:
+        return conn.execute(
+            "SELECT id FROM historial_inventario_materia_prima "
+            "WHERE materia_prima_id = ? AND tipo_movimiento = ?", (materia_id, tipo)
+        ).fetchone()[0]
+
+
+def _stock(materia_id):
+    with lectura() as conn:
+        return conn.execute(
+            "SELECT stock_actual FROM inventario_materia_prima WHERE id = ?", (materia_id,)
+        ).fetchone()[0]
+
+
+def test_salida_mayor_que_el_stock(consumo):
+    materia_id = consumo
+    salida = _movimiento(materia_id, "SALIDA")
+    with pytest.raises(ValueError, match="stock negativo"):
+        corregir_movimiento(salida, cantidad=12.5)
+    assert _stock(materia_id) == pytest.approx(2.0)
+
+    corregir_movimiento(salida, cantidad=10.0)
+    assert _stock(materia_id) == pytest.approx(0.0)
+
+
+def test_entrada_menor_que_lo_consumido(consumo):
+    materia_id = consumo
+    entrada = _movimiento(materia_id, "ENTRADA")
+    with pytest.raises(ValueError, match="stock negativo"):
+        corregir_movimiento(entrada, cantidad=7.0)
+    assert _stock(materia_id) == pytest.approx(2.0)
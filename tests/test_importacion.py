@@ -0,0 +1,43 @@
+"""
+Validación de las planillas de importación: celdas vacías, ids leídos
+del XLSX como número y los ejemplos del docstring de services/importacion.
+"""
+import doctest
+
+import pytest
+
+from ..services import importacion
+from ..services.importacion import ErrorImportacion, validar
+
+MATERIAS = {"12": 12, "sal": 3}
+ENCABEZADO = ("materia", "cantidad", "costo")
+
+
+def _errores(*filas):
+    with pytest.raises(ErrorImportacion) as error:
+        validar([ENCABEZADO, *filas], MATERIAS)
+    return error.value.errores
+
+
+def test_ejemplos_del_modulo():
+    assert doctest.testmod(importacion).failed == 0
+
+
+def test_celdas_vacias():
+    assert _errores(("sal", "", "1.200"), ("sal", 10, None), (None, " ", 5)) == [
+        "Línea 2: falta cantidad",
+        "Línea 3: falta costo",
+        "Línea 4: falta materia, cantidad",
+    ]
+
+
+def test_fila_corta():
+    assert _errores(("sal", "10")) == ["Línea 2: falta costo"]
+
+
+def test_id_leido_como_numero():
+    # XLSX: el id de la materia llega como 12.0 y los valores como float
+    assert validar([ENCABEZADO, (12.0, 10.0, 1200.0), ("Sal", "2,5", "$ 1.200")], MATERIAS) == [
+        (12, 10.0, 1200.0),
+        (3, 2.5, 1200.0),
+    ]
@@ -0,0 +1,27 @@
+"""
+Plan de ejecución de todas las consultas de db/consultas.py sobre una
+base recién migrada: ninguna puede recorrer completa una tabla grande ni
+ordenarla en un B-tree temporal, salvo las marcadas en CONSULTAS.
+"""
+from ..db.conexion import lectura
+from ..db.consultas import CONSULTAS, Consulta, problemas, verificar_planes
+
+
+def test_consultas_registradas(base):
+    assert verificar_planes() == {}
+
+
+def test_detecta_recorrido_y_orden_temporal(base):
+    with lectura() as conn:
+        assert problemas(conn, Consulta("SELECT * FROM tandas ORDER BY cantidad_producida")) == [
+            "SCAN tandas", "USE TEMP B-TREE FOR ORDER BY"
+        ]
+        # Orden por id de las filas que vienen por el índice de fecha
+        assert problemas(conn, Consulta("SELECT * FROM tandas WHERE fecha = ? ORDER BY id")) != []
+
+
+def test_exportaciones_marcadas(base):
+    # Las exportaciones completas son las únicas que pueden recorrer tablas
+    for nombre, consulta in CONSULTAS.items():
+        if consulta.recorrido:
+            assert nombre.startswith(("export_", "exportar_")), nombre
@@ -0,0 +1,35 @@
+"""
+Aplicación de recetas: una tanda que ya tiene materia prima asignada no
+vuelve a descontar la receta.
+"""
+from datetime import date
+
+import pytest
+
+from ..db.conexion import lectura, transaccion
+from ..services.inventario import recibir
+from ..services.produccion import Tanda, guardar_tanda
+from ..services.recetas import aplicar_receta, guardar_receta
+
+
+def test_receta_aplicada_dos_veces(base):
+    with transaccion() as conn:
+        materia_id = conn.execute(
+            "INSERT INTO inventario_materia_prima (nombre) VALUES ('Carne') RETURNING id"
+        ).fetchone()[0]
+        referencia_id = conn.execute(
+            "INSERT INTO referencias_chorizo (nombre, unidad) VALUES ('Chorizo', 'kg') RETURNING id"
+        ).fetchone()[0]
+        recibir(materia_id, 100.0, 2.0, conn=conn)
+        guardar_receta(referencia_id, {materia_id: 0.8}, conn)
+        tanda_id = guardar_tanda(Tanda(date.today().isoformat(), 1, referencia_id, 10.0), conn)
+
+    assert [c.cantidad for c in aplicar_receta(tanda_id)] == [pytest.approx(8.0)]
+    with pytest.raises(ValueError, match="ya tiene materia prima"):
+        aplicar_receta(tanda_id)
+
+    with lectura() as conn:
+        stock = conn.execute(
+            "SELECT stock_actual FROM inventario_materia_prima WHERE id = ?", (materia_id,)
+        ).fetchone()[0]
+    assert stock == pytest.approx(92.0)
@@ -1,10 +1,17 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout,
-    QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+    QWidget, QVBoxLayout, QHBoxLayout,
+    QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
+    QComboBox, QSpinBox, QPushButton, QFileDialog, QMessageBox
 )
+import calendar
 from datetime import datetime
-import sqlite3
-from ..db.conexion import conectar
+from ..db.conexion import lectura
+from ..db.consultas import ACUMULADO_DEL_MES, MATERIA_PRIMA_ENTRE
+from .refresco import Refrescador
+from .segundo_plano import EjecutorConsultas
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+         "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
 
 
 class AcumuladoMensual(QWidget):
@@ -14,15 +21,36 @@ class AcumuladoMensual(QWidget):
 
         layout = QVBoxLayout(self)
 
-        # Configurar Mes y Año actual para el título
-        meses = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", 
-                 "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+        # Selector de Mes y Año (por defecto el actual)
         ahora = datetime.now()
-        nombre_mes = meses[ahora.month - 1]
-        
-        titulo = QLabel(f"Chorizos Producidos: {nombre_mes} {ahora.year}")
-        titulo.setStyleSheet("font-size:18px; font-weight:bold; color: #2c3e50; margin-bottom: 10px;")
-        layout.addWidget(titulo)
+        selector = QHBoxLayout()
+
+        self.mes = QComboBox()
+        for numero, nombre in enumerate(MESES, start=1):
+            self.mes.addItem(nombre, numero)
+        self.mes.setCurrentIndex(ahora.month - 1)
+
+        self.anio = QSpinBox()
+        self.anio.setRange(2000, 2100)
+        self.anio.setValue(ahora.year)
+
+        selector.addWidget(QLabel("Mes:"))
+        selector.addWidget(self.mes)
+        selector.addWidget(QLabel("Año:"))
+        selector.addWidget(self.anio)
+        selector.addStretch()
+
+        # El reporte (con el historial del mes) se arma en segundo plano
+        self.ejecutor = EjecutorConsultas(self)
+        self.btn_pdf = QPushButton("🖨️ Reporte de costos PDF")
+        self.btn_pdf.clicked.connect(self.generar_reporte)
+        self.ejecutor.ocupado.connect(lambda ocupado: self.btn_pdf.setEnabled(not ocupado))
+        selector.addWidget(self.btn_pdf)
+        layout.addLayout(selector)
+
+        self.titulo = QLabel()
+        self.titulo.setStyleSheet("font-size:18px; font-weight:bold; color: #2c3e50; margin-bottom: 10px;")
+        layout.addWidget(self.titulo)
 
         # Tabla configurada para Producto Terminado
         self.tabla = QTableWidget()
@@ -32,36 +60,48 @@ class AcumuladoMensual(QWidget):
         )
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.tabla.setEditTriggers(QTableWidget.NoEditTriggers)
-        
+
         layout.addWidget(self.tabla)
 
+        # Materia prima del mes, del acumulado diario (en segundo plano)
+        titulo_mp = QLabel("Materia Prima del Mes")
+        titulo_mp.setStyleSheet("font-size:16px; font-weight:bold; color: #2c3e50; margin-top: 10px;")
+        layout.addWidget(titulo_mp)
+
+        self.tabla_mp = QTableWidget()
+        self.tabla_mp.setColumnCount(4)
+        self.tabla_mp.setHorizontalHeaderLabels(
+            ["Insumo", "Entradas", "Consumo", "Costo Consumo"]
+        )
+        self.tabla_mp.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tabla_mp.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.tabla_mp)
+        self.consultas_mp = EjecutorConsultas(self)
+
+        self.mes.currentIndexChanged.connect(self.cargar_datos)
+        self.anio.valueChanged.connect(self.cargar_datos)
+        self.mes.currentIndexChanged.connect(self.cargar_materia_prima)
+        self.anio.valueChanged.connect(self.cargar_materia_prima)
+
         self.cargar_datos()
+        self.cargar_materia_prima()
+        # Cada tabla se recarga sólo si cambian sus tablas
+        self.refrescadores = [
+            Refrescador(self, ("acumulado_mensual", "referencias_chorizo"), self.cargar_datos),
+            Refrescador(self, ("historial_inventario_materia_prima", "inventario_materia_prima"),
+                        self.cargar_materia_prima),
+        ]
 
     def cargar_datos(self):
-        conn = None
         try:
-            conn = conectar()
-            cursor = conn.cursor()
-
-            # Obtenemos mes y año actual en formato (01, 02, etc)
-            mes_actual = datetime.now().strftime("%m")
-            anio_actual = datetime.now().strftime("%Y")
-
-            # Consulta para agrupar la producción de chorizos por tipo
-            cursor.execute("""
-                SELECT 
-                    r.nombre,
-                    COUNT(t.id) as total_tandas,
-                    SUM(t.cantidad_producida) as total_kilos,
-                    SUM(t.unidades) as total_unidades
-                FROM tandas t
-                JOIN referencias_chorizo r ON r.id = t.referencia_id
-                WHERE strftime('%m', t.fecha) = ? AND strftime('%Y', t.fecha) = ?
-                GROUP BY r.nombre
-                ORDER BY total_kilos DESC
-            """, (mes_actual, anio_actual))
-
-            datos = cursor.fetchall()
+            numero_mes = self.mes.currentData()
+            anio = self.anio.value()
+            self.titulo.setText(f"Chorizos Producidos: {MESES[numero_mes - 1]} {anio}")
+
+            # El acumulado ya viene agrupado por referencia (lo mantienen los triggers de tandas)
+            with lectura() as conn:
+                datos = conn.execute(ACUMULADO_DEL_MES, (f"{anio:04d}-{numero_mes:02d}",)).fetchall()
+
             self.tabla.setRowCount(len(datos))
 
             for fila, row in enumerate(datos):
@@ -76,6 +116,43 @@ class AcumuladoMensual(QWidget):
 
         except Exception as e:
             print(f"Error al cargar acumulado de chorizos: {e}")
-        finally:
-            if conn:
-                conn.close()
\ No newline at end of file
+
+    def cargar_materia_prima(self):
+        numero_mes = self.mes.currentData()
+        anio = self.anio.value()
+        ultimo_dia = calendar.monthrange(anio, numero_mes)[1]
+        desde = f"{anio:04d}-{numero_mes:02d}-01"
+        hasta = f"{anio:04d}-{numero_mes:02d}-{ultimo_dia:02d}"
+        self.consultas_mp.consultar(
+            lambda conn: conn.execute(MATERIA_PRIMA_ENTRE, (desde, hasta)).fetchall(),
+            self._mostrar_materia_prima,
+            lambda error: print(f"Error al cargar materia prima del mes: {error}")
+        )
+
+    def _mostrar_materia_prima(self, filas):
+        self.tabla_mp.setRowCount(len(filas))
+        for fila, (nombre, unidad, entradas, consumo, costo) in enumerate(filas):
+            self.tabla_mp.setItem(fila, 0, QTableWidgetItem(nombre))
+            self.tabla_mp.setItem(fila, 1, QTableWidgetItem(f"{entradas:.3f} {unidad}"))
+            self.tabla_mp.setItem(fila, 2, QTableWidgetItem(f"{consumo:.3f} {unidad}"))
+            self.tabla_mp.setItem(fila, 3, QTableWidgetItem(f"$ {costo:,.2f}"))
+
+    def generar_reporte(self):
+        # Importación local: reportlab sólo se carga si se pide un reporte
+        from ..export.export_PDF import reporte_costos_mes
+
+        numero_mes = self.mes.currentData()
+        anio = self.anio.value()
+        ruta, _ = QFileDialog.getSaveFileName(
+            self, "Guardar reporte", f"costos_{anio:04d}-{numero_mes:02d}.pdf", "PDF (*.pdf)"
+        )
+        if not ruta:
+            return
+        if not ruta.lower().endswith(".pdf"):
+            ruta += ".pdf"
+
+        self.ejecutor.ejecutar(
+            lambda: reporte_costos_mes(ruta, anio, numero_mes),
+            lambda ruta: QMessageBox.information(self, "Reporte generado", f"Reporte guardado en:\n{ruta}"),
+            lambda error: QMessageBox.critical(self, "Error", f"Error al generar el reporte: {error}")
+        )
@@ -0,0 +1,84 @@
+import time
+from datetime import datetime
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout
+from PySide6.QtCore import QObject, QEvent, Signal
+
+from ..db.conexion import gestor
+
+# Archivo (junto a la base) donde se agregan los tiempos de cada sesión
+ARCHIVO_TIEMPOS = "tiempos.log"
+
+# Primer pintado de cada ventana abierta en esta sesión: (hora, título, ms)
+TIEMPOS = []
+
+
+class PestanaPerezosa(QWidget):
+    """
+    Contenedor de pestaña que construye su widget la primera vez que se
+    muestra. Como los widgets cargan sus datos al construirse, abrir una
+    ventana sólo consulta la pestaña visible.
+    """
+
+    creada = Signal(object)
+
+    def __init__(self, fabrica, parent=None):
+        super().__init__(parent)
+        self.fabrica = fabrica
+        self.widget = None
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    def showEvent(self, evento):
+        super().showEvent(evento)
+        if self.widget is None:
+            self.crear()
+
+    def crear(self):
+        self.widget = self.fabrica()
+        self._layout.addWidget(self.widget)
+        self.creada.emit(self.widget)
+        return self.widget
+
+
+class _PrimerPintado(QObject):
+    def __init__(self, ventana, inicio):
+        super().__init__(ventana)
+        self.inicio = inicio
+
+    def eventFilter(self, objeto, evento):
+        if evento.type() == QEvent.Paint:
+            ms = (time.perf_counter() - self.inicio) * 1000
+            TIEMPOS.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), objeto.windowTitle(), ms))
+            objeto.removeEventFilter(self)
+            self.deleteLater()
+        return False
+
+
+def medir_primer_pintado(ventana, inicio=None):
+    """
+    Registra en TIEMPOS cuánto tarda la ventana en pintarse por primera
+    vez, contando desde `inicio` (time.perf_counter(), normalmente antes
+    de construirla).
+    """
+    if inicio is None:
+        inicio = time.perf_counter()
+    ventana.installEventFilter(_PrimerPintado(ventana, inicio))
+
+
+def guardar_tiempos():
+    """
+    Agrega los tiempos de la sesión a ARCHIVO_TIEMPOS, junto a la base
+    (el ejecutable no tiene consola donde imprimirlos).
+    """
+    if not TIEMPOS:
+        return
+    ruta = gestor().ruta.parent / ARCHIVO_TIEMPOS
+    try:
+        with open(ruta, "a", encoding="utf-8") as archivo:
+            for hora, titulo, ms in TIEMPOS:
+                archivo.write(f"{hora}\t{titulo}\tprimer pintado {ms:.0f} ms\n")
+    except OSError as e:
+        print(f"No se pudieron guardar los tiempos en {ruta}: {e}")
+        return
+    TIEMPOS.clear()
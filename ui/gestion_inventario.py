@@ -1,5 +1,6 @@
 # ui/gestion_inventario.py
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget
+from .carga_diferida import PestanaPerezosa
 
 
 class GestionInventario(QWidget):
@@ -9,6 +10,7 @@ class GestionInventario(QWidget):
         super().__init__()
         self.setWindowTitle("Gestión de Inventario - Materia Prima")
         self.resize(1000, 650)
+        self.fecha = None
         
         layout = QVBoxLayout(self)
         tabs = QTabWidget()
@@ -19,61 +21,40 @@ class GestionInventario(QWidget):
         from .inventario_diario import InventarioDiario
         from .historial_inventario_materia_prima import HistorialInventarioMateriaPrima
         
+        # Las pestañas se construyen (y consultan) la primera vez que se abren
+        
         # Pestaña 1
-        self.inventario_stock = InventarioMateriaPrima()
+        self.inventario_stock = PestanaPerezosa(InventarioMateriaPrima)
         tabs.addTab(self.inventario_stock, "📦 Stock")
         
         # Pestaña 2
-        self.materia_tanda = MateriaPrimaTanda()
+        self.materia_tanda = PestanaPerezosa(MateriaPrimaTanda)
+        self.materia_tanda.creada.connect(self._aplicar_fecha)
         tabs.addTab(self.materia_tanda, "🏭 Asignar a Tandas")
         
         # Pestaña 3
-        self.inventario_diario = InventarioDiario()
+        self.inventario_diario = PestanaPerezosa(InventarioDiario)
         tabs.addTab(self.inventario_diario, "📊 Consumo Diario")
         
-        # Pestaña 4
-        self.historial = HistorialInventarioMateriaPrima()
+        # Pestaña 4 (el historial es la consulta más pesada)
+        self.historial = PestanaPerezosa(HistorialInventarioMateriaPrima)
         tabs.addTab(self.historial, "📋 Historial")
         
         layout.addWidget(tabs)
         
-        # Conectar señales
-        tabs.currentChanged.connect(self.actualizar_pestaña)
-        
-        try:
-            self.inventario_stock.stock_actualizado.connect(self.on_stock_actualizado)
-            self.materia_tanda.stock_actualizado.connect(self.on_stock_actualizado)
-        except AttributeError:
-            pass  # Las señales aún no están implementadas
-    
-    def actualizar_pestaña(self, index):
-        """Actualiza los datos cuando se cambia de pestaña"""
-        try:
-            if index == 0:
-                self.inventario_stock.cargar_tabla()
-            elif index == 1:
-                self.materia_tanda.cargar_materias()
-                self.materia_tanda.cargar_detalle()
-            elif index == 2:
-                self.inventario_diario.cargar()
-            elif index == 3:
-                self.historial.cargar_historial()
-        except Exception as e:
-            print(f"Error actualizando pestaña {index}: {e}")
-    
-    def on_stock_actualizado(self):
-        """Se ejecuta cuando hay cambios en el stock"""
-        try:
-            self.inventario_stock.cargar_tabla()
-            self.materia_tanda.cargar_materias()
-            self.inventario_diario.cargar()
-            self.historial.cargar_historial()
-        except Exception as e:
-            print(f"Error actualizando stock: {e}")
+        # No hace falta recargar pestañas a mano: cada una tiene su
+        # Refrescador y se pone al día al mostrarse si cambiaron sus tablas
     
     def set_fecha(self, fecha):
         """Propaga la fecha a los widgets que la necesitan"""
+        self.fecha = fecha
+        if self.materia_tanda.widget is not None:
+            self._aplicar_fecha(self.materia_tanda.widget)
+    
+    def _aplicar_fecha(self, widget):
+        if self.fecha is None:
+            return
         try:
-            self.materia_tanda.set_fecha(fecha)
+            widget.set_fecha(self.fecha)
         except Exception as e:
             print(f"Error configurando fecha: {e}")
\ No newline at end of file
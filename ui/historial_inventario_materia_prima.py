@@ -2,21 +2,18 @@
 
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QTableWidget, QTableWidgetItem, QDateEdit,
+    QTableView, QDateEdit,
     QComboBox, QPushButton, QHeaderView
 )
-from PySide6.QtCore import QDate
-from PySide6.QtGui import QColor
-import sqlite3
-from pathlib import Path
+from PySide6.QtCore import QDate, QTimer
+from ..db.conexion import lectura
+from ..db.consultas import consulta_totales_historial, MATERIAS_PRIMAS_POR_NOMBRE
+from .modelo_historial import ModeloHistorial, leer_pagina
+from .segundo_plano import EjecutorConsultas
+from .refresco import Refrescador
 
-# Usar la misma ruta de DB que los demás archivos
-DB_PATH = Path(__file__).resolve().parents[1] / "data.db"
-
-
-def conectar():
-    """Función de conexión local"""
-    return sqlite3.connect(DB_PATH)
+# Silencio (ms) que se espera tras el último cambio de filtro antes de consultar
+ESPERA_FILTROS = 300
 
 
 class HistorialInventarioMateriaPrima(QWidget):
@@ -29,6 +26,18 @@ class HistorialInventarioMateriaPrima(QWidget):
         
         layout = QVBoxLayout(self)
         
+        # Las consultas corren fuera del hilo de la interfaz
+        self.ejecutor = EjecutorConsultas(self)
+        self.ejecutor.ocupado.connect(self.mostrar_cargando)
+        
+        # Los cambios de filtro seguidos (p. ej. teclear una fecha) se
+        # agrupan en una sola consulta cuando el usuario deja de escribir
+        self.temporizador = QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(ESPERA_FILTROS)
+        self.temporizador.timeout.connect(self.cargar_historial)
+        self.recargas_evitadas = 0
+        
         # -------- FILTROS --------
         filtros = QHBoxLayout()
         
@@ -37,7 +46,7 @@ class HistorialInventarioMateriaPrima(QWidget):
         self.combo_materia = QComboBox()
         self.combo_materia.addItem("Todas", None)
         self.cargar_materias_filtro()
-        self.combo_materia.currentIndexChanged.connect(self.cargar_historial)
+        self.combo_materia.currentIndexChanged.connect(self.programar_recarga)
         filtros.addWidget(self.combo_materia)
         
         # Filtro por tipo de movimiento
@@ -46,7 +55,7 @@ class HistorialInventarioMateriaPrima(QWidget):
         self.combo_tipo.addItem("Todos", None)
         self.combo_tipo.addItem("Entradas", "ENTRADA")
         self.combo_tipo.addItem("Salidas", "SALIDA")
-        self.combo_tipo.currentIndexChanged.connect(self.cargar_historial)
+        self.combo_tipo.currentIndexChanged.connect(self.programar_recarga)
         filtros.addWidget(self.combo_tipo)
         
         # Filtro por fechas
@@ -54,14 +63,14 @@ class HistorialInventarioMateriaPrima(QWidget):
         self.fecha_desde = QDateEdit()
         self.fecha_desde.setCalendarPopup(True)
         self.fecha_desde.setDate(QDate.currentDate().addMonths(-1))
-        self.fecha_desde.dateChanged.connect(self.cargar_historial)
+        self.fecha_desde.dateChanged.connect(self.programar_recarga)
         filtros.addWidget(self.fecha_desde)
         
         filtros.addWidget(QLabel("Hasta:"))
         self.fecha_hasta = QDateEdit()
         self.fecha_hasta.setCalendarPopup(True)
         self.fecha_hasta.setDate(QDate.currentDate())
-        self.fecha_hasta.dateChanged.connect(self.cargar_historial)
+        self.fecha_hasta.dateChanged.connect(self.programar_recarga)
         filtros.addWidget(self.fecha_hasta)
         
         # Botón refrescar
@@ -88,13 +97,11 @@ class HistorialInventarioMateriaPrima(QWidget):
         layout.addLayout(resumen)
         
         # -------- TABLA --------
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(9)
-        self.tabla.setHorizontalHeaderLabels([
-            "Fecha", "Hora", "Tipo", "Materia Prima", 
-            "Cantidad", "Costo Unit.", "Total", 
-            "Stock Resultante", "Referencia"
-        ])
+        # Vista sobre un modelo paginado: las filas se traen al hacer scroll
+        self.modelo = ModeloHistorial(self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.verticalHeader().setVisible(False)
         
         # Ajustar columnas
         header = self.tabla.horizontalHeader()
@@ -108,137 +115,88 @@ class HistorialInventarioMateriaPrima(QWidget):
         
         # Cargar datos iniciales
         self.cargar_historial()
+        self.refrescador = Refrescador(
+            self, ("historial_inventario_materia_prima", "inventario_materia_prima"),
+            self.cargar_historial
+        )
     
     def cargar_materias_filtro(self):
         """Carga las materias primas para el filtro"""
         try:
-            conn = conectar()
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, nombre FROM inventario_materia_prima ORDER BY nombre")
-            for id_, nombre in cursor.fetchall():
+            with lectura() as conn:
+                datos = conn.execute(MATERIAS_PRIMAS_POR_NOMBRE).fetchall()
+            for id_, nombre in datos:
                 self.combo_materia.addItem(nombre, id_)
-            conn.close()
         except Exception as e:
             print(f"Error cargando materias: {e}")
     
+    def programar_recarga(self):
+        """Un filtro cambió: corta la consulta en curso y espera a que paren los cambios"""
+        if self.temporizador.isActive():
+            self.recargas_evitadas += 1
+        self.ejecutor.cancelar()
+        self.mostrar_cargando(True)
+        self.temporizador.start()
+    
     def cargar_historial(self):
-        """Carga el historial de movimientos"""
-        try:
-            materia_id = self.combo_materia.currentData()
-            tipo_mov = self.combo_tipo.currentData()
-            fecha_desde = self.fecha_desde.date().toString("yyyy-MM-dd")
-            fecha_hasta = self.fecha_hasta.date().toString("yyyy-MM-dd")
-            
-            conn = conectar()
-            cursor = conn.cursor()
-            
-            # Verificar si la tabla existe
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='historial_inventario_materia_prima'
-            """)
-            
-            if not cursor.fetchone():
-                # La tabla no existe, mostrar mensaje
-                self.tabla.setRowCount(0)
-                self.lbl_total_entradas.setText("Total Entradas: $0.00")
-                self.lbl_total_salidas.setText("Total Salidas: $0.00")
-                self.lbl_saldo.setText("⚠️ Tabla de historial no existe")
-                conn.close()
-                return
-            
-            # Construir query dinámicamente según filtros
-            query = """
-            SELECT 
-                h.fecha,
-                h.hora,
-                h.tipo_movimiento,
-                i.nombre,
-                h.cantidad,
-                h.costo_unitario,
-                h.total,
-                h.stock_resultante,
-                h.referencia
-            FROM historial_inventario_materia_prima h
-            JOIN inventario_materia_prima i ON i.id = h.materia_prima_id
-            WHERE h.fecha BETWEEN ? AND ?
-            """
-            params = [fecha_desde, fecha_hasta]
-            
-            if materia_id is not None:
-                query += " AND h.materia_prima_id = ?"
-                params.append(materia_id)
-            
-            if tipo_mov is not None:
-                query += " AND h.tipo_movimiento = ?"
-                params.append(tipo_mov)
-            
-            query += " ORDER BY h.fecha DESC, h.hora DESC"
-            
-            cursor.execute(query, params)
-            datos = cursor.fetchall()
-            conn.close()
-            
-            # Llenar tabla
-            self.tabla.setRowCount(len(datos))
-            
-            total_entradas = 0
-            total_salidas = 0
-            
-            for fila, row in enumerate(datos):
-                fecha, hora, tipo, nombre, cantidad, costo, total, stock_result, ref = row
-                
-                # Calcular totales
-                if tipo == "ENTRADA":
-                    total_entradas += total
-                else:
-                    total_salidas += total
-                
-                # Fecha
-                self.tabla.setItem(fila, 0, QTableWidgetItem(fecha))
-                
-                # Hora
-                self.tabla.setItem(fila, 1, QTableWidgetItem(hora))
-                
-                # Tipo con color
-                item_tipo = QTableWidgetItem(tipo)
-                if tipo == "ENTRADA":
-                    item_tipo.setBackground(QColor(200, 255, 200))
-                else:
-                    item_tipo.setBackground(QColor(255, 200, 200))
-                self.tabla.setItem(fila, 2, item_tipo)
-                
-                # Materia prima
-                self.tabla.setItem(fila, 3, QTableWidgetItem(nombre))
-                
-                # Cantidad
-                self.tabla.setItem(fila, 4, QTableWidgetItem(f"{cantidad:.3f} kg"))
-                
-                # Costo unitario
-                self.tabla.setItem(fila, 5, QTableWidgetItem(f"${costo:.2f}"))
-                
-                # Total
-                self.tabla.setItem(fila, 6, QTableWidgetItem(f"${total:.2f}"))
-                
-                # Stock resultante
-                self.tabla.setItem(fila, 7, QTableWidgetItem(f"{stock_result:.3f} kg"))
-                
-                # Referencia
-                self.tabla.setItem(fila, 8, QTableWidgetItem(ref or "--"))
-            
-            # Actualizar resumen
-            saldo = total_entradas - total_salidas
-            self.lbl_total_entradas.setText(f"Total Entradas: ${total_entradas:.2f}")
-            self.lbl_total_salidas.setText(f"Total Salidas: ${total_salidas:.2f}")
-            self.lbl_saldo.setText(f"Saldo: ${saldo:.2f}")
-            
-            if saldo > 0:
-                self.lbl_saldo.setStyleSheet("color: green; font-weight: bold; font-size: 14px;")
-            elif saldo < 0:
-                self.lbl_saldo.setStyleSheet("color: red; font-weight: bold; font-size: 14px;")
-            else:
-                self.lbl_saldo.setStyleSheet("color: blue; font-weight: bold; font-size: 14px;")
-                
-        except Exception as e:
-            print(f"Error cargando historial: {e}")
-            self.tabla.setRowCount(0)
\ No newline at end of file
+        """Pide el historial en segundo plano; la tabla se llena al llegar"""
+        materia_id = self.combo_materia.currentData()
+        tipo_mov = self.combo_tipo.currentData()
+        fecha_desde = self.fecha_desde.date().toString("yyyy-MM-dd")
+        fecha_hasta = self.fecha_hasta.date().toString("yyyy-MM-dd")
+        filtros = (fecha_desde, fecha_hasta, materia_id, tipo_mov)
+        
+        self.temporizador.stop()
+        self.ejecutor.consultar(
+            lambda conn: self._consultar_historial(conn, filtros),
+            lambda resultado: self._mostrar_historial(filtros, resultado),
+            self._error_historial
+        )
+    
+    @staticmethod
+    def _consultar_historial(conn, filtros):
+        """Corre en un hilo del pool: primera página + totales del rango"""
+        fecha_desde, fecha_hasta, materia_id, tipo_mov = filtros
+        params = [fecha_desde, fecha_hasta]
+        if materia_id is not None:
+            params.append(materia_id)
+        if tipo_mov is not None:
+            params.append(tipo_mov)
+        
+        # Misma transacción: página y totales ven los mismos datos
+        conn.execute("BEGIN")
+        totales = conn.execute(
+            consulta_totales_historial(materia_id, tipo_mov), params
+        ).fetchone()
+        pagina = leer_pagina(conn, filtros)
+        return pagina, totales
+    
+    def _mostrar_historial(self, filtros, resultado):
+        pagina, (total_entradas, total_salidas) = resultado
+        
+        # La tabla sigue llenándose sola por páginas al hacer scroll
+        self.modelo.set_filtros(filtros, pagina)
+        
+        # Actualizar resumen
+        saldo = total_entradas - total_salidas
+        self.lbl_total_entradas.setText(f"Total Entradas: ${total_entradas:.2f}")
+        self.lbl_total_salidas.setText(f"Total Salidas: ${total_salidas:.2f}")
+        self.lbl_saldo.setText(f"Saldo: ${saldo:.2f}")
+        
+        if saldo > 0:
+            self.lbl_saldo.setStyleSheet("color: green; font-weight: bold; font-size: 14px;")
+        elif saldo < 0:
+            self.lbl_saldo.setStyleSheet("color: red; font-weight: bold; font-size: 14px;")
+        else:
+            self.lbl_saldo.setStyleSheet("color: blue; font-weight: bold; font-size: 14px;")
+    
+    def _error_historial(self, error):
+        print(f"Error cargando historial: {error}")
+        self.modelo.limpiar()
+    
+    def mostrar_cargando(self, ocupado):
+        """Estado de carga mientras la consulta corre en segundo plano"""
+        self.tabla.setEnabled(not ocupado)
+        if ocupado:
+            self.lbl_saldo.setText("⏳ Cargando...")
+            self.lbl_saldo.setStyleSheet("color: gray; font-weight: bold; font-size: 14px;")
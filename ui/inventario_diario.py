@@ -4,7 +4,9 @@ from PySide6.QtWidgets import (
     QDateEdit
 )
 from PySide6.QtCore import QDate
-from ..db.conexion import conectar
+from ..db.conexion import lectura
+from ..db.consultas import CONSUMO_DEL_DIA
+from .refresco import Refrescador
 
 
 class InventarioDiario(QWidget):
@@ -35,26 +37,16 @@ class InventarioDiario(QWidget):
         layout.addWidget(self.tabla)
 
         self.cargar()
+        self.refrescador = Refrescador(
+            self, ("tanda_materia_prima", "tandas", "inventario_materia_prima"), self.cargar
+        )
 
     # -----------------------
     def cargar(self):
         fecha = self.fecha.date().toString("yyyy-MM-dd")
 
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT i.nombre,
-               SUM(tm.cantidad_usada),
-               i.unidad
-        FROM tanda_materia_prima tm
-        JOIN tandas t ON t.id = tm.tanda_id
-        JOIN inventario_materia_prima i ON i.id = tm.materia_prima_id
-        WHERE t.fecha = ?
-        GROUP BY i.nombre
-        """, (fecha,))
-
-        datos = cursor.fetchall()
-        conn.close()
+        with lectura() as conn:
+            datos = conn.execute(CONSUMO_DEL_DIA, (fecha,)).fetchall()
 
         self.tabla.setRowCount(len(datos))
         for f, row in enumerate(datos):
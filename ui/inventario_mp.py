@@ -1,10 +1,15 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QDoubleSpinBox, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox
+    QTableWidget, QTableWidgetItem, QMessageBox, QFileDialog
 )
-from ..db.conexion import conectar
-from datetime import datetime
+from PySide6.QtCore import Qt
+from ..db.conexion import lectura
+from ..db.consultas import MATERIAS_PRIMAS_POR_ID, INVENTARIO_VALORIZADO
+from .refresco import Refrescador
+from ..services.inventario import recibir
+from ..services.importacion import importar_entradas, ErrorImportacion
+from .segundo_plano import EjecutorConsultas
 
 class InventarioMateriaPrima(QWidget):
     def __init__(self):
@@ -38,8 +43,16 @@ class InventarioMateriaPrima(QWidget):
         form.addWidget(QLabel("Costo Unit."))
         form.addWidget(self.costo)
         form.addWidget(btn)
+        
+        # Entradas desde la planilla del proveedor (CSV/XLSX)
+        self.btn_importar = QPushButton("📥 Importar planilla")
+        self.btn_importar.clicked.connect(self.importar_planilla)
+        form.addWidget(self.btn_importar)
         layout.addLayout(form)
         
+        self.ejecutor = EjecutorConsultas(self)
+        self.ejecutor.ocupado.connect(lambda ocupado: self.btn_importar.setEnabled(not ocupado))
+        
         # ---- TABLA ----
         self.tabla = QTableWidget()
         self.tabla.setColumnCount(4)
@@ -49,17 +62,17 @@ class InventarioMateriaPrima(QWidget):
         layout.addWidget(self.tabla)
         
         self.cargar_tabla()
+        self.refrescador = Refrescador(self, ("inventario_materia_prima",), self.cargar_tabla)
     
     # -----------------------------
     def cargar_insumos(self):
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("SELECT nombre FROM inventario_materia_prima ORDER BY id")
-        for fila, (nombre,) in enumerate(cursor.fetchall()):
+        with lectura() as conn:
+            datos = conn.execute(MATERIAS_PRIMAS_POR_ID).fetchall()
+        for fila, (id_, nombre) in enumerate(datos):
             item = QTableWidgetItem(nombre)
+            item.setData(Qt.UserRole, id_)
             item.setFlags(item.flags() & ~item.flags().ItemIsEditable)
             self.insumo.setItem(fila, 0, item)
-        conn.close()
     
     # -----------------------------
     def agregar_stock(self):
@@ -70,6 +83,7 @@ class InventarioMateriaPrima(QWidget):
             return
         
         nombre = self.insumo.item(fila, 0).text()
+        id_materia = self.insumo.item(fila, 0).data(Qt.UserRole)
         cantidad_nueva = self.cantidad.value()
         costo_nuevo = self.costo.value()
         
@@ -78,94 +92,63 @@ class InventarioMateriaPrima(QWidget):
             return
         
         try:
-            conn = conectar()
-            cursor = conn.cursor()
-            
-            # 1. Obtener datos actuales del insumo
-            cursor.execute("""
-                SELECT id, stock_actual, costo_unitario
-                FROM inventario_materia_prima
-                WHERE nombre = ?
-            """, (nombre,))
-            
-            resultado = cursor.fetchone()
-            if not resultado:
-                conn.close()
-                return
-            
-            id_materia, stock_anterior, costo_actual = resultado
-            
-            # 2. Cálculos de Promedio Ponderado
-            valor_anterior = stock_anterior * costo_actual
-            valor_nuevo = cantidad_nueva * costo_nuevo
-            stock_total = stock_anterior + cantidad_nueva
-            
-            # Evitar división por cero si el stock era negativo por algún error previo
-            if stock_total > 0:
-                costo_promedio = (valor_anterior + valor_nuevo) / stock_total
-            else:
-                costo_promedio = costo_nuevo
-            
-            # 3. Actualizar tabla principal (Inventario)
-            cursor.execute("""
-                UPDATE inventario_materia_prima
-                SET stock_actual = ?,
-                    costo_unitario = ?
-                WHERE id = ?
-            """, (stock_total, costo_promedio, id_materia))
-            
-            # 4. Registrar en el historial (Corrigiendo el error de stock_anterior)
-            ahora = datetime.now()
-            cursor.execute("""
-                INSERT INTO historial_inventario_materia_prima (
-                    materia_prima_id, fecha, hora, tipo_movimiento, 
-                    cantidad, costo_unitario, total, 
-                    stock_anterior, stock_resultante, referencia
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                id_materia, 
-                ahora.strftime("%Y-%m-%d"), 
-                ahora.strftime("%H:%M:%S"), 
-                "ENTRADA", 
-                cantidad_nueva, 
-                costo_nuevo, 
-                valor_nuevo,
-                stock_anterior, 
-                stock_total, 
-                "Carga manual de stock"
-            ))
-            
-            conn.commit()
-            conn.close()
+            recepcion = recibir(id_materia, cantidad_nueva, costo_nuevo)
             
-            # 5. Feedback al usuario
+            # Feedback al usuario
             QMessageBox.information(
                 self, 
                 "Operación Exitosa",
                 f"Insumo: {nombre}\n"
-                f"Nuevo Stock: {stock_total:.2f} kg\n"
-                f"Nuevo Costo Promedio: ${costo_promedio:.2f}"
+                f"Nuevo Stock: {recepcion.stock_resultante:.2f} kg\n"
+                f"Nuevo Costo Promedio: ${recepcion.costo_promedio:.2f}"
             )
             
-            # Limpiar campos y refrescar vista
+            # Limpiar campos (la tabla se refresca sola con el aviso de cambios)
             self.cantidad.setValue(0)
             self.costo.setValue(0)
-            self.cargar_tabla()
             
         except Exception as e:
             QMessageBox.critical(self, "Error de Base de Datos", f"No se pudo guardar: {str(e)}")
     
+    # -----------------------------
+    def importar_planilla(self):
+        ruta, _ = QFileDialog.getOpenFileName(
+            self,
+            "Importar entradas de stock",
+            "",
+            "Planillas (*.csv *.xlsx)"
+        )
+        if not ruta:
+            return
+        
+        # Se importa en segundo plano; la tabla se refresca con el aviso de cambios
+        self.ejecutor.ejecutar(
+            lambda: importar_entradas(ruta),
+            self._importacion_terminada,
+            self._importacion_fallida
+        )
+    
+    def _importacion_terminada(self, resultado):
+        QMessageBox.information(
+            self,
+            "Importación exitosa",
+            f"Se importaron {resultado.filas} entradas "
+            f"({resultado.filas_por_segundo:.0f} filas/s)"
+        )
+    
+    def _importacion_fallida(self, error):
+        if isinstance(error, ErrorImportacion):
+            detalle = "\n".join(error.errores[:15])
+            if len(error.errores) > 15:
+                detalle += f"\n... y {len(error.errores) - 15} más"
+            QMessageBox.warning(self, "Planilla con errores", f"No se importó nada.\n\n{detalle}")
+        else:
+            QMessageBox.critical(self, "Error de Base de Datos", f"No se pudo importar: {str(error)}")
+    
     # -----------------------------
     def cargar_tabla(self):
-        conn = conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT nombre, stock_actual, costo_unitario,
-                   stock_actual * costo_unitario
-            FROM inventario_materia_prima
-        """)
-        datos = cursor.fetchall()
-        conn.close()
+        with lectura() as conn:
+            datos = conn.execute(INVENTARIO_VALORIZADO).fetchall()
         
         self.tabla.setRowCount(len(datos))
         for f, row in enumerate(datos):
@@ -4,8 +4,9 @@ from PySide6.QtWidgets import (
     QDateEdit, QPushButton, QHeaderView
 )
 from PySide6.QtCore import QDate
-import sqlite3
-from ..db.conexion import conectar
+from ..db.consultas import PRODUCCION_DEL_DIA
+from .segundo_plano import EjecutorConsultas
+from .refresco import Refrescador
 
 class InventarioProductoFinal(QWidget):
     def __init__(self):
@@ -14,6 +15,9 @@ class InventarioProductoFinal(QWidget):
 
         layout = QVBoxLayout(self)
 
+        # Las consultas corren fuera del hilo de la interfaz
+        self.ejecutor = EjecutorConsultas(self)
+
         # ---- FILTROS (Para buscar por día) ----
         filtros_layout = QHBoxLayout()
         
@@ -48,59 +52,47 @@ class InventarioProductoFinal(QWidget):
         self.label_resumen.setStyleSheet("font-weight: bold; font-size: 13px; color: #2c3e50;")
         layout.addWidget(self.label_resumen)
 
+        self.ejecutor.ocupado.connect(self.mostrar_cargando)
         self.cargar_datos()
+        self.refrescador = Refrescador(self, ("tandas", "referencias_chorizo"), self.cargar_datos)
 
     def cargar_datos(self):
         """Consulta las tandas realizadas en la fecha seleccionada"""
         fecha_str = self.fecha_busqueda.date().toString("yyyy-MM-dd")
         
-        conn = None
-        try:
-            conn = conectar()
-            cursor = conn.cursor()
+        # Agrupamos por referencia para ver el total de chorizos hechos de cada tipo
+        self.ejecutor.consultar(
+            lambda conn: conn.execute(PRODUCCION_DEL_DIA, (fecha_str,)).fetchall(),
+            lambda datos: self._mostrar_datos(fecha_str, datos),
+            lambda e: print(f"Error al consultar producción: {e}")
+        )
 
-            # Agrupamos por referencia para ver el total de chorizos hechos de cada tipo
-            query = """
-                SELECT 
-                    r.nombre,
-                    COUNT(t.id) as num_tandas,
-                    SUM(t.cantidad_producida) as kg_totales,
-                    SUM(t.unidades) as unds_totales,
-                    AVG(t.cantidad_producida) -- Simulación de costo o dato extra
-                FROM tandas t
-                JOIN referencias_chorizo r ON r.id = t.referencia_id
-                WHERE t.fecha = ?
-                GROUP BY r.nombre
-            """
-            cursor.execute(query, (fecha_str,))
-            datos = cursor.fetchall()
+    def _mostrar_datos(self, fecha_str, datos):
+        self.tabla.setRowCount(len(datos))
+        
+        total_kg = 0
+        total_unds = 0
 
-            self.tabla.setRowCount(len(datos))
+        for fila, row in enumerate(datos):
+            # Referencia
+            self.tabla.setItem(fila, 0, QTableWidgetItem(str(row[0])))
+            # Cantidad de tandas
+            self.tabla.setItem(fila, 1, QTableWidgetItem(str(row[1])))
+            # Kg totales
+            self.tabla.setItem(fila, 2, QTableWidgetItem(f"{row[2]:.2f} kg"))
+            # Unidades totales
+            self.tabla.setItem(fila, 3, QTableWidgetItem(f"{row[3]} und"))
+            # Un dato de referencia o costo si lo tienes
+            self.tabla.setItem(fila, 4, QTableWidgetItem("--"))
             
-            total_kg = 0
-            total_unds = 0
+            total_kg += row[2]
+            total_unds += row[3]
 
-            for fila, row in enumerate(datos):
-                # Referencia
-                self.tabla.setItem(fila, 0, QTableWidgetItem(str(row[0])))
-                # Cantidad de tandas
-                self.tabla.setItem(fila, 1, QTableWidgetItem(str(row[1])))
-                # Kg totales
-                self.tabla.setItem(fila, 2, QTableWidgetItem(f"{row[2]:.2f} kg"))
-                # Unidades totales
-                self.tabla.setItem(fila, 3, QTableWidgetItem(f"{row[3]} und"))
-                # Un dato de referencia o costo si lo tienes
-                self.tabla.setItem(fila, 4, QTableWidgetItem("--"))
-                
-                total_kg += row[2]
-                total_unds += row[3]
-
-            self.label_resumen.setText(
-                f"Resumen del {fecha_str}: Total {total_kg:.2f} kg producidos en {total_unds} unidades."
-            )
+        self.label_resumen.setText(
+            f"Resumen del {fecha_str}: Total {total_kg:.2f} kg producidos en {total_unds} unidades."
+        )
 
-        except Exception as e:
-            print(f"Error al consultar producción: {e}")
-        finally:
-            if conn:
-                conn.close()
\ No newline at end of file
+    def mostrar_cargando(self, ocupado):
+        self.tabla.setEnabled(not ocupado)
+        if ocupado:
+            self.label_resumen.setText("Cargando datos...")
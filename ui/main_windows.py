@@ -1,15 +1,29 @@
+import threading
+import time
+
+from PySide6.QtCore import QObject, Qt, Signal
 from PySide6.QtWidgets import (
     QMainWindow,
     QWidget,
     QVBoxLayout,
     QPushButton,
     QFileDialog,
-    QMessageBox
+    QMessageBox,
+    QProgressDialog
 )
 from .inventario_pf import InventarioProductoFinal
 from .acumulado import AcumuladoMensual
-from ..export.export_excel import exportar_excel
+from ..export.export_excel import exportar_excel, ExportacionCancelada, hojas_exportadas
+from ..export.export_csv import exportar_tablas
 from .produccion_diaria import ProduccionDiaria
+from .segundo_plano import EjecutorConsultas
+from .carga_diferida import medir_primer_pintado
+
+
+class _Progreso(QObject):
+    """Lleva el avance de la exportación desde el hilo del pool a la interfaz"""
+
+    avanzo = Signal(int, str, int)   # número de hoja, título, filas escritas
 
 
 class MainWindow(QMainWindow):
@@ -20,6 +34,9 @@ class MainWindow(QMainWindow):
         
         layout = QVBoxLayout()
         
+        # La exportación corre en segundo plano para no congelar la ventana
+        self.ejecutor = EjecutorConsultas(self)
+        
         # ========== INVENTARIOS ==========
         btn_inventario_mp = QPushButton("📦 Gestión de Inventario - Materia Prima")
         btn_inventario_mp.setStyleSheet("""
@@ -55,6 +72,12 @@ class MainWindow(QMainWindow):
         btn_excel.clicked.connect(self.exportar_excel)
         layout.addWidget(btn_excel)
         
+        btn_tablas = QPushButton("🗃️ Exportar tablas (CSV)")
+        btn_tablas.clicked.connect(self.exportar_tablas)
+        layout.addWidget(btn_tablas)
+        self.ejecutor.ocupado.connect(lambda ocupado: btn_excel.setEnabled(not ocupado))
+        self.ejecutor.ocupado.connect(lambda ocupado: btn_tablas.setEnabled(not ocupado))
+        
         # Aplicar estilos generales
         layout.setSpacing(10)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -79,20 +102,24 @@ class MainWindow(QMainWindow):
         # Importación local para evitar problemas circulares
         from .gestion_inventario import GestionInventario
         
-        self.ventana_inventario = GestionInventario()
-        self.ventana_inventario.show()
+        self.ventana_inventario = self._abrir(GestionInventario)
     
     def abrir_pf(self):
-        self.ventana_pf = InventarioProductoFinal()
-        self.ventana_pf.show()
+        self.ventana_pf = self._abrir(InventarioProductoFinal)
     
     def abrir_produccion(self):
-        self.ventana_prod = ProduccionDiaria()
-        self.ventana_prod.show()
+        self.ventana_prod = self._abrir(ProduccionDiaria)
     
     def abrir_acumulado(self):
-        self.ventana_acu = AcumuladoMensual()
-        self.ventana_acu.show()
+        self.ventana_acu = self._abrir(AcumuladoMensual)
+    
+    def _abrir(self, clase):
+        """Crea y muestra una ventana midiendo el tiempo hasta su primer pintado"""
+        inicio = time.perf_counter()
+        ventana = clase()
+        medir_primer_pintado(ventana, inicio)
+        ventana.show()
+        return ventana
     
     def exportar_excel(self):
         ruta, _ = QFileDialog.getSaveFileName(
@@ -108,16 +135,108 @@ class MainWindow(QMainWindow):
         if not ruta.lower().endswith(".xlsx"):
             ruta += ".xlsx"
         
-        try:
-            exportar_excel(ruta)
-            QMessageBox.information(
-                self,
-                "Exportación exitosa",
-                "El archivo Excel fue generado correctamente"
-            )
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Error",
-                f"Error al exportar: {str(e)}"
-            )
\ No newline at end of file
+        # Los resúmenes mensuales siempre van; el detalle crudo es opcional
+        respuesta = QMessageBox.question(
+            self,
+            "Exportar a Excel",
+            "¿Incluir las hojas de detalle (todas las tandas y todo el historial)?\n"
+            "Sin ellas el libro sólo lleva los resúmenes y abre mucho más rápido.",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+            QMessageBox.No
+        )
+        if respuesta == QMessageBox.Cancel:
+            return
+        detalle = respuesta == QMessageBox.Yes
+        self.total_hojas = len(hojas_exportadas(detalle))
+        
+        # Diálogo de avance: un paso por hoja y el conteo de filas en el texto
+        cancelar = threading.Event()
+        self.dialogo_exportacion = QProgressDialog(
+            "Preparando exportación...", "Cancelar", 0, self.total_hojas, self
+        )
+        self.dialogo_exportacion.setWindowTitle("Exportando a Excel")
+        self.dialogo_exportacion.setWindowModality(Qt.WindowModal)
+        self.dialogo_exportacion.setMinimumDuration(0)
+        self.dialogo_exportacion.setAutoClose(False)
+        self.dialogo_exportacion.canceled.connect(cancelar.set)
+        progreso = _Progreso(self.dialogo_exportacion)
+        progreso.avanzo.connect(self._mostrar_avance)
+        
+        self.ejecutor.ejecutar(
+            lambda: exportar_excel(ruta, progreso.avanzo.emit, cancelar.is_set, detalle),
+            self._exportacion_terminada,
+            self._exportacion_fallida
+        )
+    
+    def _mostrar_avance(self, numero, titulo, filas):
+        if self.dialogo_exportacion.wasCanceled():
+            return
+        if numero >= self.total_hojas:
+            texto = "Guardando archivo..."
+        else:
+            texto = f"Hoja {numero + 1} de {self.total_hojas}: {titulo}\n{filas:,} filas"
+        self.dialogo_exportacion.setLabelText(texto)
+        self.dialogo_exportacion.setValue(numero)
+    
+    def _cerrar_avance(self):
+        # Borrar el diálogo se lleva también al emisor del avance
+        self.dialogo_exportacion.close()
+        self.dialogo_exportacion.deleteLater()
+    
+    def _exportacion_terminada(self, resultado):
+        self._cerrar_avance()
+        tiempos = "\n".join(
+            f"{t.titulo}: {t.filas:,} filas en {t.lectura:.2f} s"
+            for t in resultado.tiempos
+        )
+        QMessageBox.information(
+            self,
+            "Exportación exitosa",
+            f"El archivo Excel fue generado correctamente:\n{resultado.ruta}\n\n"
+            f"{tiempos}\nTotal: {resultado.segundos:.2f} s"
+        )
+    
+    def _exportacion_fallida(self, error):
+        self._cerrar_avance()
+        if isinstance(error, ExportacionCancelada):
+            QMessageBox.information(self, "Exportación cancelada", "No se generó ningún archivo")
+            return
+        QMessageBox.critical(
+            self,
+            "Error",
+            f"Error al exportar: {str(error)}"
+        )
+    
+    def exportar_tablas(self):
+        """Tablas del libro sin formato, para análisis fuera de la aplicación"""
+        carpeta = QFileDialog.getExistingDirectory(self, "Carpeta de exportación")
+        if not carpeta:
+            return
+        
+        respuesta = QMessageBox.question(
+            self,
+            "Exportar tablas",
+            "¿Exportar sólo lo nuevo desde la última exportación a esta carpeta?\n"
+            "(No = exportar las tablas completas)",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+        )
+        if respuesta == QMessageBox.Cancel:
+            return
+        incremental = respuesta == QMessageBox.Yes
+        
+        self.ejecutor.ejecutar(
+            lambda: exportar_tablas(carpeta, incremental=incremental),
+            self._tablas_exportadas,
+            self._exportacion_tablas_fallida
+        )
+    
+    def _tablas_exportadas(self, resultado):
+        QMessageBox.information(
+            self,
+            "Exportación exitosa",
+            f"{len(resultado.archivos)} archivos, {resultado.filas:,} filas "
+            f"({resultado.filas_por_segundo:,.0f} filas/s)"
+        )
+    
+    def _exportacion_tablas_fallida(self, error):
+        QMessageBox.critical(self, "Error", f"Error al exportar: {str(error)}")
@@ -5,10 +5,11 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Signal
 from PySide6.QtGui import QColor
-import sqlite3
-from pathlib import Path
-
-DB_PATH = Path(__file__).resolve().parents[1] / "data.db"
+from ..db.conexion import lectura
+from ..db.consultas import DETALLE_TANDA, TANDAS_DEL_DIA_COMBO, MATERIAS_PRIMAS_CON_STOCK
+from .refresco import Refrescador
+from ..services.inventario import consumir, StockInsuficiente
+from ..services.recetas import aplicar_receta, aplicar_recetas_dia, receta_desde_tanda
 
 
 class MateriaPrimaTanda(QWidget):
@@ -64,6 +65,22 @@ class MateriaPrimaTanda(QWidget):
         form.addWidget(self.btn_agregar)
         layout.addLayout(form)
 
+        # ---------- RECETAS ----------
+        # Toda la receta se descuenta en una sola transacción
+        recetas = QHBoxLayout()
+        btn_aplicar = QPushButton("📋 Aplicar receta a la tanda")
+        btn_aplicar.clicked.connect(self.aplicar_receta)
+        btn_aplicar_dia = QPushButton("📋 Aplicar recetas a todo el día")
+        btn_aplicar_dia.setToolTip("Sólo a las tandas que aún no tienen materia prima")
+        btn_aplicar_dia.clicked.connect(self.aplicar_recetas_dia)
+        btn_guardar_receta = QPushButton("💾 Guardar tanda como receta")
+        btn_guardar_receta.clicked.connect(self.guardar_como_receta)
+        recetas.addWidget(btn_aplicar)
+        recetas.addWidget(btn_aplicar_dia)
+        recetas.addWidget(btn_guardar_receta)
+        recetas.addStretch()
+        layout.addLayout(recetas)
+
         # ---------- TABLA ----------
         self.tabla = QTableWidget()
         self.tabla.setColumnCount(4)
@@ -75,16 +92,19 @@ class MateriaPrimaTanda(QWidget):
         self.total_label = QLabel("Total Tanda: 0.00")
         layout.addWidget(self.total_label)
 
+        # Cada parte se recarga sólo si cambian sus tablas
+        self.refrescadores = [
+            Refrescador(self, ("inventario_materia_prima",), self.recargar_materias),
+            Refrescador(self, ("tandas", "referencias_chorizo"), self.cargar_tandas),
+            Refrescador(self, ("tanda_materia_prima",), self.cargar_detalle),
+        ]
+
     # ---------------------------------
     def set_fecha(self, fecha):
         self.fecha_actual = fecha
         self.cargar_tandas()
         self.cargar_detalle()
 
-    # ---------------------------------
-    def conectar(self):
-        return sqlite3.connect(DB_PATH)
-
     # ---------------------------------
     def cargar_tandas(self):
         # Guardamos que ID estaba seleccionado antes de borrar
@@ -94,25 +114,16 @@ class MateriaPrimaTanda(QWidget):
         if not self.fecha_actual:
             return
 
-        conn = self.conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT t.id, r.nombre || ' - T' || t.numero_tanda
-            FROM tandas t
-            JOIN referencias_chorizo r ON r.id = t.referencia_id
-            WHERE t.fecha = ?
-            ORDER BY t.numero_tanda
-        """, (self.fecha_actual,))
-
-        for id_, texto in cursor.fetchall():
+        with lectura() as conn:
+            datos = conn.execute(TANDAS_DEL_DIA_COMBO, (self.fecha_actual,)).fetchall()
+
+        for id_, texto in datos:
             self.tanda.addItem(texto, id_)
             # Si el ID coincide con el que estaba antes, lo volvemos a seleccionar
             if id_ == id_seleccionado:
                 index = self.tanda.count() - 1
                 self.tanda.setCurrentIndex(index)
 
-        conn.close()
-
     # ---------------------------------
     def cargar_materias(self):
         """Carga las materias primas con su stock actualizado"""
@@ -121,16 +132,11 @@ class MateriaPrimaTanda(QWidget):
         
         self.materia.clear()
         
-        conn = self.conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT id, nombre, costo_unitario, stock_actual
-        FROM inventario_materia_prima
-        ORDER BY nombre
-        """)
+        with lectura() as conn:
+            datos = conn.execute(MATERIAS_PRIMAS_CON_STOCK).fetchall()
         
         index_a_seleccionar = -1
-        for idx, (id_, nombre, costo, stock) in enumerate(cursor.fetchall()):
+        for idx, (id_, nombre, costo, stock) in enumerate(datos):
             self.materia.addItem(
                 f"{nombre} (${costo:.2f})", 
                 (id_, costo, stock)
@@ -139,12 +145,14 @@ class MateriaPrimaTanda(QWidget):
             if seleccion_actual and seleccion_actual[0] == id_:
                 index_a_seleccionar = idx
         
-        conn.close()
-        
         # Restaurar la selección
         if index_a_seleccionar >= 0:
             self.materia.setCurrentIndex(index_a_seleccionar)
 
+    def recargar_materias(self):
+        self.cargar_materias()
+        self.actualizar_stock_disponible()
+
     # ---------------------------------
     def refrescar_stock(self):
         """Refresca manualmente el stock"""
@@ -196,22 +204,15 @@ class MateriaPrimaTanda(QWidget):
             self.total_label.setText("Total Tanda: 0.00")
             return
 
-        conn = self.conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT i.nombre, tm.cantidad_usada, tm.costo_unitario, tm.total
-        FROM tanda_materia_prima tm
-        JOIN inventario_materia_prima i ON i.id = tm.materia_prima_id
-        WHERE tm.tanda_id = ?
-        """, (tanda_id,))
+        with lectura() as conn:
+            filas = conn.execute(DETALLE_TANDA, (tanda_id,)).fetchall()
 
-        for fila, datos in enumerate(cursor.fetchall()):
+        for fila, datos in enumerate(filas):
             self.tabla.insertRow(fila)
             for col, valor in enumerate(datos):
                 self.tabla.setItem(fila, col, QTableWidgetItem(str(valor)))
             total += datos[3]
 
-        conn.close()
         self.total_label.setText(f"Total Tanda: {total:.2f}")
 
     # ---------------------------------
@@ -255,84 +256,21 @@ class MateriaPrimaTanda(QWidget):
                 )
             return
 
-        # Verificar stock actual en la BD
-        conn = self.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-        SELECT stock_actual, nombre 
-        FROM inventario_materia_prima 
-        WHERE id = ?
-        """, (materia_id,))
-        
-        resultado = cursor.fetchone()
-        if not resultado:
-            conn.close()
-            QMessageBox.critical(self, "Error", "Materia prima no encontrada")
-            return
-        
-        stock_actual, nombre_materia = resultado
-        
-        if cantidad > stock_actual:
-            conn.close()
+        # Descuento atómico: si otra terminal consumió antes, no se toca nada
+        try:
+            consumo = consumir(tanda_id, materia_id, cantidad)
+        except StockInsuficiente as e:
             QMessageBox.critical(
                 self,
                 "Stock Insuficiente",
-                f"El stock de '{nombre_materia}' ha cambiado.\n\n"
-                f"Stock actual: {stock_actual:.3f} kg\n"
+                f"El stock ha cambiado.\n\n"
+                f"Stock actual: {e.disponible or 0:.3f} kg\n"
                 f"Cantidad solicitada: {cantidad:.3f} kg"
             )
-            self.cargar_materias()
             return
-
-        total = cantidad * costo
-
-        # Registrar uso en la tanda
-        cursor.execute("""
-        INSERT INTO tanda_materia_prima
-        (tanda_id, materia_prima_id, cantidad_usada, costo_unitario, total)
-        VALUES (?, ?, ?, ?, ?)
-        """, (tanda_id, materia_id, cantidad, costo, total))
-
-        # Descontar del inventario
-        cursor.execute("""
-        UPDATE inventario_materia_prima
-        SET stock_actual = stock_actual - ?
-        WHERE id = ?
-        """, (cantidad, materia_id))
-        
-        # Obtener stock resultante
-        cursor.execute("""
-        SELECT stock_actual FROM inventario_materia_prima WHERE id = ?
-        """, (materia_id,))
-        stock_resultante = cursor.fetchone()[0]
-        
-        # Registrar en el historial
-        from datetime import datetime
-        fecha_actual = datetime.now().strftime("%Y-%m-%d")
-        hora_actual = datetime.now().strftime("%H:%M:%S")
-        
-        # Obtener nombre de la tanda para referencia
-        cursor.execute("""
-        SELECT r.nombre || ' - T' || t.numero_tanda
-        FROM tandas t
-        JOIN referencias_chorizo r ON r.id = t.referencia_id
-        WHERE t.id = ?
-        """, (tanda_id,))
-        nombre_tanda = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            INSERT INTO historial_inventario_materia_prima
-            (fecha, hora, materia_prima_id, tipo_movimiento, cantidad, 
-             costo_unitario, total, stock_anterior, stock_resultante, 
-             referencia, tanda_id)
-            VALUES (?, ?, ?, 'SALIDA', ?, ?, ?, ?, ?, ?, ?)
-        """, (fecha_actual, hora_actual, materia_id, cantidad, 
-              costo, total, stock_actual, stock_resultante, 
-              f"Usado en {nombre_tanda}", tanda_id))
-
-        conn.commit()
-        conn.close()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo registrar el consumo: {e}")
+            return
 
         # Emitir señal de que el stock cambió
         self.stock_actualizado.emit()
@@ -341,11 +279,71 @@ class MateriaPrimaTanda(QWidget):
         QMessageBox.information(
             self,
             "Éxito",
-            f"Se agregaron {cantidad:.3f} kg de '{nombre_materia}' a la tanda.\n"
-            f"Stock restante: {stock_actual - cantidad:.3f} kg"
+            f"Se agregaron {cantidad:.3f} kg de '{consumo.nombre}' a la tanda.\n"
+            f"Stock restante: {consumo.stock_resultante:.3f} kg"
         )
 
+        # Detalle y stock se recargan con el aviso de cambios
         self.cantidad.setValue(0)
-        self.cargar_detalle()
-        self.cargar_materias()
-        self.actualizar_stock_disponible()
\ No newline at end of file
+
+    # ---------------------------------
+    def aplicar_receta(self):
+        tanda_id = self.tanda.currentData()
+        if not tanda_id:
+            QMessageBox.warning(self, "Error", "Seleccione una tanda")
+            return
+        try:
+            consumos = aplicar_receta(tanda_id)
+        except StockInsuficiente as e:
+            QMessageBox.critical(self, "Stock Insuficiente", f"No se aplicó la receta.\n\n{e}")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo aplicar la receta: {e}")
+            return
+
+        self.stock_actualizado.emit()
+        total = sum(c.total for c in consumos)
+        QMessageBox.information(
+            self, "Éxito",
+            f"Receta aplicada: {len(consumos)} materias primas, total ${total:.2f}"
+        )
+
+    def aplicar_recetas_dia(self):
+        if not self.fecha_actual:
+            return
+        try:
+            aplicados = aplicar_recetas_dia(self.fecha_actual)
+        except StockInsuficiente as e:
+            QMessageBox.critical(self, "Stock Insuficiente", f"No se aplicó ninguna receta.\n\n{e}")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudieron aplicar las recetas: {e}")
+            return
+
+        if not aplicados:
+            QMessageBox.information(
+                self, "Recetas",
+                "No hay tandas sin materia prima con receta en este día."
+            )
+            return
+        self.stock_actualizado.emit()
+        movimientos = sum(len(c) for c in aplicados.values())
+        QMessageBox.information(
+            self, "Éxito",
+            f"Recetas aplicadas a {len(aplicados)} tandas ({movimientos} movimientos)."
+        )
+
+    def guardar_como_receta(self):
+        tanda_id = self.tanda.currentData()
+        if not tanda_id:
+            QMessageBox.warning(self, "Error", "Seleccione una tanda")
+            return
+        try:
+            receta = receta_desde_tanda(tanda_id)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo guardar la receta: {e}")
+            return
+        QMessageBox.information(
+            self, "Receta guardada",
+            f"La receta de {self.tanda.currentText()} quedó con {len(receta)} materias primas."
+        )
@@ -0,0 +1,142 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
+from ..db.conexion import lectura
+from ..db.consultas import consulta_historial
+
+COLOR_ENTRADA = QColor(200, 255, 200)
+COLOR_SALIDA = QColor(255, 200, 200)
+TAMANO_PAGINA = 200
+
+
+def leer_pagina(conn, filtros, ultima=None, limite=TAMANO_PAGINA):
+    """
+    Lee una página del historial. filtros = (fecha_desde, fecha_hasta,
+    materia_id, tipo_mov); ultima es la última fila ya cargada (o None
+    para la primera página). Se puede llamar desde cualquier hilo.
+    """
+    fecha_desde, fecha_hasta, materia_id, tipo_mov = filtros
+    despues_de = ultima is not None
+
+    params = [fecha_desde] if despues_de else [fecha_desde, fecha_hasta]
+    if materia_id is not None:
+        params.append(materia_id)
+    if tipo_mov is not None:
+        params.append(tipo_mov)
+    if despues_de:
+        params += [ultima[1], ultima[2], ultima[0]]
+    params.append(limite)
+
+    query = consulta_historial(materia_id, tipo_mov, despues_de)
+    return conn.execute(query, params).fetchall()
+
+
+class ModeloHistorial(QAbstractTableModel):
+    """
+    Modelo del historial de movimientos que trae las filas por páginas a
+    medida que la vista las necesita (canFetchMore/fetchMore) y sólo da
+    formato a las celdas que se pintan. Abrir la vista cuesta una página,
+    sin importar el tamaño del historial.
+    """
+
+    ENCABEZADOS = [
+        "Fecha", "Hora", "Tipo", "Materia Prima",
+        "Cantidad", "Costo Unit.", "Total",
+        "Stock Resultante", "Referencia"
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Filas crudas: (id, fecha, hora, tipo, nombre, cantidad, costo, total, stock, ref)
+        self._filas = []
+        self._filtros = None
+        self._hay_mas = False
+
+    # ---------------------------------
+    def set_filtros(self, filtros, primera_pagina=None):
+        """
+        Descarta lo cargado y aplica filtros nuevos. Si se entrega la
+        primera página (leída en segundo plano) se muestra de inmediato;
+        si no, la vista la pedirá con fetchMore.
+        """
+        self.beginResetModel()
+        self._filtros = filtros
+        if primera_pagina is None:
+            self._filas = []
+            self._hay_mas = True
+        else:
+            self._filas = list(primera_pagina)
+            self._hay_mas = len(self._filas) >= TAMANO_PAGINA
+        self.endResetModel()
+
+    def limpiar(self):
+        self.beginResetModel()
+        self._filas = []
+        self._hay_mas = False
+        self.endResetModel()
+
+    # ---------------------------------
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._hay_mas:
+            return
+        try:
+            ultima = self._filas[-1] if self._filas else None
+            with lectura() as conn:
+                filas = leer_pagina(conn, self._filtros, ultima)
+        except Exception as e:
+            print(f"Error cargando historial: {e}")
+            filas = []
+        if len(filas) < TAMANO_PAGINA:
+            self._hay_mas = False
+        if not filas:
+            return
+        inicio = len(self._filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(filas) - 1)
+        self._filas.extend(filas)
+        self.endInsertRows()
+
+    # ---------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ENCABEZADOS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.ENCABEZADOS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        _, fecha, hora, tipo, nombre, cantidad, costo, total, stock_result, ref = self._filas[index.row()]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return fecha
+            if col == 1:
+                return hora
+            if col == 2:
+                return tipo
+            if col == 3:
+                return nombre
+            if col == 4:
+                return f"{cantidad:.3f} kg"
+            if col == 5:
+                return f"${costo:.2f}"
+            if col == 6:
+                return f"${total:.2f}"
+            if col == 7:
+                return f"{stock_result:.3f} kg"
+            if col == 8:
+                return ref or "--"
+
+        # Tipo con color
+        if role == Qt.BackgroundRole and col == 2:
+            return COLOR_ENTRADA if tipo == "ENTRADA" else COLOR_SALIDA
+
+        return None
@@ -4,10 +4,10 @@ from PySide6.QtWidgets import (
     QTableWidgetItem, QDateEdit, QMessageBox, QSpinBox, QHeaderView
 )
 from PySide6.QtCore import QDate, Qt
-import sqlite3
-from pathlib import Path
-
-DB_PATH = Path(__file__).resolve().parents[1] / "data.db"
+from ..services.precios import guardar_precios
+from ..db.consultas import COSTO_REFERENCIAS_DEL_DIA, PRECIOS_DEL_DIA
+from .segundo_plano import EjecutorConsultas
+from .refresco import Refrescador
 
 class PrecioDiario(QWidget):
     def __init__(self):
@@ -17,6 +17,10 @@ class PrecioDiario(QWidget):
 
         layout = QVBoxLayout(self)
 
+        # Las consultas corren fuera del hilo de la interfaz
+        self.ejecutor = EjecutorConsultas(self)
+        self.ejecutor.ocupado.connect(self.mostrar_cargando)
+
         # -------- CONTROLES SUPERIORES --------
         top = QHBoxLayout()
         
@@ -54,42 +58,13 @@ class PrecioDiario(QWidget):
         self.btn_guardar.clicked.connect(self.guardar)
         layout.addWidget(self.btn_guardar)
 
+        # Una sola consulta trae costos y precios guardados
         self.referencias = []
-        self.cargar_referencias_base()
         self.cargar_precios()
-
-    def conectar(self):
-        return sqlite3.connect(DB_PATH)
-
-    def cargar_referencias_base(self):
-        fecha = self.fecha.date().toString("yyyy-MM-dd")
-
-        conn = self.conectar()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT 
-                r.id,
-                r.nombre,
-                IFNULL(
-                    SUM(h.total) / NULLIF(SUM(t.cantidad_producida), 0),
-                    0
-                ) AS costo_dia_kg
-            FROM referencias_chorizo r
-            LEFT JOIN tandas t 
-                ON r.id = t.referencia_id
-                AND t.fecha = ?
-            LEFT JOIN historial_inventario_materia_prima h
-                ON h.tanda_id = t.id
-                AND h.tipo_movimiento = 'SALIDA'
-                AND h.fecha = ?
-            GROUP BY r.id
-        """, (fecha, fecha))
-
-        self.referencias = cursor.fetchall()
-        conn.close()
-
-
+        self.refrescador = Refrescador(
+            self, ("costos_dia", "precio_chorizo_dia", "referencias_chorizo"),
+            self.cargar_precios
+        )
 
     def calcular_sugeridos(self):
         """Recalcula la columna de precio sugerido según el margen"""
@@ -106,14 +81,23 @@ class PrecioDiario(QWidget):
                 pass
 
     def cargar_precios(self):
-        self.cargar_referencias_base() # Refrescar costos
+        """Pide costos y precios del día en segundo plano"""
         fecha = self.fecha.date().toString("yyyy-MM-dd")
-        
-        conn = self.conectar()
-        cursor = conn.cursor()
-        cursor.execute("SELECT referencia_id, precio_venta FROM precio_chorizo_dia WHERE fecha = ?", (fecha,))
+        self.ejecutor.consultar(
+            lambda conn: self._consultar_precios(conn, fecha),
+            self._mostrar_precios
+        )
+
+    @staticmethod
+    def _consultar_precios(conn, fecha):
+        """Corre en un hilo del pool"""
+        referencias = conn.execute(COSTO_REFERENCIAS_DEL_DIA, (fecha,)).fetchall()
+        cursor = conn.execute(PRECIOS_DEL_DIA, (fecha,))
         precios_guardados = {r: p for r, p in cursor.fetchall()}
-        conn.close()
+        return referencias, precios_guardados
+
+    def _mostrar_precios(self, resultado):
+        self.referencias, precios_guardados = resultado
 
         self.tabla.setRowCount(len(self.referencias))
 
@@ -134,26 +118,20 @@ class PrecioDiario(QWidget):
 
         self.calcular_sugeridos()
 
+    def mostrar_cargando(self, ocupado):
+        """Mientras carga no se puede editar ni guardar"""
+        self.tabla.setEnabled(not ocupado)
+        self.btn_guardar.setEnabled(not ocupado)
+
     def guardar(self):
         fecha = self.fecha.date().toString("yyyy-MM-dd")
-        conn = self.conectar()
-        cursor = conn.cursor()
 
         try:
-            cursor.execute("DELETE FROM precio_chorizo_dia WHERE fecha = ?", (fecha,))
-            for fila in range(self.tabla.rowCount()):
-                ref_id = self.referencias[fila][0]
-                precio_texto = self.tabla.item(fila, 3).text()
-                precio = float(precio_texto)
-                
-                cursor.execute("""
-                    INSERT INTO precio_chorizo_dia (fecha, referencia_id, precio_venta)
-                    VALUES (?, ?, ?)
-                """, (fecha, ref_id, precio))
-
-            conn.commit()
+            precios = {
+                self.referencias[fila][0]: float(self.tabla.item(fila, 3).text())
+                for fila in range(self.tabla.rowCount())
+            }
+            guardar_precios(fecha, precios)
             QMessageBox.information(self, "Éxito", "Precios de venta actualizados correctamente.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo guardar: {str(e)}")
-        finally:
-            conn.close()
\ No newline at end of file
@@ -4,7 +4,8 @@ from PySide6.QtWidgets import ( # type: ignore
     QTableWidget, QTableWidgetItem, QMessageBox
 )
 
-from ..db.conexion import conectar
+from ..db.conexion import escritura, lectura
+from ..db.consultas import REGISTROS_PRODUCCION_DIARIA
 
 
 class ProduccionDiaria(QWidget):
@@ -59,17 +60,12 @@ class ProduccionDiaria(QWidget):
             costo = float(self.costo.text())
             total = cantidad * costo
 
-            conn = conectar()
-            cursor = conn.cursor()
-
-            cursor.execute("""
-                INSERT INTO produccion_diaria
-                (fecha, insumo, cantidad, costo_unitario, total)
-                VALUES (?, ?, ?, ?, ?)
-            """, (fecha, insumo, cantidad, costo, total))
-
-            conn.commit()
-            conn.close()
+            with escritura() as conn:
+                conn.execute("""
+                    INSERT INTO produccion_diaria
+                    (fecha, insumo, cantidad, costo_unitario, total)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (fecha, insumo, cantidad, costo, total))
 
             self.fecha.clear()
             self.insumo.clear()
@@ -83,17 +79,8 @@ class ProduccionDiaria(QWidget):
 
     # -------------------------------
     def cargar_datos(self):
-        conn = conectar()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT fecha, insumo, cantidad, costo_unitario, total
-            FROM produccion_diaria
-            ORDER BY fecha
-        """)
-
-        datos = cursor.fetchall()
-        conn.close()
+        with lectura() as conn:
+            datos = conn.execute(REGISTROS_PRODUCCION_DIARIA).fetchall()
 
         self.tabla.setRowCount(len(datos))
 
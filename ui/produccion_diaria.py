@@ -1,11 +1,13 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QTabWidget, QPushButton, QDateEdit
+    QTabWidget, QPushButton, QDateEdit, QFileDialog, QMessageBox
 )
 from PySide6.QtCore import QDate
 from .tandas import Tandas
 from .materia_prima_tanda import MateriaPrimaTanda
 from .precio_diario import PrecioDiario
+from .carga_diferida import PestanaPerezosa
+from .segundo_plano import EjecutorConsultas
 
 
 class ProduccionDiaria(QWidget):
@@ -24,14 +26,25 @@ class ProduccionDiaria(QWidget):
         header.addWidget(QLabel("Fecha"))
         header.addWidget(self.fecha)
         header.addStretch()
+        
+        # El reporte se arma en segundo plano
+        self.ejecutor = EjecutorConsultas(self)
+        self.btn_pdf = QPushButton("🖨️ Reporte PDF del día")
+        self.btn_pdf.clicked.connect(self.generar_reporte)
+        self.ejecutor.ocupado.connect(lambda ocupado: self.btn_pdf.setEnabled(not ocupado))
+        header.addWidget(self.btn_pdf)
         layout.addLayout(header)
         
         # ---------- TABS ----------
+        # Cada pestaña se construye (y consulta) la primera vez que se abre
         self.tabs = QTabWidget()
         
-        self.tab_tandas = Tandas()
-        self.tab_mp = MateriaPrimaTanda()
-        self.tab_precio = PrecioDiario()
+        self.tab_tandas = PestanaPerezosa(Tandas)
+        self.tab_mp = PestanaPerezosa(MateriaPrimaTanda)
+        self.tab_precio = PestanaPerezosa(PrecioDiario)
+        self.pestanas = [self.tab_tandas, self.tab_mp, self.tab_precio]
+        for pestana in self.pestanas:
+            pestana.creada.connect(self.aplicar_fecha)
         
         self.tabs.addTab(self.tab_tandas, "Tandas")
         self.tabs.addTab(self.tab_mp, "Materia Prima")
@@ -39,19 +52,10 @@ class ProduccionDiaria(QWidget):
         
         layout.addWidget(self.tabs)
         
-        # ---------- CONECTAR SEÑALES (TIEMPO REAL) ----------
-        
-        # 1. Cuando se crea una TANDA, actualizar el ComboBox de Materia Prima
-        self.tab_tandas.tanda_creada.connect(self.tab_mp.cargar_tandas)
-        
-        # 2. Cuando se usa Materia Prima, avisar a otras pestañas (si es necesario)
-        try:
-            self.tab_mp.stock_actualizado.connect(self.actualizar_tabs)
-        except AttributeError:
-            pass
-        
-        # Conectar cambio de pestañas para actualizar datos al hacer clic
-        self.tabs.currentChanged.connect(self.on_tab_changed)
+        # ---------- TIEMPO REAL ----------
+        # Las pestañas se suscriben a sus tablas (ui/refresco.py): una tanda
+        # nueva o un consumo de materia prima recarga sólo las vistas que lo
+        # usan, y las ocultas esperan a mostrarse
         
         # ---------- EVENTO FECHA ----------
         self.fecha.dateChanged.connect(self.cambiar_fecha)
@@ -60,53 +64,35 @@ class ProduccionDiaria(QWidget):
         self.cambiar_fecha(self.fecha.date())
     
     def cambiar_fecha(self, fecha):
-        """Cambia la fecha en todas las pestañas"""
-        fecha_str = fecha.toString("yyyy-MM-dd")
-        
-        # Actualizar fecha en cada pestaña de forma segura
+        """Cambia la fecha en las pestañas ya construidas"""
+        self.fecha_str = fecha.toString("yyyy-MM-dd")
+        for pestana in self.pestanas:
+            if pestana.widget is not None:
+                self.aplicar_fecha(pestana.widget)
+    
+    def aplicar_fecha(self, widget):
+        """También se llama al construir una pestaña por primera vez"""
         try:
-            if hasattr(self.tab_tandas, 'set_fecha'):
-                self.tab_tandas.set_fecha(fecha_str)
+            if hasattr(widget, 'set_fecha'):
+                widget.set_fecha(self.fecha_str)
         except Exception as e:
-            print(f"Error en tab_tandas.set_fecha: {e}")
+            print(f"Error en {type(widget).__name__}.set_fecha: {e}")
+    
+    def generar_reporte(self):
+        # Importación local: reportlab sólo se carga si se pide un reporte
+        from ..export.export_PDF import reporte_produccion_dia
         
-        try:
-            if hasattr(self.tab_mp, 'set_fecha'):
-                self.tab_mp.set_fecha(fecha_str)
-        except Exception as e:
-            print(f"Error en tab_mp.set_fecha: {e}")
+        fecha = self.fecha_str
+        ruta, _ = QFileDialog.getSaveFileName(
+            self, "Guardar reporte", f"produccion_{fecha}.pdf", "PDF (*.pdf)"
+        )
+        if not ruta:
+            return
+        if not ruta.lower().endswith(".pdf"):
+            ruta += ".pdf"
         
-        try:
-            if hasattr(self.tab_precio, 'set_fecha'):
-                self.tab_precio.set_fecha(fecha_str)
-        except Exception as e:
-            print(f"Error en tab_precio.set_fecha: {e}")
-    
-    def on_tab_changed(self, index):
-        """Se ejecuta cuando el usuario hace clic en una pestaña"""
-        if index == 0:  # Tandas
-            self.tab_tandas.cargar_tandas()
-        elif index == 1:  # Materia Prima
-            # Recargar todo para asegurar datos frescos
-            try:
-                self.tab_mp.cargar_tandas() # <--- Crucial para ver tandas nuevas
-                self.tab_mp.cargar_materias()
-                self.tab_mp.cargar_detalle()
-                self.tab_mp.actualizar_stock_disponible()
-            except Exception as e:
-                print(f"Error recargando materia prima: {e}")
-        elif index == 2:  # Precio Diario
-            try:
-                # Asegúrate de que PrecioDiario tenga cargar_precios o cargar
-                if hasattr(self.tab_precio, 'cargar_precios'):
-                    self.tab_precio.cargar_precios()
-            except Exception as e:
-                print(f"Error recargando precio: {e}")
-    
-    def actualizar_tabs(self):
-        """Se ejecuta cuando se actualiza el stock de materia prima"""
-        try:
-            self.tab_mp.cargar_materias()
-            self.tab_mp.actualizar_stock_disponible()
-        except Exception as e:
-            print(f"Error actualizando tabs: {e}")
\ No newline at end of file
+        self.ejecutor.ejecutar(
+            lambda: reporte_produccion_dia(ruta, fecha),
+            lambda ruta: QMessageBox.information(self, "Reporte generado", f"Reporte guardado en:\n{ruta}"),
+            lambda error: QMessageBox.critical(self, "Error", f"Error al generar el reporte: {error}")
+        )
@@ -0,0 +1,73 @@
+from PySide6.QtCore import QObject, QEvent, QTimer, Signal
+from ..db import cambios
+
+# Cada cuánto (ms) se revisa si otro proceso escribió en la base
+INTERVALO_EXTERNOS = 2000
+
+
+class _Aviso(QObject):
+    """Lleva los avisos de db.cambios al hilo de la interfaz"""
+
+    cambiaron = Signal(object)   # frozenset de tablas, o None si fue externo
+
+    def __init__(self):
+        super().__init__()
+        cambios.suscribir(self.cambiaron.emit)
+        self._temporizador = QTimer(self)
+        self._temporizador.setInterval(INTERVALO_EXTERNOS)
+        self._temporizador.timeout.connect(cambios.revisar_externos)
+        self._temporizador.start()
+
+
+_aviso = None
+
+
+def aviso():
+    """Aviso de cambios del proceso (se crea al primer uso, con la app ya creada)"""
+    global _aviso
+    if _aviso is None:
+        _aviso = _Aviso()
+    return _aviso
+
+
+class Refrescador(QObject):
+    """
+    Mantiene al día una vista que depende de ciertas tablas.
+
+    Si alguna cambia y la vista está visible, llama a `recargar`; si está
+    oculta (otra pestaña, ventana cerrada) espera a que se muestre. Sin
+    cambios en sus tablas, mostrar la vista no cuesta ninguna consulta.
+    """
+
+    def __init__(self, vista, tablas, recargar):
+        super().__init__(vista)
+        self.vista = vista
+        self.tablas = tuple(tablas)
+        self.recargar = recargar
+        # Se asume que la vista carga sus datos al construirse
+        self._marca = cambios.marca(self.tablas)
+        vista.installEventFilter(self)
+        aviso().cambiaron.connect(self._al_cambiar)
+
+    def _al_cambiar(self, tablas):
+        if tablas is not None and tablas.isdisjoint(self.tablas):
+            return
+        if self.vista.isVisible():
+            # Después del manejador en curso, así varios avisos se juntan
+            QTimer.singleShot(0, self.revisar)
+
+    def revisar(self):
+        """Recarga sólo si las tablas cambiaron desde la última carga"""
+        marca = cambios.marca(self.tablas)
+        if marca == self._marca:
+            return
+        self._marca = marca
+        try:
+            self.recargar()
+        except Exception as e:
+            print(f"Error recargando {type(self.vista).__name__}: {e}")
+
+    def eventFilter(self, objeto, evento):
+        if objeto is self.vista and evento.type() == QEvent.Show:
+            self.revisar()
+        return False
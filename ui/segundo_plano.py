@@ -0,0 +1,119 @@
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from ..db.conexion import lectura
+
+
+class _Senales(QObject):
+    terminado = Signal(int, object)
+    fallido = Signal(int, object)
+
+
+class _Tarea(QRunnable):
+    """Corre una función en un hilo del pool y avisa el resultado por señal"""
+
+    def __init__(self, ticket, funcion, senales, con_conexion):
+        super().__init__()
+        self.ticket = ticket
+        self.funcion = funcion
+        self.senales = senales
+        self.con_conexion = con_conexion
+        # La conexión sólo se expone mientras la tarea la tiene prestada
+        self._conn = None
+        self._candado = threading.Lock()
+
+    def interrumpir(self):
+        """Corta la consulta en curso (se puede llamar desde cualquier hilo)"""
+        with self._candado:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def run(self):
+        try:
+            if self.con_conexion:
+                with lectura() as conn:
+                    with self._candado:
+                        self._conn = conn
+                    try:
+                        resultado = self.funcion(conn)
+                    finally:
+                        with self._candado:
+                            self._conn = None
+            else:
+                resultado = self.funcion()
+        except Exception as e:
+            self.senales.fallido.emit(self.ticket, e)
+        else:
+            self.senales.terminado.emit(self.ticket, resultado)
+
+
+class EjecutorConsultas(QObject):
+    """
+    Ejecuta consultas fuera del hilo de la interfaz.
+
+    Cada pantalla tiene su propio ejecutor. Los resultados llegan por
+    señal al hilo de la interfaz; si mientras tanto se pidió una consulta
+    más nueva, la vieja se interrumpe (Connection.interrupt) y su
+    resultado se descarta. La señal `ocupado` permite
+    mostrar un estado de carga en lugar de congelar la ventana.
+    """
+
+    ocupado = Signal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._senales = _Senales(self)
+        self._senales.terminado.connect(self._al_terminar)
+        self._senales.fallido.connect(self._al_fallar)
+        self._vigente = 0
+        self._pendientes = {}   # ticket -> (tarea, al_terminar, al_fallar)
+
+    # ---------------------------------
+    def consultar(self, funcion, al_terminar, al_fallar=None):
+        """Corre funcion(conn) con una conexión de lectura del grupo"""
+        return self._lanzar(funcion, al_terminar, al_fallar, True)
+
+    def ejecutar(self, funcion, al_terminar, al_fallar=None):
+        """Corre funcion() sin conexión (p. ej. una exportación que abre la suya)"""
+        return self._lanzar(funcion, al_terminar, al_fallar, False)
+
+    def cancelar(self):
+        """
+        Interrumpe y descarta lo que esté en curso. El estado de carga se
+        mantiene: se usa cuando una consulta nueva está por llegar.
+        """
+        self._vigente += 1
+        self._interrumpir()
+
+    def _interrumpir(self):
+        for tarea, _, _ in self._pendientes.values():
+            tarea.interrumpir()
+
+    def _lanzar(self, funcion, al_terminar, al_fallar, con_conexion):
+        self._interrumpir()   # Lo anterior ya no se va a mostrar
+        self._vigente += 1
+        ticket = self._vigente
+        tarea = _Tarea(ticket, funcion, self._senales, con_conexion)
+        tarea.setAutoDelete(False)   # la referencia se guarda hasta el aviso
+        self._pendientes[ticket] = (tarea, al_terminar, al_fallar)
+        self.ocupado.emit(True)
+        QThreadPool.globalInstance().start(tarea)
+        return ticket
+
+    # ---------------------------------
+    def _al_terminar(self, ticket, resultado):
+        _, al_terminar, _ = self._pendientes.pop(ticket)
+        if ticket != self._vigente:
+            return  # Superada por una consulta más nueva
+        self.ocupado.emit(False)
+        al_terminar(resultado)
+
+    def _al_fallar(self, ticket, error):
+        _, _, al_fallar = self._pendientes.pop(ticket)
+        if ticket != self._vigente:
+            return
+        self.ocupado.emit(False)
+        if al_fallar:
+            al_fallar(error)
+        else:
+            print(f"Error en consulta en segundo plano: {error}")
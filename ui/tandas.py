@@ -6,9 +6,10 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Signal # <--- IMPORTANTE
 import sqlite3
-from pathlib import Path
-
-DB_PATH = Path(__file__).resolve().parents[1] / "data.db"
+from ..db.conexion import lectura
+from ..db.consultas import TANDAS_DEL_DIA, NOMBRES_REFERENCIAS
+from ..services.produccion import Tanda, guardar_tanda, eliminar_tanda
+from .refresco import Refrescador
 
 class Tandas(QWidget):
     # Definimos la señal para avisar a otras pestañas
@@ -82,81 +83,53 @@ class Tandas(QWidget):
         acciones.addStretch()
         layout.addLayout(acciones)
 
-    def conectar(self):
-        return sqlite3.connect(DB_PATH, timeout=10)
+        # Se recarga sola cuando cambian las tandas (aquí o en otra ventana)
+        self.refrescador = Refrescador(self, ("tandas", "referencias_chorizo"), self.cargar_tandas)
 
     def cargar_referencias(self):
         try:
-            conn = self.conectar()
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, nombre FROM referencias_chorizo")
+            with lectura() as conn:
+                datos = conn.execute(NOMBRES_REFERENCIAS).fetchall()
             self.referencia.clear()
-            for ref_id, nombre in cursor.fetchall():
+            for ref_id, nombre in datos:
                 self.referencia.addItem(nombre, ref_id)
-            conn.close()
         except Exception as e: print(e)
 
     def cargar_tandas(self):
         self.tabla.setRowCount(0)
         if not self.fecha_actual: return
 
-        conn = self.conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT t.id, t.fecha, r.nombre, t.numero_tanda, t.cantidad_producida, t.unidades
-        FROM tandas t
-        JOIN referencias_chorizo r ON r.id = t.referencia_id
-        WHERE t.fecha = ?
-        ORDER BY t.numero_tanda
-        """, (self.fecha_actual,))
-
-        for fila, datos in enumerate(cursor.fetchall()):
+        with lectura() as conn:
+            filas = conn.execute(TANDAS_DEL_DIA, (self.fecha_actual,)).fetchall()
+
+        for fila, datos in enumerate(filas):
             self.tabla.insertRow(fila)
             for col, valor in enumerate(datos):
                 self.tabla.setItem(fila, col, QTableWidgetItem(str(valor)))
-        conn.close()
 
     def guardar(self):
         if not self.fecha_actual: return
 
-        conn = None
         try:
-            conn = self.conectar()
-            cursor = conn.cursor()
-
-            if self.tanda_id_edicion:
-                # ACTUALIZAR
-                cursor.execute("""
-                UPDATE tandas SET numero_tanda=?, referencia_id=?, cantidad_producida=?, unidades=?
-                WHERE id=?
-                """, (self.numero_tanda.value(), self.referencia.currentData(), 
-                      self.cantidad.value(), self.unidades.value(), self.tanda_id_edicion))
-            else:
-                # INSERTAR NUEVO
-                cursor.execute("""
-                INSERT INTO tandas (fecha, numero_tanda, referencia_id, cantidad_producida, unidades)
-                VALUES (?, ?, ?, ?, ?)
-                """, (self.fecha_actual, self.numero_tanda.value(), self.referencia.currentData(), 
-                      self.cantidad.value(), self.unidades.value()))
-
-            conn.commit()
+            # Sin id se inserta una tanda nueva; con id se actualiza
+            guardar_tanda(Tanda(
+                self.fecha_actual, self.numero_tanda.value(), self.referencia.currentData(),
+                self.cantidad.value(), self.unidades.value(), self.tanda_id_edicion
+            ))
             
             # EMITIR SEÑAL PARA OTRAS PESTAÑAS
             self.tanda_creada.emit()
             
             self.limpiar_formulario()
-            self.cargar_tandas()
 
         except sqlite3.IntegrityError:
             QMessageBox.critical(self, "Error", "Esta tanda ya existe para este producto hoy.")
-        finally:
-            if conn: conn.close()
 
     def preparar_edicion(self):
         fila = self.tabla.currentRow()
         if fila < 0: return
         
-        self.tanda_id_edicion = self.tabla.item(fila, 0).text()
+        self.tanda_id_edicion = int(self.tabla.item(fila, 0).text())
         self.referencia.setCurrentText(self.tabla.item(fila, 2).text())
         self.numero_tanda.setValue(int(self.tabla.item(fila, 3).text()))
         self.cantidad.setValue(float(self.tabla.item(fila, 4).text()))
@@ -170,17 +143,12 @@ class Tandas(QWidget):
         fila = self.tabla.currentRow()
         if fila < 0: return
         
-        id_tanda = self.tabla.item(fila, 0).text()
+        id_tanda = int(self.tabla.item(fila, 0).text())
         res = QMessageBox.question(self, "Confirmar", "¿Eliminar esta tanda?", QMessageBox.Yes | QMessageBox.No)
         
         if res == QMessageBox.Yes:
-            conn = self.conectar()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM tandas WHERE id=?", (id_tanda,))
-            conn.commit()
-            conn.close()
+            eliminar_tanda(id_tanda)
             self.tanda_creada.emit() # Avisar que se borró algo
-            self.cargar_tandas()
 
     def limpiar_formulario(self):
         self.tanda_id_edicion = None
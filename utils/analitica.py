@@ -0,0 +1,162 @@
+"""
+Analítica de producción vectorizada (NumPy) sobre un rango de fechas:
+costo por kg y por unidad de cada tanda, rendimiento (kg producidos
+sobre kg de materia prima consumidos), distribución del costo por kg en
+cada referencia y margen contra el precio de venta del día.
+
+Las filas del rango se traen con tres consultas (tandas, consumo y
+precios) y el resto se calcula sobre arreglos, sin recorrer tanda por
+tanda. Como en services/, conn es opcional: sin ella se lee en una
+transacción propia; así lo pueden llamar las pantallas y los reportes.
+"""
+import sqlite3
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from ..db.conexion import lectura
+from ..db.consultas import ANALITICA_TANDAS, ANALITICA_CONSUMO, ANALITICA_PRECIOS
+
+_TANDAS = np.dtype([
+    ("id", "i8"), ("fecha", "U10"), ("referencia_id", "i8"),
+    ("kilos", "f8"), ("unidades", "i8"),
+])
+_CONSUMO = np.dtype([("tanda_id", "i8"), ("cantidad", "f8"), ("total", "f8")])
+_PRECIOS = np.dtype([("fecha", "U10"), ("referencia_id", "i8"), ("precio", "f8")])
+
+
+class Produccion(NamedTuple):
+    """Una posición por tanda del rango, ordenadas por id"""
+    tanda_id: np.ndarray
+    fecha: np.ndarray          # datetime64[D]
+    referencia_id: np.ndarray
+    kilos: np.ndarray
+    unidades: np.ndarray
+    consumo_kg: np.ndarray     # materia prima consumida
+    costo: np.ndarray          # costo de esa materia prima
+    precio_kg: np.ndarray      # precio de venta del día (nan si no se cargó)
+
+
+class IndicadoresTanda(NamedTuple):
+    """Alineados con Produccion; nan donde no hay divisor"""
+    costo_kg: np.ndarray
+    costo_unidad: np.ndarray
+    rendimiento: np.ndarray
+    margen_kg: np.ndarray
+    margen_pct: np.ndarray
+
+
+class ResumenReferencia(NamedTuple):
+    referencia_id: int
+    tandas: int
+    kilos: float
+    costo: float
+    costo_kg: float            # costo total / kilos totales
+    costo_kg_min: float
+    costo_kg_p25: float
+    costo_kg_mediana: float
+    costo_kg_p75: float
+    costo_kg_max: float
+    rendimiento: float         # kilos totales / consumo total
+    margen_kg: float           # promedio ponderado por kilos de las tandas con precio
+
+
+def _arreglo(conn, sql, params, tipo):
+    return np.array(conn.execute(sql, params).fetchall(), dtype=tipo)
+
+
+def _clave(fechas, referencias):
+    """Una clave entera por (fecha, referencia) para cruzar arreglos"""
+    return fechas.astype("i8") * 1_000_000 + referencias
+
+
+def _dividir(a, b):
+    return float(a / b) if b else float("nan")
+
+
+def cargar_produccion(desde: str, hasta: str,
+                      conn: Optional[sqlite3.Connection] = None) -> Produccion:
+    """Tandas de [desde, hasta] con su consumo, costo y precio del día"""
+    if conn is None:
+        with lectura() as conn:
+            conn.execute("BEGIN")
+            return cargar_produccion(desde, hasta, conn)
+
+    params = (desde, hasta)
+    tandas = _arreglo(conn, ANALITICA_TANDAS, params, _TANDAS)
+    consumo = _arreglo(conn, ANALITICA_CONSUMO, params, _CONSUMO)
+    precios = _arreglo(conn, ANALITICA_PRECIOS, params, _PRECIOS)
+    n = len(tandas)
+
+    # Consumo sumado por tanda: los ids vienen ordenados, la posición sale por búsqueda binaria
+    posicion = np.searchsorted(tandas["id"], consumo["tanda_id"])
+    consumo_kg = np.bincount(posicion, weights=consumo["cantidad"], minlength=n).astype("f8")
+    costo = np.bincount(posicion, weights=consumo["total"], minlength=n).astype("f8")
+
+    # Precio del día de cada tanda, cruzando por (fecha, referencia)
+    fecha = tandas["fecha"].astype("datetime64[D]")
+    clave_tanda = _clave(fecha, tandas["referencia_id"])
+    clave_precio = _clave(precios["fecha"].astype("datetime64[D]"), precios["referencia_id"])
+    orden = np.argsort(clave_precio, kind="stable")
+    clave_precio, valor_precio = clave_precio[orden], precios["precio"][orden]
+    precio_kg = np.full(n, np.nan)
+    if len(clave_precio):
+        i = np.minimum(np.searchsorted(clave_precio, clave_tanda), len(clave_precio) - 1)
+        encontrado = clave_precio[i] == clave_tanda
+        precio_kg[encontrado] = valor_precio[i[encontrado]]
+
+    return Produccion(
+        tandas["id"], fecha, tandas["referencia_id"], tandas["kilos"],
+        tandas["unidades"], consumo_kg, costo, precio_kg,
+    )
+
+
+def indicadores(p: Produccion) -> IndicadoresTanda:
+    """Costo por kg y por unidad, rendimiento y margen de cada tanda"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        costo_kg = np.where(p.kilos > 0, p.costo / p.kilos, np.nan)
+        costo_unidad = np.where(p.unidades > 0, p.costo / p.unidades, np.nan)
+        rendimiento = np.where(p.consumo_kg > 0, p.kilos / p.consumo_kg, np.nan)
+        margen_kg = p.precio_kg - costo_kg
+        margen_pct = np.where(p.precio_kg > 0, margen_kg / p.precio_kg, np.nan)
+    return IndicadoresTanda(costo_kg, costo_unidad, rendimiento, margen_kg, margen_pct)
+
+
+def por_referencia(p: Produccion,
+                   ind: Optional[IndicadoresTanda] = None) -> List[ResumenReferencia]:
+    """Totales, cuantiles del costo por kg y margen de cada referencia"""
+    if ind is None:
+        ind = indicadores(p)
+    referencias, grupo = np.unique(p.referencia_id, return_inverse=True)
+    m = len(referencias)
+
+    tandas = np.bincount(grupo, minlength=m)
+    kilos = np.bincount(grupo, weights=p.kilos, minlength=m)
+    costo = np.bincount(grupo, weights=p.costo, minlength=m)
+    consumo = np.bincount(grupo, weights=p.consumo_kg, minlength=m)
+
+    con_margen = ~np.isnan(ind.margen_kg)
+    kilos_con_precio = np.bincount(grupo[con_margen], weights=p.kilos[con_margen], minlength=m)
+    margen = np.bincount(grupo[con_margen],
+                         weights=(ind.margen_kg * p.kilos)[con_margen], minlength=m)
+
+    # Cuantiles por grupo: ordenar por (referencia, costo_kg) y cortar en tramos
+    finito = ~np.isnan(ind.costo_kg)
+    g, c = grupo[finito], ind.costo_kg[finito]
+    orden = np.lexsort((c, g))
+    g, c = g[orden], c[orden]
+    cortes = np.searchsorted(g, np.arange(m + 1))
+
+    resumen = []
+    for k in range(m):
+        valores = c[cortes[k]:cortes[k + 1]]
+        if len(valores):
+            cuantiles = [float(q) for q in np.percentile(valores, [0, 25, 50, 75, 100])]
+        else:
+            cuantiles = [float("nan")] * 5
+        resumen.append(ResumenReferencia(
+            int(referencias[k]), int(tandas[k]), float(kilos[k]), float(costo[k]),
+            _dividir(costo[k], kilos[k]), *cuantiles,
+            _dividir(kilos[k], consumo[k]), _dividir(margen[k], kilos_con_precio[k]),
+        ))
+    return resumen
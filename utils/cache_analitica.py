@@ -0,0 +1,237 @@
+"""
+Caché en memoria del historial de movimientos y de las tandas, como
+columnas NumPy tipadas y compactas, para que tableros y reportes sumen
+en milisegundos sin volver a leer la base.
+
+El libro crece casi sólo por el final (ids autoincrementales), así que
+cada refresco trae únicamente las filas con id mayor al último visto.
+Las modificaciones y borrados los cuenta la tabla `reescrituras`
+(triggers de la migración 10): si el número cambió, la tabla se vuelve
+a cargar entera. Si no hubo cambios (db.cambios), refrescar no consulta
+la base.
+
+Cada tabla tiene un presupuesto de memoria: si lo supera se descartan
+las filas más viejas y el caché sólo responde por las fechas que siguen
+completas (`cubre`); para rangos anteriores los métodos devuelven None
+y hay que consultar SQLite. movimientos_por_materia() (la función del
+módulo) ya hace ese respaldo.
+"""
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..db import cambios
+from ..db.conexion import lectura
+from ..db.consultas import (
+    CACHE_HISTORIAL, CACHE_TANDAS, REESCRITURAS, MOVIMIENTOS_POR_MATERIA_ENTRE
+)
+
+TAMANO_BLOQUE = 50000
+
+# Presupuesto por defecto de cada tabla (bytes)
+PRESUPUESTO_HISTORIAL = 64 * 1024 * 1024
+PRESUPUESTO_TANDAS = 16 * 1024 * 1024
+
+
+class TablaEnMemoria:
+    """Columnas de una tabla ordenadas por id, que crecen por el final"""
+
+    def __init__(self, tabla, consulta, columnas, presupuesto):
+        self.tabla = tabla
+        self.consulta = consulta
+        self.tipo = np.dtype(columnas)   # una fila tal como llega de la consulta
+        self.presupuesto = presupuesto
+        self._vaciar()
+
+    def _vaciar(self):
+        self._datos = {nombre: np.empty(0, self.tipo[nombre]) for nombre in self.tipo.names}
+        self.filas = 0
+        self.ultimo_id = 0
+        self.reescrituras = None
+        # Primer día (en días desde 1970) desde el que están todas las filas
+        self.completa_desde = None
+
+    # ---------------------------------
+    def columna(self, nombre):
+        return self._datos[nombre][:self.filas]
+
+    @property
+    def bytes(self):
+        return sum(arreglo.nbytes for arreglo in self._datos.values())
+
+    def cubre(self, desde):
+        """True si están todas las filas con fecha >= desde ('YYYY-MM-DD')"""
+        if self.completa_desde is None:
+            return True
+        return np.datetime64(desde, "D").astype("i8") >= self.completa_desde
+
+    # ---------------------------------
+    def refrescar(self, conn):
+        """Trae lo nuevo; si hubo reescrituras, todo de nuevo"""
+        veces = conn.execute(REESCRITURAS, (self.tabla,)).fetchone()[0]
+        if veces != self.reescrituras:
+            self._vaciar()
+            self.reescrituras = veces
+        cursor = conn.execute(self.consulta, (self.ultimo_id,))
+        while True:
+            bloque = cursor.fetchmany(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            self._agregar(np.array(bloque, dtype=self.tipo))
+            self._recortar()
+
+    def _agregar(self, bloque):
+        necesarias = self.filas + len(bloque)
+        capacidad = len(self._datos["id"])
+        if necesarias > capacidad:
+            # Crece al doble para que agregar de a pocas filas no copie todo cada vez
+            maximo = self.presupuesto // self.tipo.itemsize
+            capacidad = max(necesarias, min(2 * capacidad, maximo))
+            for nombre, arreglo in self._datos.items():
+                nuevo = np.empty(capacidad, arreglo.dtype)
+                nuevo[:self.filas] = arreglo[:self.filas]
+                self._datos[nombre] = nuevo
+        for nombre in self.tipo.names:
+            self._datos[nombre][self.filas:necesarias] = bloque[nombre]
+        self.filas = necesarias
+        self.ultimo_id = int(bloque["id"][-1])
+
+    def _recortar(self):
+        """Descarta las filas más viejas si se pasa del presupuesto"""
+        maximo = self.presupuesto // self.tipo.itemsize
+        if len(self._datos["id"]) <= maximo:
+            return
+        corte = max(self.filas - maximo, 0)
+        if corte:
+            # Las fechas hasta la más alta descartada quedan incompletas
+            ultima = int(self._datos["fecha"][:corte].max()) + 1
+            self.completa_desde = max(self.completa_desde or ultima, ultima)
+        self._datos = {
+            nombre: arreglo[corte:self.filas].copy() for nombre, arreglo in self._datos.items()
+        }
+        self.filas -= corte
+
+
+class Movimientos(NamedTuple):
+    entradas: float
+    salidas: float
+    costo_salidas: float
+
+
+class Produccion(NamedTuple):
+    tandas: int
+    kilos: float
+    unidades: int
+
+
+class CacheAnalitica:
+    """Historial y tandas en memoria; se puede usar desde cualquier hilo"""
+
+    def __init__(self, presupuesto_historial=PRESUPUESTO_HISTORIAL,
+                 presupuesto_tandas=PRESUPUESTO_TANDAS):
+        self.historial = TablaEnMemoria(
+            "historial_inventario_materia_prima", CACHE_HISTORIAL,
+            [("id", "i8"), ("fecha", "i4"), ("materia_prima_id", "i4"), ("signo", "i1"),
+             ("cantidad", "f8"), ("costo_unitario", "f8"), ("total", "f8"), ("tanda_id", "i8")],
+            presupuesto_historial,
+        )
+        self.tandas = TablaEnMemoria(
+            "tandas", CACHE_TANDAS,
+            [("id", "i8"), ("fecha", "i4"), ("referencia_id", "i4"), ("numero_tanda", "i4"),
+             ("kilos", "f8"), ("unidades", "i4")],
+            presupuesto_tandas,
+        )
+        self._candado = threading.RLock()
+        self._marca = None
+
+    def refrescar(self):
+        """Pone al día ambas tablas (en una sola lectura) si algo cambió"""
+        cambios.revisar_externos()
+        tablas = ("historial_inventario_materia_prima", "tandas")
+        with self._candado:
+            marca = cambios.marca(tablas)
+            if marca == self._marca:
+                return
+            with lectura() as conn:
+                conn.execute("BEGIN")
+                self.historial.refrescar(conn)
+                self.tandas.refrescar(conn)
+            self._marca = marca
+
+    @staticmethod
+    def _rango(tabla, desde, hasta):
+        fechas = tabla.columna("fecha")
+        return ((fechas >= np.datetime64(desde, "D").astype("i8"))
+                & (fechas <= np.datetime64(hasta, "D").astype("i8")))
+
+    # ---------------------------------
+    def movimientos_por_materia(self, desde, hasta) -> Optional[Dict[int, Movimientos]]:
+        """Entradas, salidas y costo de las salidas de cada materia prima en [desde, hasta]"""
+        self.refrescar()
+        with self._candado:
+            h = self.historial
+            if not h.cubre(desde):
+                return None
+            en_rango = self._rango(h, desde, hasta)
+            materias, grupo = np.unique(h.columna("materia_prima_id")[en_rango], return_inverse=True)
+            signo = h.columna("signo")[en_rango]
+            cantidad = h.columna("cantidad")[en_rango]
+            total = h.columna("total")[en_rango]
+            m = len(materias)
+            entradas = np.bincount(grupo, weights=np.where(signo > 0, cantidad, 0), minlength=m)
+            salidas = np.bincount(grupo, weights=np.where(signo < 0, cantidad, 0), minlength=m)
+            costo = np.bincount(grupo, weights=np.where(signo < 0, total, 0), minlength=m)
+        return {
+            int(materia): Movimientos(float(e), float(s), float(c))
+            for materia, e, s, c in zip(materias, entradas, salidas, costo)
+        }
+
+    def produccion_por_referencia(self, desde, hasta) -> Optional[Dict[int, Produccion]]:
+        """Tandas, kilos y unidades de cada referencia en [desde, hasta]"""
+        self.refrescar()
+        with self._candado:
+            t = self.tandas
+            if not t.cubre(desde):
+                return None
+            en_rango = self._rango(t, desde, hasta)
+            referencias, grupo = np.unique(t.columna("referencia_id")[en_rango], return_inverse=True)
+            m = len(referencias)
+            tandas = np.bincount(grupo, minlength=m)
+            kilos = np.bincount(grupo, weights=t.columna("kilos")[en_rango], minlength=m)
+            unidades = np.bincount(grupo, weights=t.columna("unidades")[en_rango], minlength=m)
+        return {
+            int(referencia): Produccion(int(n), float(k), int(u))
+            for referencia, n, k, u in zip(referencias, tandas, kilos, unidades)
+        }
+
+    def uso_memoria(self) -> Tuple[int, int]:
+        """Bytes ocupados por (historial, tandas)"""
+        with self._candado:
+            return self.historial.bytes, self.tandas.bytes
+
+
+_cache = None
+_candado_cache = threading.Lock()
+
+
+def cache():
+    """Caché del proceso (se crea y carga al primer uso)"""
+    global _cache
+    with _candado_cache:
+        if _cache is None:
+            _cache = CacheAnalitica()
+        return _cache
+
+
+def movimientos_por_materia(desde, hasta) -> Dict[int, Movimientos]:
+    """Como CacheAnalitica.movimientos_por_materia, leyendo SQLite si el caché no cubre el rango"""
+    movimientos = cache().movimientos_por_materia(desde, hasta)
+    if movimientos is not None:
+        return movimientos
+    with lectura() as conn:
+        return {
+            materia: Movimientos(entradas, salidas, costo)
+            for materia, entradas, salidas, costo
+            in conn.execute(MOVIMIENTOS_POR_MATERIA_ENTRE, (desde, hasta))
+        }
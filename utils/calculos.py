@@ -0,0 +1,59 @@
+def costo_promedio_ponderado(stock, costo, cantidad, costo_nuevo):
+    """
+    Costo unitario del inventario después de una entrada de `cantidad`
+    a `costo_nuevo`. Si el stock resultante no es positivo (stock negativo
+    por un error previo) se toma el costo de la entrada.
+    """
+    stock_total = stock + cantidad
+    if stock_total > 0:
+        return (stock * costo + cantidad * costo_nuevo) / stock_total
+    return costo_nuevo
+
+
+def reproducir_movimientos(stock, costo, movimientos):
+    """
+    Aplica movimientos (tipo, cantidad, costo_unitario) en orden a un
+    stock y costo iniciales. Las entradas recalculan el promedio
+    ponderado; las salidas sólo descuentan. Devuelve (stock, costo).
+    """
+    for tipo, cantidad, costo_movimiento in movimientos:
+        if tipo == "ENTRADA":
+            costo = costo_promedio_ponderado(stock, costo, cantidad, costo_movimiento)
+            stock += cantidad
+        else:
+            stock -= cantidad
+    return stock, costo
+
+
+def recostear(stock, costo, movimientos, desde_id=None):
+    """
+    Motor de costo promedio ponderado. Reproduce en orden el libro de una
+    materia prima a partir de un punto de control (stock, costo) y
+    devuelve los valores corregidos de cada movimiento.
+
+    movimientos: (id, tipo, cantidad, costo_unitario, total,
+    stock_anterior, stock_resultante) en orden (fecha, hora, id).
+    Las entradas conservan su costo de compra; las salidas se valoran al
+    promedio vigente en su momento. Sólo se devuelven las filas desde
+    `desde_id` (la primera afectada; None = todas) cuyos valores cambian.
+
+    Devuelve (cambios, stock, costo) con cambios = [(id, costo_unitario,
+    total, stock_anterior, stock_resultante)].
+    """
+    cambios = []
+    afectado = desde_id is None
+    for id_, tipo, cantidad, costo_mov, total, anterior, resultante in movimientos:
+        afectado = afectado or id_ == desde_id
+        stock_anterior = stock
+        if tipo == "ENTRADA":
+            costo = costo_promedio_ponderado(stock, costo, cantidad, costo_mov)
+            stock += cantidad
+            nuevo = (id_, costo_mov, total, stock_anterior, stock)
+        else:
+            stock -= cantidad
+            nuevo = (id_, costo, cantidad * costo, stock_anterior, stock)
+        if afectado and not all(
+            abs(a - b) < 1e-9 for a, b in zip(nuevo[1:], (costo_mov, total, anterior, resultante))
+        ):
+            cambios.append(nuevo)
+    return cambios, stock, costo